@@ -0,0 +1,139 @@
+import hashlib, json, sqlite3, threading, time
+from cachetools import TTLCache
+
+# Content-addressed cache for AI results. Keys are sha256 hashes of the prompt
+# inputs, so identical work is answered from the cache instead of Gemini.
+
+
+def content_key(namespace, *parts):
+    raw = json.dumps([namespace, parts], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''): h.update(chunk)
+    return h.hexdigest()
+
+
+class MemoryBackend:
+    def __init__(self, max_entries=1000, ttl=7 * 86400, timer=time.monotonic):
+        self._data = TTLCache(maxsize=max_entries, ttl=ttl, timer=timer)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock: return self._data.get(key)
+
+    def set(self, key, value):
+        with self._lock: self._data[key] = value
+
+    def clear(self):
+        with self._lock: self._data.clear()
+
+
+class SQLiteBackend:
+    def __init__(self, path='ai_cache.db', max_entries=10000, ttl=7 * 86400):
+        self.max_entries, self.ttl = max_entries, ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=15)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # shared by every web/worker process
+        self._conn.execute("CREATE TABLE IF NOT EXISTS ai_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                           "created_at REAL NOT NULL, last_used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_ai_cache_last_used ON ai_cache (last_used)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM ai_cache WHERE key = ?", (key,)).fetchone()
+            if not row: return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE ai_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO ai_cache (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                               (key, json.dumps(value), now, now))
+            # Evict expired rows, then least recently used ones beyond the cap
+            self._conn.execute("DELETE FROM ai_cache WHERE created_at < ?", (now - self.ttl,))
+            self._conn.execute("DELETE FROM ai_cache WHERE key IN (SELECT key FROM ai_cache ORDER BY last_used DESC "
+                               "LIMIT -1 OFFSET ?)", (self.max_entries,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM ai_cache")
+            self._conn.commit()
+
+
+class AICache:
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits, self.misses = {}, {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, namespace, inputs, compute, cacheable=bool, refresh=False):
+        """Return the cached result for (namespace, inputs) or run `compute()`.
+        Concurrent callers with the same key wait for the first one instead of
+        calling the AI again. Exceptions and results failing `cacheable` are not stored.
+        `refresh` skips the stored entry and replaces it with a newly computed one."""
+        if self.backend is None: return compute()
+        key = content_key(namespace, *inputs)
+        while True:
+            value = None if refresh else self.backend.get(key)
+            refresh = False  # a concurrent caller's result is fresh enough
+            if value is not None:
+                self._count(self.hits, namespace)
+                return value
+            with self._lock:
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    self._inflight[key] = threading.Event()
+                    break
+            waiter.wait()
+            # The leader stored nothing (error/uncacheable): fall through and compute ourselves
+            if self.backend.get(key) is None:
+                with self._lock:
+                    if key not in self._inflight:
+                        self._inflight[key] = threading.Event()
+                        break
+        self._count(self.misses, namespace)
+        try:
+            value = compute()
+            if cacheable(value): self.backend.set(key, value)
+            return value
+        finally:
+            with self._lock: self._inflight.pop(key).set()
+
+    def peek(self, namespace, inputs):
+        # Lookup without computing, for callers that batch their own misses (put() stores them)
+        if self.backend is None: return None
+        value = self.backend.get(content_key(namespace, *inputs))
+        self._count(self.hits if value is not None else self.misses, namespace)
+        return value
+
+    def put(self, namespace, inputs, value):
+        if self.backend is not None: self.backend.set(content_key(namespace, *inputs), value)
+
+    def _count(self, counter, namespace):
+        with self._lock: counter[namespace] = counter.get(namespace, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {ns: {'hits': self.hits.get(ns, 0), 'misses': self.misses.get(ns, 0)}
+                    for ns in sorted(set(self.hits) | set(self.misses))}
+
+
+def make_cache(kind='memory', path='ai_cache.db', max_entries=1000, ttl=7 * 86400):
+    if kind == 'off': return AICache(None)
+    if kind == 'sqlite': return AICache(SQLiteBackend(path, max_entries=max_entries, ttl=ttl))
+    if kind == 'memory': return AICache(MemoryBackend(max_entries=max_entries, ttl=ttl))
+    raise ValueError(f"Unknown AI cache backend: {kind}")
@@ -0,0 +1,40 @@
+import threading, time
+from contextlib import contextmanager
+
+
+class AILimiter:
+    """Process-wide guard for Gemini calls: caps in-flight requests and
+    token-bucket rate-limits them to `per_minute` (0 disables the rate limit)."""
+
+    def __init__(self, max_in_flight=4, per_minute=60, burst=None):
+        self.max_in_flight = max_in_flight
+        self.per_minute = per_minute
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._capacity = float(burst or max_in_flight)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take_token(self):
+        if self.per_minute <= 0: return
+        rate = self.per_minute / 60.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / rate
+            time.sleep(wait)
+
+    @contextmanager
+    def slot(self):
+        self._take_token()
+        with self._slots:
+            yield
+
+    def call(self, fn, *args, **kwargs):
+        with self.slot():
+            return fn(*args, **kwargs)
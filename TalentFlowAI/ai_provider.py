@@ -0,0 +1,103 @@
+import hashlib, json, random, re, threading, time
+import google.generativeai as genai
+from genai_files import FakeFileClient
+
+# Where AI calls go. A provider turns a prompt into reply text with generate(op, contents, **kwargs)
+# (op: questions, cv_questions, grade, grade_batch, report) and has the file API genai_files
+# expects (upload_file / get_file / delete_file). `name` is part of every AI cache key.
+
+
+def response_text(response):
+    # .text raises when the reply was blocked or has no parts
+    try: return response.text
+    except ValueError: return ''
+
+
+class GeminiProvider:
+    def __init__(self, model_name, api_key=None):
+        if api_key: genai.configure(api_key=api_key)
+        self.name, self.model = model_name, genai.GenerativeModel(model_name)
+
+    def generate(self, op, contents, **kwargs):
+        return response_text(self.model.generate_content(contents, **kwargs))
+
+    def upload_file(self, path, mime_type=None):
+        return genai.upload_file(path=path, mime_type=mime_type)
+
+    def get_file(self, name):
+        return genai.get_file(name)
+
+    def delete_file(self, name):
+        return genai.delete_file(name)
+
+
+class FakeAIError(RuntimeError):
+    pass
+
+
+class FakeProvider(FakeFileClient):
+    """Offline stand-in for Gemini for benchmarks and load tests. Each call sleeps `latency`
+    (+ `per_file` per attached file, ± `jitter`) and returns a valid reply for its op. The reply
+    is derived from a hash of the prompt, so the same inputs always get the same reply.
+    `error_rate` of calls raise FakeAIError, `bad_reply_rate` return a reply that fails
+    validation, and `file_fail_rate` of uploads end FAILED. Those draws come from one
+    generator seeded with `seed`."""
+
+    name = 'fake'
+
+    def __init__(self, latency=0.0, per_file=0.0, jitter=0.0, processing_seconds=0.0, error_rate=0.0,
+                 bad_reply_rate=0.0, file_fail_rate=0.0, seed=0, sleep=time.sleep):
+        super().__init__(processing_seconds=processing_seconds)
+        self.latency, self.per_file, self.jitter, self.sleep = latency, per_file, jitter, sleep
+        self.error_rate, self.bad_reply_rate, self.file_fail_rate = error_rate, bad_reply_rate, file_fail_rate
+        self.generated, self._failed = {}, set()
+        self._rng, self._lock = random.Random(seed), threading.Lock()
+
+    def _draw(self, rate):
+        if rate <= 0: return False
+        with self._lock: return self._rng.random() < rate
+
+    def upload_file(self, path, mime_type=None):
+        f = super().upload_file(path, mime_type)
+        if self._draw(self.file_fail_rate): self._failed.add(f.name)
+        return self._view(f.name)
+
+    def _view(self, name):
+        f = super()._view(name)
+        if name in self._failed: f.state = self._State("FAILED")
+        return f
+
+    def generate(self, op, contents, **kwargs):
+        parts = contents if isinstance(contents, list) else [contents]
+        files = [p for p in parts if not isinstance(p, str)]
+        text = '\n'.join(p for p in parts if isinstance(p, str))
+        with self._lock:
+            self.generated[op] = self.generated.get(op, 0) + 1
+            jitter = self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0
+        self.sleep(max(0, self.latency + self.per_file * len(files) + jitter))
+        if self._draw(self.error_rate): raise FakeAIError(f"Fake {op} failure")
+        digest = hashlib.sha256(json.dumps([op, text, [getattr(f, 'path', f.name) for f in files]]).encode()).digest()
+        reply = self._reply(op, text, len(files), random.Random(digest))
+        if self._draw(self.bad_reply_rate):
+            # A batch reply missing its last grade, anything else as prose without JSON
+            return json.dumps(reply[:-1]) if op == 'grade_batch' else "Sorry, I can't help with that."
+        return json.dumps(reply)
+
+    def _reply(self, op, text, n_files, rng):
+        def grade(): return {"score": round(rng.uniform(3, 9.5), 1), "summary": f"Fake feedback {rng.randrange(1000)}."}
+        if op in ('questions', 'cv_questions'):
+            count = int(m.group(1)) if op == 'questions' and (m := re.search(r'exactly (\d+)', text)) else 2 if op == 'cv_questions' else 5
+            return [{"question": f"Fake question {n} ({rng.randrange(1000)})", "criteria": "Clarity and relevance."}
+                    for n in range(1, count + 1)]
+        if op == 'grade': return grade()
+        if op == 'grade_batch': return [dict(grade(), index=n) for n in range(1, n_files + 1)]
+        if op == 'report':
+            return {"suitability": rng.choice(['High', 'Medium', 'Low']), "strengths": ["Fake strength"],
+                    "weaknesses": ["Fake weakness"], "final_comment": f"Fake overall comment {rng.randrange(1000)}."}
+        raise ValueError(f"FakeProvider has no reply for {op!r}")
+
+
+def make_provider(kind='gemini', model_name=None, api_key=None, **fake_settings):
+    if kind == 'gemini': return GeminiProvider(model_name, api_key)
+    if kind == 'fake': return FakeProvider(**fake_settings)
+    raise ValueError(f"Unknown AI provider: {kind}")
@@ -0,0 +1,86 @@
+import json, re
+from typing import Annotated, List, Literal
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, field_validator, model_validator
+
+# Typed views of Gemini replies. extract_json pulls the first JSON value out of a reply
+# (prose, ``` fences and all) in one pass; Schema.parse validates it and raises
+# AIOutputError with a short description that can be sent back to the model.
+
+
+class AIOutputError(ValueError):
+    pass
+
+
+_decoder = json.JSONDecoder()
+_OPENERS = {'[': re.compile(r'\['), '{': re.compile(r'\{'), None: re.compile(r'[\[{]')}
+
+
+def extract_json(text, shape=None):
+    """First JSON array/object in `text` that decodes (only arrays or objects if shape is
+    '[' or '{'). Nested values are decoded whole, so brackets inside strings don't confuse it."""
+    if not text or not isinstance(text, str): raise AIOutputError("the reply was empty")
+    for m in _OPENERS[shape].finditer(text):
+        try: return _decoder.raw_decode(text, m.start())[0]
+        except json.JSONDecodeError: continue
+    raise AIOutputError(f"no JSON {'array' if shape == '[' else 'object' if shape == '{' else 'value'} found in the reply")
+
+
+def describe(error, limit=5):
+    msgs = [f"{'.'.join(str(p) for p in e['loc']) or 'value'}: {e['msg']}" for e in error.errors()[:limit]]
+    return '; '.join(msgs) + (f" (+{error.error_count() - limit} more)" if error.error_count() > limit else '')
+
+
+class Question(BaseModel):
+    question: str = Field(min_length=1)
+    criteria: str = ''
+
+    @model_validator(mode='before')
+    @classmethod
+    def _from_text(cls, v):
+        return {'question': v} if isinstance(v, str) else v
+
+
+class Grade(BaseModel):
+    score: float = Field(ge=0, le=10)
+    summary: str
+
+
+class BatchGrade(Grade):
+    index: int = Field(ge=1)
+
+
+class OverallReport(BaseModel):
+    suitability: Literal['High', 'Medium', 'Low']
+    strengths: List[str] = []
+    weaknesses: List[str] = []
+    final_comment: str
+
+    @field_validator('suitability', mode='before')
+    @classmethod
+    def _title(cls, v):
+        return v.strip().title() if isinstance(v, str) else v
+
+    @field_validator('strengths', 'weaknesses', mode='before')
+    @classmethod
+    def _listify(cls, v):
+        return [v] if isinstance(v, str) else v
+
+
+class Schema:
+    """A reply type: `shape` is the JSON container to look for; parse() returns plain
+    dicts/lists (what callers and the AI cache store)."""
+
+    def __init__(self, type_, shape):
+        self.adapter, self.shape = TypeAdapter(type_), shape
+
+    def parse(self, text):
+        data = extract_json(text, self.shape)
+        try: value = self.adapter.validate_python(data)
+        except ValidationError as e: raise AIOutputError(describe(e)) from None
+        return self.adapter.dump_python(value)
+
+
+QUESTIONS = Schema(Annotated[List[Question], Field(min_length=1)], '[')  # [] would make a room without questions
+GRADE = Schema(Grade, '{')
+BATCH_GRADES = Schema(List[BatchGrade], '[')
+OVERALL_REPORT = Schema(OverallReport, '{')
@@ -1,13 +1,27 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, send_from_directory
-import google.generativeai as genai
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, send_file, abort, g, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
 from dotenv import load_dotenv
-import uuid, socket, os, json, random, string, time, PyPDF2, pytz
-from datetime import datetime
+import uuid, socket, os, json, random, string, time, PyPDF2, pytz, threading, hashlib, mimetypes, click, tempfile, sqlite3, cProfile, logging, csv, io
+from datetime import datetime, timedelta
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
-from sqlalchemy import event
+from sqlalchemy import event, or_, and_, func, case, select, insert, delete, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import LRUCache
+from contextlib import ExitStack, contextmanager
+from ai_limiter import AILimiter
+from genai_files import upload_many_and_wait, FileProcessingTimeout, FileProcessingFailed
+from migrations import migrate
+from ai_cache import make_cache, file_sha256, content_key
+from media import MediaProcessor
+from storage import make_storage
+from metrics import REGISTRY, Counter, Histogram, CallbackMetric
+from ai_schemas import AIOutputError, QUESTIONS, GRADE, BATCH_GRADES, OVERALL_REPORT
+from ai_provider import make_provider
 import shutil
 
 # 1. SETUP
@@ -16,9 +30,10 @@ app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'talentflow_secret_key_2025')
 
 # 2. AI CONFIG
+# 'gemini', or 'fake' (ai_provider.FakeProvider) to run benchmarks and load tests without an API key
+AI_PROVIDER = os.getenv('AI_PROVIDER', 'gemini')
 api_key = os.getenv('GOOGLE_API_KEY')
-if not api_key: print("⚠️ MISSING API KEY!")
-else: genai.configure(api_key=api_key)
+if AI_PROVIDER == 'gemini' and not api_key: print("⚠️ MISSING API KEY!")
 
 SAFETY_SETTINGS = {
     HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
@@ -27,19 +42,183 @@ SAFETY_SETTINGS = {
     HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
 }
 
-def get_ai_model():
-    return genai.GenerativeModel('gemini-flash-lite-latest') 
+AI_MODEL_NAME = 'gemini-flash-lite-latest'
 
-model = get_ai_model()
+def get_ai_provider():
+    return make_provider(AI_PROVIDER, AI_MODEL_NAME, api_key,
+                         latency=float(os.getenv('FAKE_AI_LATENCY', 0.5)), per_file=float(os.getenv('FAKE_AI_PER_FILE', 0.05)),
+                         jitter=float(os.getenv('FAKE_AI_JITTER', 0)), processing_seconds=float(os.getenv('FAKE_AI_PROCESSING', 0.5)),
+                         error_rate=float(os.getenv('FAKE_AI_ERROR_RATE', 0)), bad_reply_rate=float(os.getenv('FAKE_AI_BAD_REPLY_RATE', 0)),
+                         file_fail_rate=float(os.getenv('FAKE_AI_FILE_FAIL_RATE', 0)), seed=int(os.getenv('FAKE_AI_SEED', 0)))
+
+ai_provider = get_ai_provider()
+
+# Cache in front of every AI call, keyed by model + prompt inputs (+ video content hash)
+ai_cache = make_cache(os.getenv('AI_CACHE_BACKEND', 'memory'), path=os.getenv('AI_CACHE_PATH', 'ai_cache.db'),
+                      max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', 1000)),
+                      ttl=int(os.getenv('AI_CACHE_TTL', 7 * 86400)))
+
+# Every upload_file / generate_content goes through this so parallel grading stays within quota
+ai_limiter = AILimiter(max_in_flight=int(os.getenv('AI_MAX_IN_FLIGHT', 4)),
+                       per_minute=int(os.getenv('AI_REQUESTS_PER_MINUTE', 60)))
+GEMINI_FILE_DEADLINE = float(os.getenv('GEMINI_FILE_DEADLINE', 120))
+# Replies that don't fit their schema are re-asked (with the validation error) up to this many times
+AI_REPAIR_RETRIES = int(os.getenv('AI_REPAIR_RETRIES', 1))
+grading_pool = ThreadPoolExecutor(max_workers=int(os.getenv('GRADING_CONCURRENCY', 4)), thread_name_prefix='grading')
+# 'single': one Gemini request per answer; 'batch': up to GRADING_BATCH_SIZE answers per request
+GRADING_MODE = os.getenv('GRADING_MODE', 'single')
+GRADING_BATCH_SIZE = int(os.getenv('GRADING_BATCH_SIZE', 6))
+
+# Media processing with ffmpeg before grading: a small proxy for Gemini, a poster for the report,
+# optionally an audio-only track. Skipped (originals are graded) when ffmpeg isn't installed.
+MEDIA_STAGES = {stage: os.getenv(f'MEDIA_{stage.upper()}', default) == '1'
+                for stage, default in (('proxy', '1'), ('poster', '1'), ('audio', '0'))}
+MEDIA_OUTPUT_SUFFIX = {'proxy': '.proxy.webm', 'poster': '.jpg', 'audio': '.audio.ogg'}
+MEDIA_KEEP_ORIGINAL = os.getenv('MEDIA_KEEP_ORIGINAL', '1') == '1'
+media = MediaProcessor(os.getenv('FFMPEG_BIN', 'ffmpeg'), workers=int(os.getenv('MEDIA_WORKERS', 2)),
+                       options={'proxy': {'height': int(os.getenv('MEDIA_PROXY_HEIGHT', 360)),
+                                          'fps': int(os.getenv('MEDIA_PROXY_FPS', 5)),
+                                          'video_kbps': int(os.getenv('MEDIA_PROXY_KBPS', 250))}})
+if any(MEDIA_STAGES.values()) and not media.available: print(f"⚠️ {media.ffmpeg} not found: videos are graded without proxies")
 
 # 3. DB & STORAGE
 UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Stored files (CVs, answers, media outputs) go through `storage`, keyed '<candidate folder>/<file>';
+# UPLOAD_FOLDER stays the local staging area for uploads in progress and transcoding
+storage = make_storage(os.getenv('STORAGE_BACKEND', 'local'), root=UPLOAD_FOLDER, archive_root=os.getenv('STORAGE_ARCHIVE_ROOT'),
+                       bucket=os.getenv('S3_BUCKET'), prefix=os.getenv('S3_PREFIX', ''), endpoint_url=os.getenv('S3_ENDPOINT_URL'),
+                       archive_class=os.getenv('S3_ARCHIVE_CLASS', 'STANDARD_IA'), staging_dir=UPLOAD_FOLDER)
+STORAGE_DELETE_BATCH = int(os.getenv('STORAGE_DELETE_BATCH', 200))
+RETENTION_ARCHIVE_DAYS = int(os.getenv('RETENTION_ARCHIVE_DAYS', 90))
+MEDIA_URL_EXPIRES = int(os.getenv('MEDIA_URL_EXPIRES', 3600))
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URI', 'sqlite:///talentflow.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pre-ping replaces connections that died while idle (DB restart, server-side timeouts)
+ENGINE_OPTIONS = {'pool_pre_ping': True, 'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800))}
+if app.config['SQLALCHEMY_DATABASE_URI'] not in ('sqlite://', 'sqlite:///:memory:'):
+    ENGINE_OPTIONS.update(pool_size=int(os.getenv('DB_POOL_SIZE', 10)), max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 20)),
+                          pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', 30)))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = ENGINE_OPTIONS
+SQLITE_TUNING = os.getenv('SQLITE_TUNING', '1') == '1'
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 15000))
+
+@event.listens_for(Engine, 'connect')
+def sqlite_pragmas(dbapi_conn, record):
+    # WAL: readers don't block the writer (and vice versa); busy_timeout: a writer waits for the lock
+    # instead of failing with "database is locked"; NORMAL is durable enough under WAL and fsyncs less
+    if not SQLITE_TUNING or not isinstance(dbapi_conn, sqlite3.Connection): return
+    cur = dbapi_conn.cursor()
+    cur.execute('PRAGMA journal_mode=WAL')
+    cur.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+    cur.execute('PRAGMA synchronous=NORMAL')
+    cur.close()
+
 db = SQLAlchemy(app)
 
+# Background job queue (grading etc.)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 4))
+JOB_BACKOFF_SECONDS = float(os.getenv('JOB_BACKOFF_SECONDS', 15))
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 900))
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 1))
+# Finished jobs are history only: done ones are deleted after JOB_KEEP_DONE_DAYS, failed ones after JOB_KEEP_FAILED_DAYS
+JOB_KEEP_DONE_DAYS = float(os.getenv('JOB_KEEP_DONE_DAYS', 7))
+JOB_KEEP_FAILED_DAYS = float(os.getenv('JOB_KEEP_FAILED_DAYS', 30))
+JOB_PURGE_INTERVAL = float(os.getenv('JOB_PURGE_INTERVAL', 3600))
+
+DASHBOARD_PER_PAGE = int(os.getenv('DASHBOARD_PER_PAGE', 20))
+RANKING_PER_PAGE = int(os.getenv('RANKING_PER_PAGE', 50))
+ROOM_QUESTION_CACHE_SIZE = int(os.getenv('ROOM_QUESTION_CACHE_SIZE', 1024))
+CV_TEXT_BUDGET = int(os.getenv('CV_TEXT_BUDGET', 5000))
+UPLOAD_MAX_CHUNK_BYTES = int(os.getenv('UPLOAD_MAX_CHUNK_BYTES', 8 * 1024 * 1024))
+# Chunked uploads not finalized within this many hours are dropped (row and .part file) by the workers
+UPLOAD_SESSION_TTL_HOURS = float(os.getenv('UPLOAD_SESSION_TTL_HOURS', 24))
+
+# Media serving: 'app' streams from Flask (Range/206, ETag, Last-Modified), 'x-accel' hands the
+# file to nginx via X-Accel-Redirect, 'x-sendfile' to Apache/lighttpd via X-Sendfile
+MEDIA_SERVE_MODE = os.getenv('MEDIA_SERVE_MODE', 'app')
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-uploads')
+MEDIA_MAX_AGE = int(os.getenv('MEDIA_MAX_AGE', 30 * 86400))
+app.config['USE_X_SENDFILE'] = MEDIA_SERVE_MODE == 'x-sendfile'
+
+# 4. OBSERVABILITY: Prometheus metrics at /metrics (per process) and one span log line per
+# request/job with its timing, SQL count, AI stage times and candidate/room ids
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # if set, /metrics needs "Authorization: Bearer <token>"
+SPAN_LOG = os.getenv('SPAN_LOG', '1') == '1'
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))  # share of requests run under cProfile
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+span_log = logging.getLogger('talentflow.span')
+if SPAN_LOG and not span_log.handlers:
+    span_log.addHandler(logging.StreamHandler())
+    span_log.setLevel(logging.INFO)
+    span_log.propagate = False
+
+REQUEST_SECONDS = Histogram('talentflow_request_seconds', 'HTTP request latency by route', ['endpoint', 'method'])
+REQUESTS = Counter('talentflow_requests_total', 'HTTP requests by route and status', ['endpoint', 'method', 'status'])
+REQUEST_DB_QUERIES = Histogram('talentflow_request_db_queries', 'SQL statements per HTTP request', ['endpoint'],
+                               buckets=(1, 2, 5, 10, 20, 50, 100, 250, 500))
+DB_QUERIES = Counter('talentflow_db_queries_total', 'SQL statements executed', ['source'])
+AI_STAGE_SECONDS = Histogram('talentflow_ai_stage_seconds', 'AI call time by operation and stage (upload, wait_active, queue, generate, parse)', ['op', 'stage'])
+AI_ERRORS = Counter('talentflow_ai_errors_total', 'AI calls that failed, by operation and stage', ['op', 'stage'])
+AI_REASKS = Counter('talentflow_ai_reasks_total', 'Invalid AI replies re-asked, by operation and final outcome', ['op', 'outcome'])
+PDF_EXTRACT_SECONDS = Histogram('talentflow_pdf_extract_seconds', 'CV text extraction time')
+PDF_PAGES = Counter('talentflow_pdf_pages_total', 'CV pages read')
+ROOM_QUESTION_CACHE = Counter('talentflow_room_question_cache_total', 'Parsed room question lookups', ['result'])
+JOB_SECONDS = Histogram('talentflow_job_seconds', 'Background job run time', ['kind'])
+JOB_RESULTS = Counter('talentflow_job_results_total', 'Background job outcomes', ['kind', 'outcome'])
+CallbackMetric('talentflow_ai_cache_total', 'AI cache lookups by namespace and result', ['namespace', 'result'],
+               lambda: {(ns, {'hits': 'hit', 'misses': 'miss'}[r]): n for ns, s in ai_cache.stats().items() for r, n in s.items()}, kind='counter')
+CallbackMetric('talentflow_media_stage_runs_total', 'ffmpeg stage runs', ['stage', 'result'],
+               lambda: {(st, r): s['failed'] if r == 'failed' else s['runs'] - s['failed']
+                        for st, s in media.stats.stats().items() for r in ('ok', 'failed')}, kind='counter')
+CallbackMetric('talentflow_media_stage_seconds_total', 'ffmpeg time by stage', ['stage'],
+               lambda: {(st,): s['seconds'] for st, s in media.stats.stats().items()}, kind='counter')
+CallbackMetric('talentflow_media_bytes_total', 'Media bytes in/out by stage', ['stage', 'direction'],
+               lambda: {(st, d): s[f'bytes_{d}'] for st, s in media.stats.stats().items() for d in ('in', 'out')}, kind='counter')
+CallbackMetric('talentflow_jobs', 'Jobs in the queue table by kind and status', ['kind', 'status'],
+               lambda: {(k, st): n for k, st, n in db.session.query(Job.kind, Job.status, func.count(Job.id)).group_by(Job.kind, Job.status)})
+
+# Per-thread span state: set for the duration of a request or job, None elsewhere
+_span = threading.local()
+
+def span_start(kind, /, **fields):
+    _span.kind, _span.fields, _span.queries, _span.ai, _span.start = kind, dict(fields), 0, {}, time.perf_counter()
+
+def span_tag(**fields):
+    if getattr(_span, 'fields', None) is not None: _span.fields.update((k, v) for k, v in fields.items() if v is not None)
+
+def span_end(**fields):
+    if getattr(_span, 'fields', None) is None: return None
+    seconds, queries = time.perf_counter() - _span.start, _span.queries
+    if SPAN_LOG:
+        out = dict(span=_span.kind, **_span.fields, **fields, ms=round(seconds * 1000, 1), db_queries=queries)
+        out.update((f"ai_{k}_ms", round(v * 1000, 1)) for k, v in _span.ai.items())
+        span_log.info(' '.join(f"{k}={v}" for k, v in out.items() if v is not None))
+    _span.fields = _span.ai = None
+    return seconds, queries
+
+def observe_ai(op, stage, seconds):
+    AI_STAGE_SECONDS.observe(seconds, op=op, stage=stage)
+    spent = getattr(_span, 'ai', None)
+    if spent is not None: spent[f"{op}_{stage}"] = spent.get(f"{op}_{stage}", 0) + seconds
+
+@contextmanager
+def ai_stage(op, stage):
+    start = time.perf_counter()
+    try: yield
+    except Exception:
+        AI_ERRORS.inc(op=op, stage=stage)
+        raise
+    finally: observe_ai(op, stage, time.perf_counter() - start)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    in_span = getattr(_span, 'fields', None) is not None
+    if in_span: _span.queries += 1
+    DB_QUERIES.inc(source=_span.kind if in_span else 'other')
+
 # ================= MODELS =================
 
 class User(db.Model):
@@ -55,23 +234,32 @@ class Interview(db.Model):
     recruiter_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     field = db.Column(db.String(100), nullable=False)
     base_questions = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.String(20))
+    question_count = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    storage_tier = db.Column(db.String(10), nullable=True)  # None (hot) | archive
     candidates = db.relationship('Candidate', backref='interview_room', cascade="all, delete-orphan", lazy=True)
+    __table_args__ = (db.Index('ix_interview_recruiter_created', 'recruiter_id', 'created_at'),)
 
 class Candidate(db.Model):
     id = db.Column(db.String(36), primary_key=True)
     room_id = db.Column(db.String(4), db.ForeignKey('interview.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), nullable=False)
-    videos = db.relationship('Video', backref='candidate', cascade="all, delete-orphan", lazy=True)
     
     # --- UPDATE: Thêm cột lưu đường dẫn folder ---
     folder_path = db.Column(db.String(255), nullable=True)
     
     cv_filename = db.Column(db.String(200), nullable=True)
-    personal_questions = db.Column(db.Text, nullable=True) 
+    cv_status = db.Column(db.String(10), nullable=True)  # None (no CV) | pending | done | failed
+    cv_text = db.Column(db.Text, nullable=True)
+    personal_questions = db.Column(db.Text, nullable=True)  # legacy full copy; new candidates use the room's + extra_questions
+    extra_questions = db.Column(db.Text, nullable=True)  # CV questions asked after the room's questions
     overall_analysis = db.Column(db.Text, nullable=True)
+    overall_inputs_hash = db.Column(db.String(64), nullable=True)  # hash of the grades overall_analysis was built from
     videos = db.relationship('Video', backref='candidate', cascade="all, delete-orphan", lazy=True)
+    upload_sessions = db.relationship('UploadSession', cascade="all, delete-orphan", lazy=True)
+    # One account per email within a room; also serves room_id lookups
+    __table_args__ = (db.Index('uq_candidate_room_email', 'room_id', 'email', unique=True),)
 
 class Video(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -80,34 +268,189 @@ class Video(db.Model):
     filename = db.Column(db.String(200), nullable=False)
     ai_score = db.Column(db.Float, default=0.0)
     ai_summary = db.Column(db.Text, default="")
+    content_hash = db.Column(db.String(64), nullable=True)  # of the upload, to spot identical re-uploads
+    media_hash = db.Column(db.String(64), nullable=True)  # of the stored file when the proxy replaced the upload (MEDIA_KEEP_ORIGINAL=0)
+    # Outputs of the media stage, next to the original in the candidate folder
+    proxy_filename = db.Column(db.String(200), nullable=True)
+    poster_filename = db.Column(db.String(200), nullable=True)
+    audio_filename = db.Column(db.String(200), nullable=True)
+    __table_args__ = (db.Index('uq_video_candidate_question', 'candidate_id', 'question_index', unique=True),)
+
+# Materialized per-candidate totals for room ranking/analytics. Rows are rewritten on commit whenever
+# a candidate's answers, grades or questions change (see refresh_candidate_summaries), so ranking a
+# room is an indexed scan instead of parsing every candidate's questions and summing grades in Python.
+class CandidateSummary(db.Model):
+    candidate_id = db.Column(db.String(36), primary_key=True)  # no FK: rows are deleted with their candidate below
+    room_id = db.Column(db.String(4), nullable=False)
+    questions = db.Column(db.Integer, nullable=False, default=0)
+    answered = db.Column(db.Integer, nullable=False, default=0)
+    graded = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Float, nullable=False, default=0.0)
+    score_pct = db.Column(db.Float, nullable=False, default=0.0)  # total / (questions * 10): unanswered questions count as 0
+    updated_at = db.Column(db.DateTime, default=datetime.now)
+    __table_args__ = (db.Index('ix_summary_room_score', 'room_id', 'score_pct'),)
+
+# In-progress chunked upload of one answer; bytes go to a .part file next to the final video
+class UploadSession(db.Model):
+    id = db.Column(db.String(36), primary_key=True)
+    candidate_id = db.Column(db.String(36), db.ForeignKey('candidate.id'), nullable=False, index=True)
+    question_index = db.Column(db.Integer, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)
+    ref_id = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='queued')  # queued | running | done | failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=JOB_MAX_ATTEMPTS)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+        db.Index('ix_job_kind_ref', 'kind', 'ref_id'),
+    )
 
 
 @event.listens_for(Candidate, 'after_delete')
 def delete_candidate_files(mapper, connection, target):
+    # Queue the folder in the same transaction: files go only after the delete commits (a rollback
+    # drops the job too), in batches on a job worker instead of inside the request
     if target.folder_path:
-        folder_to_delete = os.path.join(app.config['UPLOAD_FOLDER'], target.folder_path)
-        if os.path.exists(folder_to_delete):
-            try:
-                shutil.rmtree(folder_to_delete)
-                print(f"🗑️ Đã xóa sạch folder: {folder_to_delete}")
-            except Exception as e:
-                print(f"⚠️ Lỗi xóa folder: {e}")
+        connection.execute(Job.__table__.insert().values(kind='delete_files', ref_id=target.folder_path))
+        _job_wakeup.set()
+
+def is_graded(video):
+    # SQL condition: an answer with a usable grade (failed gradings keep the marker summary and score 0)
+    return and_(video.ai_summary != '', video.ai_summary != GRADING_FAILED_SUMMARY)
+
+def has_grade(v):
+    # is_graded for a loaded Video
+    return bool(v.ai_summary) and v.ai_summary != GRADING_FAILED_SUMMARY
+
+def refresh_candidate_summaries(conn, cids):
+    # Recompute summary rows for these candidates with one grouped aggregate per chunk
+    cids = list(cids)
+    for i in range(0, len(cids), 500):
+        chunk = cids[i:i + 500]
+        graded = is_graded(Video)
+        totals = {cid: (answered, graded_n or 0, score or 0.0) for cid, answered, graded_n, score in conn.execute(
+            select(Video.candidate_id, func.count(Video.id), func.sum(case((graded, 1), else_=0)),
+                   func.sum(case((graded, Video.ai_score), else_=0.0)))
+            .where(Video.candidate_id.in_(chunk)).group_by(Video.candidate_id))}
+        cands = conn.execute(select(Candidate.id, Candidate.room_id, Candidate.personal_questions, Candidate.extra_questions)
+                             .where(Candidate.id.in_(chunk))).all()
+        rooms = {r.id: r for r in conn.execute(select(Interview.id, Interview.created_at, Interview.base_questions)
+                                               .where(Interview.id.in_({c.room_id for c in cands})))}
+        rows = []
+        for cid, room_id, personal, extras in cands:
+            count = len(question_list(rooms[room_id], personal, extras)) if room_id in rooms else 0
+            answered, graded_n, score = totals.get(cid, (0, 0, 0.0))
+            rows.append({'candidate_id': cid, 'room_id': room_id, 'questions': count, 'answered': answered, 'graded': graded_n,
+                         'total_score': round(score, 2), 'score_pct': round(score / (count * 10) * 100, 2) if count else 0.0,
+                         'updated_at': datetime.now()})
+        conn.execute(delete(CandidateSummary).where(CandidateSummary.candidate_id.in_(chunk)))
+        if rows: conn.execute(insert(CandidateSummary), rows)
+
+@event.listens_for(db.session, 'after_flush')
+def collect_summary_changes(session, flush_context):
+    changed = session.info.setdefault('summary_cids', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Video):
+            state = db.inspect(obj)
+            if obj in session.new or obj in session.deleted or state.attrs.ai_score.history.has_changes() \
+                    or state.attrs.ai_summary.history.has_changes():
+                changed.add(obj.candidate_id)
+        elif isinstance(obj, Candidate) and (obj in session.new or obj in session.deleted
+                                             or db.inspect(obj).attrs.personal_questions.history.has_changes()
+                                             or db.inspect(obj).attrs.extra_questions.history.has_changes()):
+            changed.add(obj.id)
+
+@event.listens_for(db.session, 'before_commit')
+def write_summaries(session):
+    session.flush()
+    cids = session.info.pop('summary_cids', None)
+    if cids: refresh_candidate_summaries(session.connection(), cids)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def drop_summary_changes(session, previous_transaction):
+    session.info.pop('summary_cids', None)
+
+# A room's questions are stored once (interview.base_questions) and parsed once per process;
+# candidates only store their CV extras. The cache entry is checked against created_at because
+# 4-character room codes can be reused after a room is deleted.
+_room_questions = LRUCache(maxsize=ROOM_QUESTION_CACHE_SIZE)
+_room_questions_lock = threading.Lock()
+
+def room_questions(room):
+    # `room`: an Interview or any row with id, created_at and base_questions. The list is shared: don't mutate it
+    with _room_questions_lock: hit = _room_questions.get(room.id)
+    if hit and hit[0] == room.created_at:
+        ROOM_QUESTION_CACHE.inc(result='hit')
+        return hit[1]
+    ROOM_QUESTION_CACHE.inc(result='miss')
+    questions = json.loads(room.base_questions) if room.base_questions else []
+    with _room_questions_lock: _room_questions[room.id] = (room.created_at, questions)
+    return questions
+
+@event.listens_for(Interview, 'after_update')
+@event.listens_for(Interview, 'after_delete')
+def forget_room_questions(mapper, connection, target):
+    with _room_questions_lock: _room_questions.pop(target.id, None)
+
+def question_list(room, personal, extras):
+    if personal: return json.loads(personal)  # rows the migration couldn't split keep their own copy
+    return room_questions(room) + (json.loads(extras) if extras else [])
+
+def candidate_questions(cand):
+    return question_list(cand.interview_room, cand.personal_questions, cand.extra_questions)
+
+def add_candidate_questions(cand, questions):
+    # Appended after the existing ones, so indexes of already-recorded answers stay valid
+    if cand.personal_questions: cand.personal_questions = json.dumps(json.loads(cand.personal_questions) + questions)
+    else: cand.extra_questions = json.dumps((json.loads(cand.extra_questions) if cand.extra_questions else []) + questions)
 
 # ================= AI LOGIC =================
 
-def clean_json_text(text):
-    try:
-        text = text.replace('```json', '').replace('```', '').strip()
-        start, end = text.find('['), text.rfind(']') + 1
-        if start != -1 and end != -1: return json.loads(text[start:end])
-        start, end = text.find('{'), text.rfind('}') + 1
-        if start != -1 and end != -1: return json.loads(text[start:end])
-        return json.loads(text)
-    except: return None
+def ai_generate(op, contents, **kwargs):
+    # Reply text from the provider, under the limiter; waiting for a slot is timed as the 'queue' stage
+    start = time.perf_counter()
+    with ai_limiter.slot():
+        observe_ai(op, 'queue', time.perf_counter() - start)
+        with ai_stage(op, 'generate'): return ai_provider.generate(op, contents, **kwargs)
+
+def ai_upload(op, paths):
+    try: return upload_many_and_wait(ai_provider, paths, "video/webm", deadline=GEMINI_FILE_DEADLINE, limiter=ai_limiter,
+                                     observe=lambda stage, seconds: observe_ai(op, stage, seconds))
+    except Exception as e:
+        AI_ERRORS.inc(op=op, stage='wait_active' if isinstance(e, (FileProcessingTimeout, FileProcessingFailed)) else 'upload')
+        raise
+
+def ai_structured(op, contents, schema, check=None, **kwargs):
+    # One generate_content validated against `schema` (ai_schemas). An unusable reply is re-asked with the
+    # same contents plus the validation error, so uploaded videos are reused rather than re-uploaded.
+    contents, note = contents if isinstance(contents, list) else [contents], None
+    for attempt in range(AI_REPAIR_RETRIES + 1):
+        reply = ai_generate(op, contents + [note] if note else contents, **kwargs)
+        try:
+            with ai_stage(op, 'parse'):
+                value = schema.parse(reply)
+                if check: check(value)
+        except AIOutputError as e:
+            error, note = e, f"Your previous reply could not be used ({e}). Reply again with only the JSON in the requested format."
+            print(f"⚠️ {op}: invalid AI reply ({e})" + (", asking again" if attempt < AI_REPAIR_RETRIES else ""))
+            continue
+        if attempt: AI_REASKS.inc(op=op, outcome='fixed')
+        return value
+    if AI_REPAIR_RETRIES: AI_REASKS.inc(op=op, outcome='gave_up')
+    raise error
 
 def ai_generate_questions_with_criteria(job_title, count=5):
     print(f"🤖 AI Generating {count} Q&A for {job_title}...")
-    try:
+    def generate():
         prompt = f"""
         Role: Senior Recruiter. Task: Create exactly {count} interview questions for "{job_title}".
         For each question, define a specific "Scoring Criteria" (what to look for in the answer).
@@ -118,62 +461,105 @@ def ai_generate_questions_with_criteria(job_title, count=5):
             {{ "question": "Question 2 text...", "criteria": "Criteria for Q2..." }}
         ]
         """
-        response = model.generate_content(prompt)
-        data = clean_json_text(response.text)
-        return data[:count] if isinstance(data, list) else []
+        return ai_structured('questions', prompt, QUESTIONS, generation_config={"response_mime_type": "application/json"})[:count]
+    try:
+        return ai_cache.get_or_compute('questions', (ai_provider.name, job_title.strip().lower(), count), generate)
     except Exception as e:
         print(f"❌ AI Gen Error: {e}")
         return [{"question": "Tell us about yourself.", "criteria": "Confidence, clarity, and relevance."}]
 
 def ai_generate_cv_questions(cv_text, job_title):
-    try:
+    def generate():
         prompt = f"""
         Role: {job_title}. CV Excerpt: "{cv_text[:3000]}..."
         Generate 2 specific questions based on this CV. Include criteria.
         Output JSON: [{{ "question": "...", "criteria": "..." }}, ...]
         """
-        response = model.generate_content(prompt)
-        data = clean_json_text(response.text)
-        return data[:2] if isinstance(data, list) else []
-    except: return []
+        return ai_structured('cv_questions', prompt, QUESTIONS, generation_config={"response_mime_type": "application/json"})[:2]
+    return ai_cache.get_or_compute('cv_questions', (ai_provider.name, cv_text[:3000], job_title), generate)
 
-def ai_grade_single_video(video_path, question, criteria):
-    if not os.path.exists(video_path): return {"score": 0, "summary": "Video missing."}
-    try:
+# Raises on AI/transport errors (or a reply still invalid after re-asking) so the job queue can retry with backoff.
+def ai_grade_single_video(video_path, question, criteria, refresh=False):
+    if not video_path or not os.path.exists(video_path): return {"score": 0, "summary": "Video missing."}
+    def generate():
         print(f"🤖 Grading: {question[:30]}...")
-        # Upload file lên Gemini
-        video_file = genai.upload_file(path=video_path, mime_type="video/webm")
-        
-        # Retry logic for processing
-        for _ in range(10): 
-            time.sleep(2)
-            video_file = genai.get_file(video_file.name)
-            if video_file.state.name == "ACTIVE": break
-            if video_file.state.name == "FAILED": raise ValueError("Video failed")
-        
-        prompt = f"""
-        Role: Interviewer. 
-        Question: "{question}"
-        Criteria: "{criteria}"
-        
-        Task: Watch the video.
-        1. If silent/no answer: Score 0.
-        2. Evaluate based on Criteria.
-        
-        Output JSON: {{ "summary": "Feedback...", "score": 8.5 }}
-        """
-        response = model.generate_content([video_file, prompt], generation_config={"response_mime_type": "application/json"})
-        try: genai.delete_file(video_file.name)
-        except: pass
-        parsed = clean_json_text(response.text)
-        return parsed if parsed else {"score": 0, "summary": "AI Error: Invalid format"}
-    except Exception as e:
-        print(f"❌ Grading Error: {e}")
-        return {"score": 0, "summary": "AI Error. Please check manually."}
+        # Upload file lên Gemini, then wait (with backoff) until it is ACTIVE; raises on FAILED/timeout
+        uploaded = ai_upload('grade', [video_path])[0]
+        video_file = uploaded.file
+        print(f"📎 {video_file.name} ACTIVE after {uploaded.waited:.2f}s")
+        try:
+            prompt = f"""
+            Role: Interviewer. 
+            Question: "{question}"
+            Criteria: "{criteria}"
+            
+            Task: Watch the video.
+            1. If silent/no answer: Score 0.
+            2. Evaluate based on Criteria.
+            
+            Output JSON: {{ "summary": "Feedback...", "score": 8.5 }}
+            """
+            return ai_structured('grade', [video_file, prompt], GRADE, generation_config={"response_mime_type": "application/json"})
+        finally:
+            try: ai_provider.delete_file(video_file.name)
+            except: pass
+    return ai_cache.get_or_compute('grade', (ai_provider.name, file_sha256(video_path), question, criteria), generate, refresh=refresh)
 
-def ai_generate_overall_report(candidate_name, role, qa_results):
-    print("🤖 Generating Overall Report...")
+BATCH_GRADE_SCHEMA = {"type": "array", "items": {"type": "object", "properties": {
+    "index": {"type": "integer"}, "score": {"type": "number"}, "summary": {"type": "string"}},
+    "required": ["index", "score", "summary"]}}
+
+def ai_grade_video_batch(items, refresh=False):
+    # items: [(video_path, question, criteria)], possibly from several candidates. Cached answers are
+    # skipped (all are graded again with `refresh`); the rest share one upload round and one
+    # generate_content call. Raises if the reply still doesn't validate.
+    keys = [(ai_provider.name, file_sha256(p), q, c) if p and os.path.exists(p) else None for p, q, c in items]
+    results = [None if k and refresh else ai_cache.peek('grade', k) if k else {"score": 0, "summary": "Video missing."} for k in keys]
+    todo = [i for i, r in enumerate(results) if r is None]
+    if not todo: return results
+    print(f"🤖 Batch grading {len(todo)} answers...")
+    uploads = ai_upload('grade_batch', [items[i][0] for i in todo])
     try:
+        parts = []
+        for n, (i, up) in enumerate(zip(todo, uploads), 1):
+            parts += [f'Answer {n} - Question: "{items[i][1]}" Criteria: "{items[i][2]}"', up.file]
+        parts.append(f"""
+            Role: Interviewer. Above are {len(todo)} answer videos, each after its question and criteria.
+
+            Task: Watch every video and grade it on its own.
+            1. If silent/no answer: Score 0.
+            2. Evaluate based on that answer's Criteria.
+
+            Output a JSON array with exactly {len(todo)} items: {{ "index": <answer number>, "summary": "Feedback...", "score": 8.5 }}
+            """)
+        def every_answer(grades):
+            missing = sorted(set(range(1, len(todo) + 1)) - {grade['index'] for grade in grades})
+            if missing: raise AIOutputError(f"no grade for answer {', '.join(map(str, missing))}")
+        parsed = ai_structured('grade_batch', parts, BATCH_GRADES, check=every_answer, generation_config={
+            "response_mime_type": "application/json", "response_schema": BATCH_GRADE_SCHEMA})
+    finally:
+        for up in uploads:
+            try: ai_provider.delete_file(up.file.name)
+            except: pass
+    by_index = {grade['index']: grade for grade in parsed}
+    for i, grade in zip(todo, (by_index[n] for n in range(1, len(todo) + 1))):
+        results[i] = {"score": grade['score'], "summary": grade['summary']}
+        ai_cache.put('grade', keys[i], results[i])
+    return results
+
+def ai_grade_videos(items, refresh=False):
+    # Returns one grade dict or exception per item; an unusable batch falls back to per-video grading
+    try: return ai_grade_video_batch(items, refresh)
+    except Exception as e: print(f"⚠️ Batch grading failed ({e}), grading {len(items)} answers one by one")
+    results = []
+    for item in items:
+        try: results.append(ai_grade_single_video(*item, refresh=refresh))
+        except Exception as e: results.append(e)
+    return results
+
+def ai_generate_overall_report(candidate_name, role, qa_results):
+    def generate():
+        print("🤖 Generating Overall Report...")
         summary_text = f"Candidate: {candidate_name}\nRole: {role}\n\nPerformance:\n"
         for res in qa_results:
             summary_text += f"- Q: {res['question']}\n  Score: {res['score']}\n  Feedback: {res['summary']}\n\n"
@@ -190,20 +576,441 @@ def ai_generate_overall_report(candidate_name, role, qa_results):
         
         Output JSON Only.
         """
-        response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-        return json.loads(response.text)
-    except Exception as e:
-        print(f"❌ Overall Report Error: {e}")
-        return None
+        return ai_structured('report', prompt, OVERALL_REPORT, generation_config={"response_mime_type": "application/json"})
+    return ai_cache.get_or_compute('report', (ai_provider.name, candidate_name, role, qa_results), generate)
 
-def extract_text_from_pdf(path):
+def extract_text_from_pdf(path, limit=5000):
+    start, pages = time.perf_counter(), 0
     try:
         reader = PyPDF2.PdfReader(path)
-        return "".join([p.extract_text() for p in reader.pages])[:5000]
+        parts, total = [], 0
+        # Stop reading pages once the character budget is reached
+        for p in reader.pages:
+            text = p.extract_text() or ""
+            pages += 1
+            parts.append(text)
+            total += len(text)
+            if total >= limit: break
+        return "".join(parts)[:limit]
     except: return ""
+    finally:
+        PDF_EXTRACT_SECONDS.observe(time.perf_counter() - start)
+        PDF_PAGES.inc(pages)
+
+# ================= JOB QUEUE =================
+# Jobs live in the DB so any process can pick them up and nothing is lost on restart.
+# A handler receives the job's ref_id and only stages changes; run_job commits them
+# together with the job status. Batched handlers receive the claimed Job itself plus a
+# list to which they add every other job they claim, and settle (and commit) them all;
+# if one raises, run_job rolls back and settles every claimed job with the error.
+
+JOB_HANDLERS = {}
+_job_wakeup = threading.Event()
+_job_threads = []
+_cleanup = {'next': 0.0, 'lock': threading.Lock()}
+
+def job_handler(kind, on_give_up=None, batched=False):
+    def register(fn):
+        JOB_HANDLERS[kind] = (fn, on_give_up, batched)
+        return fn
+    return register
+
+def enqueue_job(kind, ref_id, delay=0):
+    ref_id = str(ref_id)
+    run_after = datetime.now() + timedelta(seconds=delay)
+    job = Job.query.filter_by(kind=kind, ref_id=ref_id, status='queued').first()
+    if job: job.run_after, job.attempts = run_after, 0
+    else: db.session.add(Job(kind=kind, ref_id=ref_id, run_after=run_after))
+    _job_wakeup.set()
+
+def claim_job():
+    now = datetime.now()
+    claimable = or_(
+        and_(Job.status == 'queued', Job.run_after <= now),
+        # Worker died mid-job: take it over once the lease expires
+        and_(Job.status == 'running', Job.locked_at < now - timedelta(seconds=JOB_LEASE_SECONDS)),
+    )
+    while True:
+        job = Job.query.filter(claimable).order_by(Job.run_after, Job.id).first()
+        if not job: return None
+        if try_claim_job(job.id, claimable, now): return db.session.get(Job, job.id)
+
+def try_claim_job(job_id, condition, now):
+    claimed = Job.query.filter(Job.id == job_id, condition).update(
+        {'status': 'running', 'locked_at': now, 'attempts': Job.attempts + 1}, synchronize_session=False)
+    db.session.commit()
+    return claimed == 1
+
+def settle_job(job, error=None):
+    if error is None:
+        job.status, job.last_error = 'done', None
+        JOB_RESULTS.inc(kind=job.kind, outcome='done')
+        return
+    job.last_error = str(error)[:1000]
+    if job.attempts >= job.max_attempts:
+        print(f"❌ Job {job.kind}:{job.ref_id} gave up after {job.attempts} attempts: {error}")
+        job.status = 'failed'
+        JOB_RESULTS.inc(kind=job.kind, outcome='failed')
+        on_give_up = JOB_HANDLERS[job.kind][1]
+        # The job is failed either way; a broken hook must not leave it running
+        try:
+            if on_give_up: on_give_up(job.ref_id)
+        except Exception as e: print(f"❌ Job {job.kind}:{job.ref_id} give-up hook failed: {e}")
+    else:
+        delay = JOB_BACKOFF_SECONDS * 2 ** (job.attempts - 1) * random.uniform(0.8, 1.2)
+        print(f"⚠️ Job {job.kind}:{job.ref_id} failed ({error}), retry in {delay:.0f}s")
+        JOB_RESULTS.inc(kind=job.kind, outcome='retry')
+        job.status, job.run_after = 'queued', datetime.now() + timedelta(seconds=delay)
+
+def run_job(job):
+    run, _, batched = JOB_HANDLERS[job.kind]
+    kind, job_id = job.kind, job.id
+    span_start('job', kind=kind, job=job_id, ref=job.ref_id, attempt=job.attempts)
+    try:
+        claimed = [job]
+        try:
+            if batched: run(job, claimed)
+            else:
+                run(job.ref_id)
+                settle_job(job)
+        except Exception as e:
+            db.session.rollback()
+            ids = [j.id for j in claimed] if batched else [job_id]
+            for j in Job.query.filter(Job.id.in_(ids), Job.status == 'running'): settle_job(j, e)
+        db.session.commit()
+    finally:
+        timing = span_end()
+        if timing: JOB_SECONDS.observe(timing[0], kind=kind)
+
+def purge_jobs(batch=1000):
+    # Deleted in batches of ids so a large backlog never holds the write lock for long
+    now, removed = datetime.now(), 0
+    for status, days in (('done', JOB_KEEP_DONE_DAYS), ('failed', JOB_KEEP_FAILED_DAYS)):
+        expired = and_(Job.status == status, func.coalesce(Job.locked_at, Job.created_at) < now - timedelta(days=days))
+        while True:
+            ids = [i for (i,) in db.session.query(Job.id).filter(expired).limit(batch)]
+            if not ids: break
+            removed += Job.query.filter(Job.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+    return removed
+
+def purge_upload_sessions():
+    # Chunked uploads never finalized (tab closed, candidate gave up)
+    stale = UploadSession.query.filter(UploadSession.created_at < datetime.now() - timedelta(hours=UPLOAD_SESSION_TTL_HOURS)).all()
+    for up in stale:
+        cand = db.session.get(Candidate, up.candidate_id)
+        if cand: discard_upload_session(cand, up)
+        else: db.session.delete(up)
+    db.session.commit()
+    return len(stale)
+
+def maybe_cleanup():
+    # At most once per JOB_PURGE_INTERVAL per process, by whichever worker is idle first
+    with _cleanup['lock']:
+        if time.monotonic() < _cleanup['next']: return
+        _cleanup['next'] = time.monotonic() + JOB_PURGE_INTERVAL
+    jobs, uploads = purge_jobs(), purge_upload_sessions()
+    if jobs or uploads: print(f"🧹 Purged {jobs} finished jobs, {uploads} abandoned uploads")
+
+def job_worker_loop():
+    while True:
+        job = None
+        try:
+            with app.app_context():
+                job = claim_job()
+                if job: run_job(job)
+                else: maybe_cleanup()
+        except Exception as e:
+            print(f"❌ Job worker error: {e}")
+        if not job:
+            _job_wakeup.wait(JOB_POLL_SECONDS)
+            _job_wakeup.clear()
+
+def start_job_workers(count=JOB_WORKERS):
+    if _job_threads: return
+    for n in range(count):
+        t = threading.Thread(target=job_worker_loop, name=f"job-worker-{n}", daemon=True)
+        t.start()
+        _job_threads.append(t)
+    print(f"✅ Started {count} job workers")
+
+def storage_key(cand, filename):
+    return f"{cand.folder_path}/{filename}" if cand.folder_path else filename
+
+def grading_key(cand, v):
+    # Grade the small proxy when the media stage made one
+    if v.proxy_filename and storage.exists(storage_key(cand, v.proxy_filename)): return storage_key(cand, v.proxy_filename)
+    return storage_key(cand, v.filename)
+
+def grade_stored_video(key, question, criteria, refresh=False):
+    try:
+        with storage.local_copy(key) as path: return ai_grade_single_video(path, question, criteria, refresh)
+    except FileNotFoundError: return ai_grade_single_video(None, question, criteria)
+
+def grade_stored_videos(items, refresh=False):
+    with ExitStack() as stack:
+        local = []
+        for key, question, criteria in items:
+            try: path = stack.enter_context(storage.local_copy(key))
+            except FileNotFoundError: path = None
+            local.append((path, question, criteria))
+        return ai_grade_videos(local, refresh)
+
+def media_enabled():
+    return any(MEDIA_STAGES.values()) and media.available
+
+def transcode_give_up(video_id):
+    # Better to grade the original recording than not at all
+    enqueue_job('grade_video', video_id)
+
+@job_handler('transcode_video', on_give_up=transcode_give_up)
+def transcode_video_job(video_id):
+    v = db.session.get(Video, int(video_id))
+    if not v: return
+    span_tag(cid=v.candidate_id, room=v.candidate.room_id)
+    key, base = storage_key(v.candidate, v.filename), os.path.splitext(v.filename)[0]
+    with storage.local_copy(key) as src, tempfile.TemporaryDirectory(prefix='.media_', dir=app.config['UPLOAD_FOLDER']) as tmp:
+        start, size_in = time.time(), os.path.getsize(src)
+        done = media.process(src, {stage: os.path.join(tmp, base + MEDIA_OUTPUT_SUFFIX[stage]) for stage, on in MEDIA_STAGES.items() if on})
+        names = {stage: os.path.basename(path) for stage, path in done.items()}
+        v.proxy_filename, v.poster_filename, v.audio_filename = names.get('proxy'), names.get('poster'), names.get('audio')
+        size_out = os.path.getsize(done['proxy']) if 'proxy' in done else size_in
+        print(f"🎞️ {v.filename}: {size_in / 1e6:.1f}MB -> {size_out / 1e6:.1f}MB ({', '.join(names)}) in {time.time() - start:.1f}s")
+        if 'proxy' in done and not MEDIA_KEEP_ORIGINAL:
+            # The proxy becomes the stored recording; content_hash stays the upload's for register_video
+            v.proxy_filename, v.media_hash = None, file_sha256(done['proxy'])
+            storage.put_file(key, done.pop('proxy'))
+        for path in done.values(): storage.put_file(storage_key(v.candidate, os.path.basename(path)), path)
+    enqueue_job('grade_video', v.id)
+
+GRADING_FAILED_SUMMARY = "AI Error. Please check manually."
+
+def grade_video_give_up(video_id):
+    v = db.session.get(Video, int(video_id))
+    if v:
+        v.ai_score, v.ai_summary = 0, GRADING_FAILED_SUMMARY
+        refresh_overall_report(v.candidate)
+
+def claim_sibling_grading_jobs(job):
+    # Pull in the candidate's other due answers so they are graded together
+    v = db.session.get(Video, int(job.ref_id))
+    if not v: return []
+    now = datetime.now()
+    video_ids = [str(vid) for (vid,) in db.session.query(Video.id).filter(Video.candidate_id == v.candidate_id)]
+    due = and_(Job.kind == 'grade_video', Job.status == 'queued', Job.run_after <= now)
+    siblings = Job.query.filter(due, Job.ref_id.in_(video_ids), Job.id != job.id).all()
+    return [db.session.get(Job, j.id) for j in siblings if try_claim_job(j.id, due, now)]
+
+def grading_item(v):
+    q_data = candidate_questions(v.candidate)[v.question_index]
+    return grading_key(v.candidate, v), q_data['question'], q_data.get('criteria', '')
+
+def grade_in_pool(videos, mode=None, batch_size=None, refresh=False):
+    # AI calls run on the shared grading pool (bounded by ai_limiter); yields (video, grade or exception).
+    # `refresh` grades again instead of reusing cached grades
+    mode, batch_size = mode or GRADING_MODE, batch_size or GRADING_BATCH_SIZE
+    items = []
+    for v in videos:
+        # e.g. an answer index past the candidate's questions: fail that answer only
+        try: items.append((v, grading_item(v)))
+        except Exception as e: yield v, e
+    if mode == 'batch':
+        chunks = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        futs = [(chunk, grading_pool.submit(grade_stored_videos, [item for _, item in chunk], refresh)) for chunk in chunks]
+        for chunk, fut in futs:
+            try: grades = fut.result()
+            except Exception as e: grades = [e] * len(chunk)
+            yield from zip((v for v, _ in chunk), grades)
+        return
+    futs = [(v, grading_pool.submit(grade_stored_video, *item, refresh)) for v, item in items]
+    for v, fut in futs:
+        try: yield v, fut.result()
+        except Exception as e: yield v, e
+
+@job_handler('grade_video', on_give_up=grade_video_give_up, batched=True)
+def grade_video_jobs(job, claimed):
+    # DB writes stay on this thread
+    claimed += claim_sibling_grading_jobs(job)
+    by_video = {}
+    for job in claimed:
+        v = db.session.get(Video, int(job.ref_id))
+        if v: by_video[v.id] = job
+        else: settle_job(job)
+    graded = {}
+    for v, ai_out in grade_in_pool([db.session.get(Video, vid) for vid in by_video]):
+        if isinstance(ai_out, Exception):
+            settle_job(by_video[v.id], ai_out)
+            continue
+        v.ai_score, v.ai_summary = ai_out.get('score', 0), ai_out.get('summary', '')
+        settle_job(by_video[v.id])
+        span_tag(cid=v.candidate_id, room=v.candidate.room_id)
+        graded[v.candidate_id] = v.candidate
+    for cand in graded.values(): refresh_overall_report(cand)
+    db.session.commit()
+
+# The overall analysis depends on every answer's grade: it is rebuilt in the background
+# whenever the hash of those grades differs from the one it was generated from
+def overall_report_inputs(cand, videos=None):
+    questions = candidate_questions(cand)
+    graded = sorted((v for v in (cand.videos if videos is None else videos)
+                     if has_grade(v) and v.question_index < len(questions)), key=lambda v: v.question_index)
+    if not questions or len(graded) != len(questions): return None, None
+    qa = [{"question": questions[v.question_index]['question'], "score": v.ai_score, "summary": v.ai_summary} for v in graded]
+    return qa, content_key('report', cand.name, cand.interview_room.field, qa)
+
+def refresh_overall_report(cand):
+    _, inputs_hash = overall_report_inputs(cand)
+    if inputs_hash and inputs_hash != cand.overall_inputs_hash: enqueue_job('overall_report', cand.id)
+
+@job_handler('overall_report')
+def overall_report_job(cid):
+    cand = db.session.get(Candidate, cid)
+    if not cand: return
+    span_tag(cid=cid, room=cand.room_id)
+    qa, inputs_hash = overall_report_inputs(cand)
+    if not inputs_hash or inputs_hash == cand.overall_inputs_hash: return
+    cand.overall_analysis = json.dumps(ai_generate_overall_report(cand.name, cand.interview_room.field, qa))
+    cand.overall_inputs_hash = inputs_hash
+
+# CV ingestion runs in stages after check-in: cv_extract (PDF -> text) then cv_questions (text -> AI questions)
+def cv_give_up(cid):
+    cand = db.session.get(Candidate, cid)
+    if cand: cand.cv_status = 'failed'
+
+@job_handler('cv_extract', on_give_up=cv_give_up)
+def cv_extract_job(cid):
+    cand = db.session.get(Candidate, cid)
+    if not cand or not cand.cv_filename: return
+    span_tag(cid=cid, room=cand.room_id)
+    with storage.local_copy(storage_key(cand, cand.cv_filename)) as path:
+        cand.cv_text = extract_text_from_pdf(path, CV_TEXT_BUDGET)
+    if cand.cv_text: enqueue_job('cv_questions', cid)
+    else: cand.cv_status = 'done'
+
+@job_handler('cv_questions', on_give_up=cv_give_up)
+def cv_questions_job(cid):
+    cand = db.session.get(Candidate, cid)
+    if not cand or cand.cv_status != 'pending': return
+    span_tag(cid=cid, room=cand.room_id)
+    add_candidate_questions(cand, [{"question": q['question'], "criteria": q['criteria'] or "Based on CV verification."}
+                                   for q in ai_generate_cv_questions(cand.cv_text, cand.interview_room.field)])
+    cand.cv_status = 'done'
+
+# Deleted candidates' folders (queued by delete_candidate_files), removed many at a time
+@job_handler('delete_files', batched=True)
+def delete_files_jobs(job, claimed):
+    now = datetime.now()
+    due = and_(Job.kind == 'delete_files', Job.status == 'queued', Job.run_after <= now)
+    more = Job.query.filter(due, Job.id != job.id).order_by(Job.id).limit(STORAGE_DELETE_BATCH - 1).all()
+    claimed += [db.session.get(Job, j.id) for j in more if try_claim_job(j.id, due, now)]
+    try:
+        storage.delete_prefixes([j.ref_id for j in claimed])
+        if not storage.local:
+            # Chunked uploads staged under UPLOAD_FOLDER leave an empty folder behind
+            for j in claimed: shutil.rmtree(safe_join(app.config['UPLOAD_FOLDER'], j.ref_id) or '', ignore_errors=True)
+        for j in claimed: settle_job(j)
+        print(f"🗑️ Deleted files of {len(claimed)} candidates")
+    except Exception as e:
+        for j in claimed: settle_job(j, e)
+    db.session.commit()
+
+@app.cli.command('worker')
+def worker_command():
+    """Run background job workers in the foreground."""
+    start_job_workers()
+    threading.Event().wait()
+
+@app.cli.command('retention')
+@click.option('--days', default=RETENTION_ARCHIVE_DAYS, show_default=True, help='Archive interviews created more than this many days ago.')
+def retention_command(days):
+    """Move the files of old interviews to the archive storage tier."""
+    if storage.local and not storage.archive_root: raise click.ClickException("Set STORAGE_ARCHIVE_ROOT to archive local files")
+    cutoff = datetime.now() - timedelta(days=days)
+    rooms = Interview.query.filter(Interview.created_at < cutoff, Interview.storage_tier.is_(None)).order_by(Interview.created_at).all()
+    for room in rooms:
+        moved = sum(storage.archive_prefix(c.folder_path) for c in room.candidates if c.folder_path)
+        room.storage_tier = 'archive'
+        db.session.commit()
+        print(f"📦 Room {room.id}: archived {moved} files")
+    print(f"✅ Archived {len(rooms)} rooms older than {days} days")
+
+@app.cli.command('purge-jobs')
+def purge_jobs_command():
+    """Delete finished jobs past JOB_KEEP_DONE_DAYS / JOB_KEEP_FAILED_DAYS (workers also do this hourly)."""
+    print(f"✅ Purged {purge_jobs()} finished jobs")
+
+@app.cli.command('grade-room')
+@click.argument('room_id')
+@click.option('--regrade', is_flag=True, help='Also grade answers that already have a score (ignoring cached grades).')
+@click.option('--batch-size', default=GRADING_BATCH_SIZE, show_default=True, help='Answers per Gemini request.')
+def grade_room_command(room_id, regrade, batch_size):
+    """Grade every answer in an interview room now, batching answers across candidates."""
+    room = db.session.get(Interview, room_id.upper())
+    if not room: raise click.ClickException(f"Room {room_id} not found")
+    query = Video.query.join(Candidate).filter(Candidate.room_id == room.id)
+    if not regrade:
+        query = query.filter(or_(Video.ai_summary == '', Video.ai_summary.is_(None), Video.ai_summary == GRADING_FAILED_SUMMARY))
+    videos = query.order_by(Video.candidate_id, Video.question_index).all()
+    start, failed, done = time.time(), 0, []
+    for v, ai_out in grade_in_pool(videos, 'batch', batch_size, refresh=regrade):
+        if isinstance(ai_out, Exception):
+            failed += 1
+            print(f"❌ {v.candidate.email} Q{v.question_index + 1}: {ai_out}")
+            continue
+        v.ai_score, v.ai_summary = ai_out.get('score', 0), ai_out.get('summary', '')
+        done.append(v)
+    # Graded here, so queued jobs for these answers have nothing left to do
+    if done:
+        Job.query.filter(Job.kind == 'grade_video', Job.status == 'queued', Job.ref_id.in_([str(v.id) for v in done])) \
+            .update({'status': 'done'}, synchronize_session=False)
+    db.session.commit()
+    for cid in {v.candidate_id for v in done}:
+        try:
+            overall_report_job(cid)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Overall report for {cid}: {e}")
+    print(f"✅ Graded {len(done)}/{len(videos)} answers in room {room.id} ({failed} failed) in {time.time() - start:.1f}s")
 
 # ================= ROUTES =================
 
+@app.before_request
+def request_span():
+    # Candidate pages carry cid/room in the session, recruiter pages in the URL (or via span_tag)
+    if request.endpoint == 'metrics': return
+    args = request.view_args or {}
+    span_start('request', method=request.method, endpoint=request.endpoint, cid=args.get('cid') or session.get('cid'),
+               room=args.get('room_id') or session.get('room_id'))
+    g.profiler = None
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        g.profiler = cProfile.Profile()
+        try: g.profiler.enable()
+        except ValueError: g.profiler = None  # another profiler is already active in this process
+
+@app.after_request
+def record_request(resp):
+    endpoint = request.endpoint or 'unmatched'
+    profile = None
+    if g.get('profiler'):
+        g.profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile = os.path.join(PROFILE_DIR, f"{datetime.now():%Y%m%d_%H%M%S_%f}_{endpoint}.prof")
+        g.profiler.dump_stats(profile)
+        g.profiler = None
+    timing = span_end(status=resp.status_code, profile=profile)
+    if timing:
+        REQUEST_SECONDS.observe(timing[0], endpoint=endpoint, method=request.method)
+        REQUEST_DB_QUERIES.observe(timing[1], endpoint=endpoint)
+    REQUESTS.inc(endpoint=endpoint, method=request.method, status=resp.status_code)
+    return resp
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus scrape endpoint; counters are per process (see README)
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}": abort(403)
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/')
 def home(): return render_template('home.html')
 
@@ -269,74 +1076,223 @@ def recruiter_dashboard():
             recruiter_id=session['user_id'], 
             field=field, 
             base_questions=json.dumps(final_qs),
-            created_at=datetime.now().strftime("%Y-%m-%d %H:%M")
+            question_count=len(final_qs),
+            created_at=datetime.now()
         ))
         db.session.commit()
         return redirect(url_for('recruiter_dashboard'))
 
-    my_interviews = Interview.query.filter_by(recruiter_id=session['user_id']).order_by(Interview.created_at.desc()).all()
+    page = request.args.get('page', 1, type=int)
+    data, pagination = build_dashboard_data(session['user_id'], page)
+    return render_template('recruiter_dashboard.html', data=data, pagination=pagination, recruiter_name=session.get('name'))
+
+@app.route('/api/dashboard')
+def recruiter_dashboard_api():
+    if session.get('role') != 'recruiter': return jsonify({"status": "error"}), 403
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', DASHBOARD_PER_PAGE, type=int), 100)
+    data, pagination = build_dashboard_data(session['user_id'], page, per_page)
+    return jsonify({"interviews": data, "page": pagination.page, "pages": pagination.pages, "total": pagination.total})
+
+@app.route('/api/media/stats')
+def media_stats_api():
+    # Per-process counters: read them from the process that runs the job workers
+    if not session.get('user_id'): return jsonify({"status": "error"}), 403
+    return jsonify({"ffmpeg": media.available, "stages": {s: on for s, on in MEDIA_STAGES.items()}, "stats": media.stats.stats()})
+
+# Constant number of queries per page: room count + room page + one grouped candidate/video-count query
+def build_dashboard_data(recruiter_id, page=1, per_page=None):
+    pagination = Interview.query.filter_by(recruiter_id=recruiter_id).order_by(Interview.created_at.desc()) \
+        .paginate(page=page, per_page=per_page or DASHBOARD_PER_PAGE, error_out=False)
+    rooms = pagination.items
+
+    cands_by_room = {i.id: [] for i in rooms}
+    if rooms:
+        rows = db.session.query(Candidate.id, Candidate.name, Candidate.email, Candidate.room_id, func.count(Video.id)) \
+            .outerjoin(Video, Video.candidate_id == Candidate.id) \
+            .filter(Candidate.room_id.in_(list(cands_by_room))) \
+            .group_by(Candidate.id).order_by(Candidate.room_id, Candidate.name).all()
+        for cid, name, email, room_id, count in rows:
+            cands_by_room[room_id].append({"id": cid, "name": name, "email": email, "count": count})
+
     dashboard_data = []
-    for i in my_interviews:
-        cands = Candidate.query.filter_by(room_id=i.id).all()
-        cand_list = [{"id": c.id, "name": c.name, "email": c.email, "count": Video.query.filter_by(candidate_id=c.id).count()} for c in cands]
-        
-        try: q_len = len(json.loads(i.base_questions))
-        except: q_len = 0
-            
-        dashboard_data.append({"id": i.id, "field": i.field, "date": i.created_at, "question_count": q_len, "candidates": cand_list})
-        
-    return render_template('recruiter_dashboard.html', data=dashboard_data, recruiter_name=session.get('name'))
+    for i in rooms:
+        date = i.created_at.strftime("%Y-%m-%d %H:%M") if i.created_at else ""
+        dashboard_data.append({"id": i.id, "field": i.field, "date": date, "question_count": i.question_count or 0, "candidates": cands_by_room[i.id]})
+    return dashboard_data, pagination
+
+# --- ROOM RANKING & ANALYTICS (from candidate_summary, aggregated in SQL) ---
+RANKING_SORTS = {
+    'score': (CandidateSummary.score_pct.desc(), CandidateSummary.total_score.desc()),
+    'completion': ((CandidateSummary.answered * 1.0 / func.nullif(CandidateSummary.questions, 0)).desc(), CandidateSummary.score_pct.desc()),
+    'name': (Candidate.name,),
+}
+RANKING_COLUMNS = ['rank', 'id', 'name', 'email', 'questions', 'answered', 'graded', 'total_score', 'max_score',
+                   'score_pct', 'avg_score', 'completion_pct']
+
+def room_for_user(room_id):
+    room = db.session.get(Interview, room_id.upper())
+    if not room or (session.get('role') != 'manager' and room.recruiter_id != session.get('user_id')): abort(404)
+    return room
+
+def heal_room_summaries(room):
+    # Candidates from before summaries existed get their rows on first use
+    missing = [cid for (cid,) in db.session.query(Candidate.id).outerjoin(CandidateSummary, CandidateSummary.candidate_id == Candidate.id)
+               .filter(Candidate.room_id == room.id, CandidateSummary.candidate_id.is_(None))]
+    if missing:
+        refresh_candidate_summaries(db.session.connection(), missing)
+        db.session.commit()
+
+def ranking_query(room, sort):
+    S = CandidateSummary
+    return select(S.candidate_id, Candidate.name, Candidate.email, S.questions, S.answered, S.graded, S.total_score, S.score_pct) \
+        .join(Candidate, Candidate.id == S.candidate_id).where(S.room_id == room.id) \
+        .order_by(*RANKING_SORTS.get(sort, RANKING_SORTS['score']), S.candidate_id)
+
+def ranking_row(rank, row):
+    cid, name, email, questions, answered, graded, total, pct = row
+    return {"rank": rank, "id": cid, "name": name, "email": email, "questions": questions, "answered": answered, "graded": graded,
+            "total_score": total, "max_score": questions * 10, "score_pct": pct,
+            "avg_score": round(total / graded, 2) if graded else None,
+            "completion_pct": round(answered / questions * 100, 1) if questions else 0.0}
+
+def build_room_analytics(room):
+    S, graded = CandidateSummary, is_graded(Video)
+    count, completed, fully_graded, avg_pct, max_pct = db.session.execute(
+        select(func.count(), func.sum(case((and_(S.questions > 0, S.answered >= S.questions), 1), else_=0)),
+               func.sum(case((and_(S.questions > 0, S.graded >= S.questions), 1), else_=0)), func.avg(S.score_pct), func.max(S.score_pct))
+        .where(S.room_id == room.id)).one()
+    # Score % distribution in 10-point buckets (100% goes into the top one). CASE rather than CAST/FLOOR, which
+    # round differently (or are missing) across databases; grouped by the alias so the CASE's binds aren't repeated
+    pct_bucket = case(*[(S.score_pct < (b + 1) * 10, b) for b in range(9)], else_=9).label('bucket')
+    pct_buckets = [0] * 10
+    for bucket, n in db.session.execute(select(pct_bucket, func.count()).where(S.room_id == room.id).group_by(text('bucket'))):
+        pct_buckets[bucket] = n
+    # Candidates with CV questions have more of them: question N only counts candidates who were asked it
+    asked = db.session.execute(select(S.questions, func.count()).where(S.room_id == room.id).group_by(S.questions)).all()
+
+    in_room = Video.candidate_id.in_(select(Candidate.id).where(Candidate.room_id == room.id))
+    per_question = {idx: {"index": idx, "answered": answered, "graded": graded_n or 0, "avg_score": round(avg, 2) if avg is not None else None,
+                          "min_score": lo, "max_score": hi, "distribution": [0] * 11}
+                    for idx, answered, graded_n, avg, lo, hi in db.session.execute(
+                        select(Video.question_index, func.count(Video.id), func.sum(case((graded, 1), else_=0)),
+                               func.avg(case((graded, Video.ai_score))), func.min(case((graded, Video.ai_score))), func.max(case((graded, Video.ai_score))))
+                        .where(in_room).group_by(Video.question_index))}
+    score_bucket = case(*[(Video.ai_score < b + 1, b) for b in range(10)], else_=10).label('bucket')
+    for idx, bucket, n in db.session.execute(select(Video.question_index, score_bucket, func.count())
+                                             .where(in_room, graded).group_by(Video.question_index, text('bucket'))):
+        per_question[idx]["distribution"][bucket] = n
+
+    base = room_questions(room)
+    questions = []
+    for idx in range(max([q for q, _ in asked] + [i + 1 for i in per_question], default=0)):
+        item = per_question.get(idx) or {"index": idx, "answered": 0, "graded": 0, "avg_score": None, "min_score": None, "max_score": None,
+                                         "distribution": [0] * 11}
+        eligible = sum(n for q, n in asked if q > idx)
+        item.update(question=base[idx]['question'] if idx < len(base) else f"CV question {idx - len(base) + 1}", candidates=eligible,
+                    completion_pct=round(item["answered"] / eligible * 100, 1) if eligible else 0.0)
+        questions.append(item)
+    return {"room": room.id, "field": room.field, "candidates": count, "completed": completed or 0, "fully_graded": fully_graded or 0,
+            "completion_pct": round((completed or 0) / count * 100, 1) if count else 0.0,
+            "avg_score_pct": round(avg_pct, 2) if avg_pct is not None else None, "max_score_pct": max_pct,
+            "score_pct_distribution": pct_buckets, "questions": questions}
+
+@app.route('/api/rooms/<room_id>/ranking')
+def room_ranking_api(room_id):
+    if not session.get('user_id'): return jsonify({"status": "error"}), 403
+    room = room_for_user(room_id)
+    heal_room_summaries(room)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', RANKING_PER_PAGE, type=int), 1), 500)
+    sort = request.args.get('sort', 'score')
+    total = db.session.scalar(select(func.count()).select_from(CandidateSummary).where(CandidateSummary.room_id == room.id))
+    rows = db.session.execute(ranking_query(room, sort).limit(per_page).offset((page - 1) * per_page)).all()
+    return jsonify({"room": room.id, "sort": sort if sort in RANKING_SORTS else 'score', "page": page, "per_page": per_page, "total": total,
+                    "candidates": [ranking_row((page - 1) * per_page + n, r) for n, r in enumerate(rows, 1)]})
+
+@app.route('/api/rooms/<room_id>/analytics')
+def room_analytics_api(room_id):
+    if not session.get('user_id'): return jsonify({"status": "error"}), 403
+    room = room_for_user(room_id)
+    heal_room_summaries(room)
+    return jsonify(build_room_analytics(room))
+
+def csv_cell(value):
+    # Keep spreadsheet apps from evaluating candidate-supplied text as a formula
+    return "'" + value if isinstance(value, str) and value[:1] in ('=', '+', '-', '@') else value
+
+@app.route('/api/rooms/<room_id>/ranking.csv')
+def room_ranking_csv(room_id):
+    if not session.get('user_id'): return redirect(url_for('login'))
+    room = room_for_user(room_id)
+    heal_room_summaries(room)
+    query = ranking_query(room, request.args.get('sort', 'score')).execution_options(yield_per=1000)
+
+    def generate():
+        # Rows are fetched and written in chunks, so memory stays flat for any room size
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        buf.write('\ufeff')  # BOM: Excel opens UTF-8 (Vietnamese names) correctly
+        writer.writerow(RANKING_COLUMNS)
+        for n, row in enumerate(db.session.execute(query), 1):
+            item = ranking_row(n, row)
+            writer.writerow([csv_cell(item[c]) for c in RANKING_COLUMNS])
+            if buf.tell() > 64 * 1024:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename=room_{room.id}_ranking.csv'})
 
 @app.route('/report/<cid>')
 def view_report(cid):
     if not session.get('user_id'): return redirect(url_for('login'))
     cand = db.session.get(Candidate, cid)
     room = db.session.get(Interview, cand.room_id)
+    span_tag(room=cand.room_id)
     
-    questions_data = json.loads(cand.personal_questions)
+    questions_data = candidate_questions(cand)
     videos = Video.query.filter_by(candidate_id=cand.id).all()
     
     results = {}
     total_score = 0
-    qa_results_for_ai = []
+    pending = False
     
     for v in videos:
-        # --- UPDATE: Đường dẫn vật lý đầy đủ để AI đọc ---
-        # Nếu là dữ liệu cũ (chưa có folder_path), fallback về thư mục gốc (tùy chọn)
-        folder = cand.folder_path if cand.folder_path else ""
-        video_full_path = os.path.join(app.config['UPLOAD_FOLDER'], folder, v.filename)
-        
-        # --- UPDATE: Đường dẫn web để hiển thị HTML ---
-        # Sử dụng forward slash cho URL: folder/filename
-        web_path = f"{folder}/{v.filename}" if folder else v.filename
+        item = {"url": media_url(cand, v),
+                "poster": media_url(cand, v, v.poster_filename) if v.poster_filename else None,
+                "audio": media_url(cand, v, v.audio_filename) if v.audio_filename else None}
 
+        # Grading happens in the job queue; ungraded answers are shown as pending
         if v.ai_score == 0 and not v.ai_summary:
-            q_data = questions_data[v.question_index]
-            ai_out = ai_grade_single_video(
-                video_full_path, 
-                q_data['question'], 
-                q_data.get('criteria', '')
-            )
-            v.ai_score, v.ai_summary = ai_out.get('score', 0), ai_out.get('summary', '')
-            db.session.commit()
+            pending = True
+            results[str(v.question_index)] = dict(item, score=None, summary="", pending=True)
+            continue
         
-        results[str(v.question_index)] = {"score": v.ai_score, "summary": v.ai_summary, "file": web_path}
+        results[str(v.question_index)] = dict(item, score=v.ai_score, summary=v.ai_summary, pending=False)
         total_score += v.ai_score
-        qa_results_for_ai.append({
-            "question": questions_data[v.question_index]['question'],
-            "score": v.ai_score,
-            "summary": v.ai_summary
-        })
-
-    overall = None
-    if len(videos) == len(questions_data):
-        if not cand.overall_analysis:
-            overall = ai_generate_overall_report(cand.name, room.field, qa_results_for_ai)
-            if overall:
-                cand.overall_analysis = json.dumps(overall)
-                db.session.commit()
-        else:
-            overall = json.loads(cand.overall_analysis)
+
+    if pending:
+        # Older rows uploaded before the queue existed have no job yet
+        active = {j.ref_id for j in Job.query.filter(Job.kind.in_(['transcode_video', 'grade_video']), Job.status.in_(['queued', 'running']),
+                                                      Job.ref_id.in_([str(v.id) for v in videos])).all()}
+        missing = [v for v in videos if not v.ai_summary and v.ai_score == 0 and str(v.id) not in active]
+        for v in missing: enqueue_job('grade_video', v.id)
+        if missing: db.session.commit()
+
+    # Never call the AI here: show the stored analysis and flag it while a newer one is queued
+    overall = json.loads(cand.overall_analysis) if cand.overall_analysis else None
+    _, inputs_hash = overall_report_inputs(cand, videos)
+    overall_stale = bool(cand.overall_analysis) and inputs_hash != cand.overall_inputs_hash
+    overall_updating = False
+    if inputs_hash and inputs_hash != cand.overall_inputs_hash:
+        jobs = Job.query.filter(Job.kind == 'overall_report', Job.ref_id == cand.id, Job.status != 'done').all()
+        # Grades stored before reports were generated in the background have no job yet
+        if not jobs:
+            enqueue_job('overall_report', cand.id)
+            db.session.commit()
+        overall_updating = not jobs or any(j.status in ('queued', 'running') for j in jobs)
 
     return render_template('report.html', 
                           candidate=cand, 
@@ -345,7 +1301,10 @@ def view_report(cid):
                           total=round(total_score,1), 
                           max=len(questions_data)*10, 
                           questions=questions_data, 
-                          overall=overall)
+                          overall=overall,
+                          overall_stale=overall_stale,
+                          overall_updating=overall_updating,
+                          pending=pending)
 
 # --- CANDIDATE FLOW ---
 @app.route('/candidate', methods=['GET', 'POST'])
@@ -360,11 +1319,7 @@ def candidate_portal():
         
         # Check duplicate
         exist = Candidate.query.filter_by(room_id=rid, email=email).first()
-        if exist:
-            if exist.name.lower() == raw_name.lower():
-                session['cid'] = exist.id
-                return redirect(url_for('candidate_review'))
-            else: return render_template('candidate_portal.html', error="Email already used by another name!")
+        if exist: return resume_candidate(exist, raw_name)
 
         # --- UPDATE: Tạo cấu trúc Folder DD_MM_YYYY_HH_mm_user ---
         vn_tz = pytz.timezone('Asia/Bangkok')
@@ -373,38 +1328,20 @@ def candidate_portal():
         if not safe_name: safe_name = "user"
         
         user_folder_name = f"{timestamp}_{safe_name}"
-        full_folder_path = os.path.join(app.config['UPLOAD_FOLDER'], user_folder_name)
-        os.makedirs(full_folder_path, exist_ok=True)
         # --------------------------------------------------------
 
-        # CV Handle
+        # CV Handle: only save it here; text extraction and CV questions run in the background
         cv_file = request.files.get('cv_file')
-        cv_text = ""
         cv_name = None
         if cv_file and cv_file.filename:
             # Lưu CV vào folder con với tên chuẩn
             ext = cv_file.filename.rsplit('.', 1)[1].lower() if '.' in cv_file.filename else 'pdf'
             cv_name = f"CV.{ext}"
-            cv_path = os.path.join(full_folder_path, cv_name)
-            cv_file.save(cv_path)
-            cv_text = extract_text_from_pdf(cv_path)
-
-        # Merge Questions
-        base_qs = json.loads(room.base_questions)
-        final_qs = base_qs.copy()
-        
-        if cv_text:
-            cv_qs = ai_generate_cv_questions(cv_text, room.field)
-            for q in cv_qs:
-                if isinstance(q, str): 
-                    final_qs.append({"question": q, "criteria": "Based on CV verification."})
-                elif isinstance(q, dict):
-                    final_qs.append(q)
+            storage.save(f"{user_folder_name}/{cv_name}", cv_file.stream)
 
         cid = str(uuid.uuid4())
-        session['cid'] = cid
         
-        # Lưu folder_path vào DB
+        # Questions come from the room; CV questions are added as extras when ready
         db.session.add(Candidate(
             id=cid, 
             room_id=rid, 
@@ -412,29 +1349,49 @@ def candidate_portal():
             email=email, 
             folder_path=user_folder_name, # <-- Cột mới
             cv_filename=cv_name, 
-            personal_questions=json.dumps(final_qs)
+            cv_status='pending' if cv_name else None
         ))
-        db.session.commit()
+        if cv_name: enqueue_job('cv_extract', cid)
+        try: db.session.commit()
+        except IntegrityError:
+            # The same email checked in concurrently (uq_candidate_room_email): continue as that candidate.
+            # The CV saved above stays: a double submit shares that candidate's folder name
+            db.session.rollback()
+            exist = Candidate.query.filter_by(room_id=rid, email=email).first()
+            if not exist: raise
+            return resume_candidate(exist, raw_name)
+        session['cid'], session['room_id'] = cid, rid
+        span_tag(cid=cid, room=rid)
         return redirect(url_for('interview_room'))
     return render_template('candidate_portal.html')
 
+def resume_candidate(exist, raw_name):
+    if exist.name.lower() != raw_name.lower(): return render_template('candidate_portal.html', error="Email already used by another name!")
+    session['cid'], session['room_id'] = exist.id, exist.room_id
+    span_tag(cid=exist.id, room=exist.room_id)
+    return redirect(url_for('candidate_review'))
+
 @app.route('/interview')
 def interview_room():
     if not session.get('cid'): return redirect(url_for('candidate_portal'))
     cand = db.session.get(Candidate, session.get('cid'))
-    qs_data = json.loads(cand.personal_questions)
-    simple_qs = [q['question'] for q in qs_data]
-    return render_template('interview.html', questions=simple_qs)
+    simple_qs = [q['question'] for q in candidate_questions(cand)]
+    return render_template('interview.html', questions=simple_qs, cv_pending=cand.cv_status == 'pending')
+
+@app.route('/interview/questions')
+def interview_questions():
+    cand = db.session.get(Candidate, session.get('cid') or '')
+    if not cand: return jsonify({"status": "error"}), 400
+    return jsonify({"status": "success", "questions": [q['question'] for q in candidate_questions(cand)], "cv_status": cand.cv_status})
 
 @app.route('/candidate/review')
 def candidate_review():
     if not session.get('cid'): return redirect(url_for('home'))
     cand = db.session.get(Candidate, session.get('cid'))
     videos = Video.query.filter_by(candidate_id=cand.id).all()
-    v_dict = {str(v.question_index): v.filename for v in videos}
+    v_dict = {str(v.question_index): media_url(cand, v) for v in videos}
     
-    qs_data = json.loads(cand.personal_questions)
-    simple_qs = [q['question'] for q in qs_data]
+    simple_qs = [q['question'] for q in candidate_questions(cand)]
     
     return render_template('candidate_review.html', candidate=cand, questions=simple_qs, videos=v_dict)
 
@@ -443,9 +1400,9 @@ def upload_video():
     cid = session.get('cid')
     if not cid: return jsonify({"status": "error"}), 400
     file = request.files['video']
-    idx = request.form.get('question_index')
-    
     cand = db.session.get(Candidate, cid)
+    idx = answer_index(cand, request.form.get('question_index')) if cand else None
+    if idx is None: return jsonify({"status": "error", "message": "Invalid question_index"}), 400
 
     if file and cand:
         # --- UPDATE: Lưu vào folder riêng với tên ngắn gọn ---
@@ -453,24 +1410,174 @@ def upload_video():
         fname = f"Q{int(idx) + 1}.webm"
         
         # Đường dẫn: uploads/FOLDER_USER/Q1.webm
-        save_path = os.path.join(app.config['UPLOAD_FOLDER'], cand.folder_path, fname)
-        file.save(save_path)
-        
-        exist = Video.query.filter_by(candidate_id=cid, question_index=int(idx)).first()
-        if exist: 
-            exist.filename = fname
-            exist.ai_score = 0 
-            exist.ai_summary = ""
-        else: db.session.add(Video(candidate_id=cid, question_index=int(idx), filename=fname))
-        
+        fd, tmp_path = tempfile.mkstemp(suffix='.part', dir=app.config['UPLOAD_FOLDER'])
+        os.close(fd)
+        file.save(tmp_path)
+        content_hash = file_sha256(tmp_path)
+        storage.put_file(storage_key(cand, fname), tmp_path)
+        register_video(cand, idx, fname, content_hash)
         db.session.commit()
         return jsonify({"status": "success"})
     return jsonify({"status": "error"}), 500
 
+def register_video(cand, idx, fname, content_hash):
+    exist = Video.query.filter_by(candidate_id=cand.id, question_index=idx).first()
+    if exist and exist.content_hash == content_hash and exist.ai_summary and exist.ai_summary != GRADING_FAILED_SUMMARY:
+        # Identical bytes re-uploaded: keep the existing grade. They were just stored again over any proxy.
+        exist.media_hash = None
+        return exist
+    if exist: 
+        exist.filename = fname
+        exist.ai_score = 0 
+        exist.ai_summary = ""
+        exist.content_hash, exist.media_hash = content_hash, None
+        exist.proxy_filename = exist.poster_filename = exist.audio_filename = None
+    else:
+        try:
+            with db.session.begin_nested():
+                exist = Video(candidate_id=cand.id, question_index=idx, filename=fname, content_hash=content_hash)
+                db.session.add(exist)
+        except IntegrityError:
+            # Another request registered this answer first (uq_video_candidate_question); only the
+            # savepoint is rolled back, so update that row instead
+            return register_video(cand, idx, fname, content_hash)
+    db.session.flush()
+    enqueue_job('transcode_video' if media_enabled() else 'grade_video', exist.id)
+    return exist
+
+# --- Resumable chunked upload: init -> PUT chunks at byte offsets -> finalize ---
+def upload_part_path(cand, up):
+    # Local staging, whatever the storage backend; moved into storage on finalize
+    # Legacy candidates without a folder keep their files at the root (see storage_key)
+    return os.path.join(app.config['UPLOAD_FOLDER'], cand.folder_path or '', f".Q{up.question_index + 1}.{up.id}.part")
+
+def answer_index(cand, value):
+    # The question an answer is for, or None if it isn't one of the candidate's questions
+    try: idx = int(value)
+    except (TypeError, ValueError): return None
+    return idx if 0 <= idx < len(candidate_questions(cand)) else None
+
+def get_upload_session(upload_id):
+    up = db.session.get(UploadSession, upload_id)
+    if not up or up.candidate_id != session.get('cid'): return None, None
+    return up, db.session.get(Candidate, up.candidate_id)
+
+def discard_upload_session(cand, up):
+    try: os.remove(upload_part_path(cand, up))
+    except FileNotFoundError: pass
+    db.session.delete(up)
+
+@app.route('/upload/init', methods=['POST'])
+def upload_init():
+    cand = db.session.get(Candidate, session.get('cid') or '')
+    if not cand: return jsonify({"status": "error"}), 400
+    idx = answer_index(cand, (request.get_json(silent=True) or request.form).get('question_index'))
+    if idx is None: return jsonify({"status": "error", "message": "Invalid question_index"}), 400
+    # A new recording of the same question replaces any unfinished one
+    for old in UploadSession.query.filter_by(candidate_id=cand.id, question_index=idx).all():
+        discard_upload_session(cand, old)
+    up = UploadSession(id=str(uuid.uuid4()), candidate_id=cand.id, question_index=idx)
+    db.session.add(up)
+    db.session.commit()
+    os.makedirs(os.path.dirname(upload_part_path(cand, up)), exist_ok=True)
+    open(upload_part_path(cand, up), 'wb').close()
+    return jsonify({"status": "success", "upload_id": up.id, "offset": 0, "max_chunk": UPLOAD_MAX_CHUNK_BYTES})
+
+@app.route('/upload/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    up, cand = get_upload_session(upload_id)
+    if not up: return jsonify({"status": "error", "message": "Unknown upload"}), 404
+    return jsonify({"status": "success", "offset": up.received})
+
+@app.route('/upload/<upload_id>/chunk', methods=['PUT'])
+def upload_chunk(upload_id):
+    up, cand = get_upload_session(upload_id)
+    if not up: return jsonify({"status": "error", "message": "Unknown upload"}), 404
+    offset = request.args.get('offset', type=int)
+    # Client is out of sync (lost response, retry): tell it where to continue from
+    if offset != up.received: return jsonify({"status": "conflict", "offset": up.received}), 409
+    if (request.content_length or 0) > UPLOAD_MAX_CHUNK_BYTES: return jsonify({"status": "error", "message": "Chunk too large"}), 413
+
+    expected = (request.headers.get('X-Chunk-SHA256') or '').lower()
+    digest, written = hashlib.sha256(), 0
+    part = upload_part_path(cand, up)
+    # The chunk goes to a file of its own first: the .part file is only touched by the request that owns the offset
+    fd, chunk_path = tempfile.mkstemp(suffix='.chunk', dir=os.path.dirname(part))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                block = request.stream.read(64 * 1024)
+                if not block: break
+                written += len(block)
+                if written > UPLOAD_MAX_CHUNK_BYTES: return jsonify({"status": "error", "message": "Chunk too large"}), 413
+                digest.update(block)
+                f.write(block)
+        if expected and digest.hexdigest() != expected:
+            return jsonify({"status": "error", "message": "Checksum mismatch", "offset": offset}), 422
+
+        # One request wins the offset; its UPDATE holds the row (the write lock on SQLite) until the
+        # commit, so concurrent chunks can't append to the .part file at the same time
+        claimed = UploadSession.query.filter_by(id=up.id, received=offset).update({'received': offset + written})
+        if not claimed:
+            db.session.rollback()
+            return jsonify({"status": "conflict", "offset": db.session.get(UploadSession, upload_id).received}), 409
+        with open(chunk_path, 'rb') as src, open(part, 'r+b') as dst:
+            dst.seek(offset)
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+            dst.truncate()  # drop bytes left behind by an attempt that died before its commit
+        db.session.commit()
+    finally:
+        os.remove(chunk_path)
+    return jsonify({"status": "success", "offset": offset + written})
+
+@app.route('/upload/<upload_id>/finalize', methods=['POST'])
+def upload_finalize(upload_id):
+    up, cand = get_upload_session(upload_id)
+    if not up: return jsonify({"status": "error", "message": "Unknown upload"}), 404
+    size = (request.get_json(silent=True) or {}).get('size')
+    if size is not None:
+        try: size = int(size)
+        except (TypeError, ValueError): return jsonify({"status": "error", "message": "Invalid size"}), 400
+        if size != up.received: return jsonify({"status": "conflict", "offset": up.received}), 409
+    if not up.received: return jsonify({"status": "error", "message": "Empty upload"}), 400
+
+    idx = up.question_index
+    fname = f"Q{idx + 1}.webm"
+    content_hash = file_sha256(upload_part_path(cand, up))
+    storage.put_file(storage_key(cand, fname), upload_part_path(cand, up))
+    db.session.delete(up)
+    register_video(cand, idx, fname, content_hash)
+    db.session.commit()
+    return jsonify({"status": "success"})
+
 # --- UPDATE: Serve file từ folder con (Nested paths) ---
+def media_url(cand, v, filename=None):
+    # Sử dụng forward slash cho URL: folder/filename; ?v= changes whenever the bytes do
+    return url_for('uploaded_file', filename=storage_key(cand, filename or v.filename), v=(v.media_hash or v.content_hash or '')[:12] or None)
+
 @app.route('/uploads/<path:filename>')
 def uploaded_file(filename): 
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    # Versioned URLs never change content, so players may cache them (and their ranges) for long
+    max_age = MEDIA_MAX_AGE if request.args.get('v') else 0
+    if not safe_join(app.config['UPLOAD_FOLDER'], filename): abort(404)
+    if not storage.local:
+        # Object storage serves the bytes (and ranges) itself through a short-lived signed URL
+        return redirect(storage.url(filename, MEDIA_URL_EXPIRES))
+    path = storage.path(filename)
+    if not path: abort(404)
+    if MEDIA_SERVE_MODE == 'x-accel' and path == storage.hot_path(filename):
+        resp = app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        resp.headers['X-Accel-Redirect'] = f"{MEDIA_ACCEL_PREFIX.rstrip('/')}/{filename}"
+    else:
+        # Range/206 and ETag/Last-Modified conditionals are handled by send_file; with
+        # X-Sendfile the front server answers ranges itself. nginx only maps the hot root, so archived files stream from here.
+        resp = send_file(os.path.abspath(path), max_age=max_age, conditional=MEDIA_SERVE_MODE != 'x-sendfile')
+    resp.cache_control.public = False
+    resp.cache_control.private = True
+    resp.cache_control.max_age = max_age
+    if max_age: resp.cache_control.immutable = True
+    else: resp.cache_control.no_cache = True
+    return resp
 
 @app.route('/logout')
 def logout(): session.clear(); return redirect(url_for('home'))
@@ -478,9 +1585,30 @@ def logout(): session.clear(); return redirect(url_for('home'))
 def init_db():
     with app.app_context():
         db.create_all()
+        migrate(db.engine, db.metadata)
         if not User.query.filter_by(role='manager').first():
             db.session.add(User(username='manager', password_hash=generate_password_hash('admin123'), full_name='System Admin', role='manager'))
             db.session.commit()
             print("✅ DB Init Success")
 
-if __name__ == '__main__': init_db(); app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+@app.cli.command('migrate')
+def migrate_command():
+    """Create missing tables and apply pending schema migrations."""
+    init_db()
+
+def create_app(config=None, migrate_db=None, start_workers=None):
+    """Production entry point (wsgi.py). This module holds a single app configured from the environment
+    at import; `config` is applied on top of it (Flask settings such as SECRET_KEY or MAX_CONTENT_LENGTH;
+    the database and storage are already bound). Migrates unless MIGRATE_ON_START=0, which gunicorn.conf.py
+    sets for its workers after migrating once in the master. Then optionally runs job workers in this
+    process: with several web processes, leave START_JOB_WORKERS off and run `flask worker` separately."""
+    if config: app.config.update(config)
+    if migrate_db if migrate_db is not None else os.getenv('MIGRATE_ON_START', '1') != '0': init_db()
+    if start_workers if start_workers is not None else os.getenv('START_JOB_WORKERS') == '1': start_job_workers()
+    return app
+
+if __name__ == '__main__':
+    init_db()
+    # Debug reloader runs this file twice; only the serving child gets workers
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true': start_job_workers()
+    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""Seed a large synthetic recruiter workspace and check that /dashboard and
+/api/dashboard stay at a constant query count and acceptable latency.
+
+    python benchmarks/bench_dashboard.py --rooms 200 --candidates 25
+"""
+import argparse, json, os, sys, tempfile, time, uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--candidates', type=int, default=25, help='candidates per room')
+    parser.add_argument('--videos', type=int, default=3, help='videos per candidate')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--max-queries', type=int, default=5)
+    parser.add_argument('--max-p50-ms', type=float, default=250)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='tf_bench_')
+    os.chdir(workdir)
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['SPAN_LOG'] = '0'
+    import app as tf
+    from sqlalchemy import event, insert
+
+    tf.init_db()
+    with tf.app.app_context():
+        recruiter = tf.User(username='bench', password_hash='x', role='recruiter', full_name='Bench')
+        tf.db.session.add(recruiter)
+        tf.db.session.commit()
+        qs = json.dumps([{"question": f"Q{n}", "criteria": "c"} for n in range(5)])
+        rooms, cands, videos = [], [], []
+        for r in range(args.rooms):
+            rid = f"{r:04X}"
+            rooms.append(dict(id=rid, recruiter_id=recruiter.id, field=f"Role {r}", base_questions=qs,
+                              question_count=5, created_at=datetime(2025, 1, 1) + timedelta(hours=r)))
+            for c in range(args.candidates):
+                cid = str(uuid.uuid4())
+                cands.append(dict(id=cid, room_id=rid, name=f"Cand {c}", email=f"c{c}@r{r}.test"))
+                videos += [dict(candidate_id=cid, question_index=q, filename=f"Q{q + 1}.webm") for q in range(args.videos)]
+        tf.db.session.execute(insert(tf.Interview), rooms)
+        tf.db.session.execute(insert(tf.Candidate), cands)
+        tf.db.session.execute(insert(tf.Video), videos)
+        tf.db.session.commit()
+        recruiter_id = recruiter.id
+        engine = tf.db.engine
+    print(f"Seeded {len(rooms)} rooms, {len(cands)} candidates, {len(videos)} videos")
+
+    queries = []
+    event.listen(engine, 'before_cursor_execute', lambda *a: queries.append(a[2]))
+
+    client = tf.app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'], s['role'], s['name'] = recruiter_id, 'recruiter', 'Bench'
+
+    failed = False
+    for path in ['/dashboard', '/dashboard?page=5', '/api/dashboard?per_page=100']:
+        timings, counts = [], []
+        for _ in range(args.runs):
+            queries.clear()
+            t = time.perf_counter()
+            resp = client.get(path)
+            timings.append((time.perf_counter() - t) * 1000)
+            counts.append(len(queries))
+            assert resp.status_code == 200, resp.status_code
+        timings.sort()
+        p50, p95 = timings[len(timings) // 2], timings[int(len(timings) * 0.95) - 1]
+        print(f"{path:32s} queries={max(counts):3d}  p50={p50:7.1f}ms  p95={p95:7.1f}ms")
+        if max(counts) > args.max_queries or p50 > args.max_p50_ms:
+            failed = True
+    if failed:
+        print(f"FAIL: expected <= {args.max_queries} queries and p50 <= {args.max_p50_ms}ms")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""Drive the whole interview flow over HTTP against the fake AI provider: a recruiter
+creates rooms (AI questions), candidates check in with a CV PDF at the given concurrency,
+wait for their CV questions, upload every answer and open the review page. Once the job
+queue drains, the recruiter opens the dashboard, the rankings and every report.
+Reports throughput, latency percentiles per step, grading drain time and AI calls per
+operation (read from /metrics).
+
+By default the app runs in-process on a threaded server with a fresh SQLite DB,
+AI_PROVIDER=fake (the --latency/--processing/--*-rate options) and job workers in the
+same process. --url points at a running server started with AI_PROVIDER=fake and
+FAKE_AI_* settings instead, with job workers running (START_JOB_WORKERS=1 or
+`flask worker`). Failed AI calls are retried by the job queue with backoff, so error
+rates lengthen the drain.
+
+    python benchmarks/bench_flow.py --candidates 40 --concurrency 10 --questions 3
+"""
+import argparse, contextlib, io, logging, os, re, sys, tempfile, threading, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from load_upload import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+METRIC_LINE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+
+
+def cv_pdf(text):
+    # One page PDF with a line of text, enough for PyPDF2 extraction
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+               b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+               b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for n, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (n, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1) + b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+class Recorder:
+    def __init__(self):
+        self.samples, self.lock = {}, threading.Lock()
+
+    def call(self, step, method, *args, ok=(200,), **kwargs):
+        t = time.perf_counter()
+        try: resp = method(*args, allow_redirects=False, timeout=120, **kwargs)
+        except requests.RequestException: resp = None
+        with self.lock: self.samples.setdefault(step, []).append((time.perf_counter() - t, resp is not None and resp.status_code in ok))
+        return resp if resp is not None and resp.status_code in ok else None
+
+    def report(self):
+        print(f"{'step':22s} {'count':>6s} {'failed':>6s} {'p50 ms':>8s} {'p90 ms':>8s} {'p99 ms':>8s} {'max ms':>8s}")
+        for step, samples in self.samples.items():
+            ok = [d for d, good in samples if good]
+            print(f"{step:22s} {len(samples):6d} {len(samples) - len(ok):6d} {percentile(ok, 50) * 1000:8.1f} "
+                  f"{percentile(ok, 90) * 1000:8.1f} {percentile(ok, 99) * 1000:8.1f} {max(ok, default=0) * 1000:8.1f}")
+
+
+def scrape(base, token):
+    # {(metric name, label string): value} from /metrics
+    resp = requests.get(f"{base}/metrics", headers={'Authorization': f"Bearer {token}"} if token else {}, timeout=30)
+    resp.raise_for_status()
+    return {(m.group(1), m.group(2)): float(m.group(3)) for m in map(METRIC_LINE.match, resp.text.splitlines()) if m}
+
+
+def labels(label_string):
+    return dict(re.findall(r'(\w+)="([^"]*)"', label_string))
+
+
+def candidate(base, rec, room, n, questions, size, cv_wait):
+    with requests.Session() as http:
+        pdf = cv_pdf(f"Candidate {n} - 5 years of Python, Flask and SQL, led a team of {n % 7 + 2}")
+        if not rec.call('check-in', http.post, f"{base}/candidate", ok=(302,), data={'room_id': room, 'email': f"flow{n}@example.com",
+                        'name': f"Flow {n}"}, files={'cv_file': ('cv.pdf', pdf, 'application/pdf')}):
+            return
+        # Like the interview page: poll until the CV questions are appended (or give up waiting)
+        t, data = time.perf_counter(), None
+        while time.perf_counter() - t < cv_wait:
+            resp = rec.call('interview/questions', http.get, f"{base}/interview/questions")
+            data = resp.json() if resp else None
+            if data and data['cv_status'] != 'pending': break
+            time.sleep(0.25)
+        count = len(data['questions']) if data else questions
+        for idx in range(count):
+            rec.call('upload_video', http.post, f"{base}/upload_video", data={'question_index': idx},
+                     files={'video': ('blob.webm', os.urandom(size), 'video/webm')})
+        rec.call('candidate/review', http.get, f"{base}/candidate/review")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--candidates', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=10, help='candidates going through the flow at once')
+    parser.add_argument('--rooms', type=int, default=1)
+    parser.add_argument('--questions', type=int, default=3, help='AI questions per room')
+    parser.add_argument('--size-kb', type=int, default=64, help='size of each uploaded answer')
+    parser.add_argument('--cv-wait', type=float, default=30, help='seconds a candidate waits for CV questions')
+    parser.add_argument('--drain-timeout', type=float, default=300, help='seconds to wait for the job queue')
+    parser.add_argument('--latency', type=float, default=0.5, help='fake seconds per generate call')
+    parser.add_argument('--jitter', type=float, default=0.1, help='fake latency jitter (±seconds)')
+    parser.add_argument('--per-file', type=float, default=0.05, help='fake extra seconds per attached video')
+    parser.add_argument('--processing', type=float, default=0.5, help='fake seconds until an upload is ACTIVE')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of fake AI calls that raise')
+    parser.add_argument('--bad-reply-rate', type=float, default=0.0, help='share of fake replies that fail validation')
+    parser.add_argument('--file-fail-rate', type=float, default=0.0, help='share of fake uploads that end FAILED')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', help='test a running server (AI_PROVIDER=fake) instead of an in-process one')
+    parser.add_argument('--manager', default='manager:admin123', help='manager username:password on the server')
+    args = parser.parse_args()
+
+    if args.url:
+        base = args.url.rstrip('/')
+    else:
+        workdir = tempfile.mkdtemp(prefix='tf_flow_')
+        os.chdir(workdir)
+        os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'flow.db')}"
+        os.environ.update(AI_PROVIDER='fake', FAKE_AI_LATENCY=str(args.latency), FAKE_AI_JITTER=str(args.jitter),
+                          FAKE_AI_PER_FILE=str(args.per_file), FAKE_AI_PROCESSING=str(args.processing),
+                          FAKE_AI_ERROR_RATE=str(args.error_rate), FAKE_AI_BAD_REPLY_RATE=str(args.bad_reply_rate),
+                          FAKE_AI_FILE_FAIL_RATE=str(args.file_fail_rate), FAKE_AI_SEED=str(args.seed))
+        # Random bytes aren't video: grade the uploads as they are. No quota to respect with the fake.
+        for key, value in (('MEDIA_PROXY', '0'), ('MEDIA_POSTER', '0'), ('AI_REQUESTS_PER_MINUTE', '0'), ('SPAN_LOG', '0')):
+            os.environ.setdefault(key, value)
+        import app as tf
+        from werkzeug.serving import make_server
+
+        tf.init_db()
+        tf.start_job_workers()
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = make_server('127.0.0.1', 0, tf.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+    token = os.getenv('METRICS_TOKEN')
+    rec = Recorder()
+
+    # Recruiter account and rooms, created the way a manager and recruiter would
+    user, password = f"flow_{uuid.uuid4().hex[:8]}", uuid.uuid4().hex
+    manager_name, manager_password = args.manager.split(':', 1)
+    with requests.Session() as manager:
+        assert rec.call('login', manager.post, f"{base}/login", ok=(302,), data={'username': manager_name, 'password': manager_password})
+        assert rec.call('manager (add user)', manager.post, f"{base}/manager", ok=(302,),
+                        data={'username': user, 'password': password, 'fullname': 'Flow Bench'})
+    recruiter = requests.Session()
+    assert rec.call('login', recruiter.post, f"{base}/login", ok=(302,), data={'username': user, 'password': password})
+    before = scrape(base, token)
+    for r in range(args.rooms):
+        rec.call('create room', recruiter.post, f"{base}/dashboard", ok=(302,), data={'field': f"Backend Engineer {r}", 'mode': 'ai', 'count': args.questions})
+    rooms = [i['id'] for i in recruiter.get(f"{base}/api/dashboard", params={'per_page': 100}).json()['interviews']]
+    assert rooms, "no room was created"
+
+    print(f"{args.candidates} candidates over {len(rooms)} room(s), concurrency {args.concurrency}, {args.questions} questions + CV, "
+          f"{args.size_kb}KB answers" + ("" if args.url else f", fake AI latency {args.latency}s (+{args.per_file}s/video), "
+          f"processing {args.processing}s, error {args.error_rate}, bad reply {args.bad_reply_rate}, file fail {args.file_fail_rate}"))
+    # The app's progress prints (grading, uploads) would drown the results
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    quiet.__enter__()
+    t = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for f in [pool.submit(candidate, base, rec, rooms[n % len(rooms)], n, args.questions, args.size_kb * 1024, args.cv_wait)
+                  for n in range(args.candidates)]:
+            f.result()
+    flow_wall = time.perf_counter() - t
+    flow_requests = sum(len(s) for step, s in rec.samples.items() if step in ('check-in', 'interview/questions', 'upload_video', 'candidate/review'))
+
+    # Grading and reports run in the job queue: wait until nothing is queued or running
+    t, pending = time.perf_counter(), None
+    while time.perf_counter() - t < args.drain_timeout:
+        pending = sum(v for (name, ls), v in scrape(base, token).items()
+                      if name == 'talentflow_jobs' and labels(ls)['status'] in ('queued', 'running'))
+        if not pending: break
+        time.sleep(0.5)
+    drain = time.perf_counter() - t
+
+    cids = []
+    for room in rooms:
+        rec.call('dashboard', recruiter.get, f"{base}/dashboard")
+        page = 1
+        while True:
+            resp = rec.call('room ranking', recruiter.get, f"{base}/api/rooms/{room}/ranking", params={'page': page, 'per_page': 500})
+            rows = resp.json()['candidates'] if resp else []
+            cids += [row['id'] for row in rows]
+            if len(rows) < 500: break
+            page += 1
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(lambda cid: rec.call('report', recruiter.get, f"{base}/report/{cid}"), cids))
+    after = scrape(base, token)
+    quiet.__exit__(None, None, None)
+
+    print()
+    rec.report()
+    print(f"\ncandidate flow: {flow_requests} requests in {flow_wall:.2f}s, {flow_requests / flow_wall:.1f} req/s, "
+          f"{args.candidates / flow_wall * 60:.1f} candidates/min")
+    print(f"job queue drained {drain:.2f}s after the last upload" + (f" ({pending:.0f} jobs still pending)" if pending else ""))
+
+    def delta(name, *keys):
+        out = {}
+        for (n, ls), v in after.items():
+            if n != name: continue
+            key = tuple(labels(ls).get(k, '') for k in keys)
+            out[key] = out.get(key, 0) + v - before.get((n, ls), 0)
+        return out
+    calls, errors = delta('talentflow_ai_stage_seconds_count', 'op', 'stage'), delta('talentflow_ai_errors_total', 'op')
+    reasks = delta('talentflow_ai_reasks_total', 'op')
+    print(f"\n{'ai op':14s} {'generate':>9s} {'upload rounds':>13s} {'errors':>7s} {'reasks':>7s}")
+    for op in sorted({op for op, _ in calls}):
+        print(f"{op:14s} {calls.get((op, 'generate'), 0):9.0f} {calls.get((op, 'upload'), 0):13.0f} {errors.get((op,), 0):7.0f} "
+              f"{reasks.get((op,), 0):7.0f}")
+    outcomes = delta('talentflow_job_results_total', 'kind', 'outcome')
+    print("jobs: " + ', '.join(f"{kind} {outcome} {n:.0f}" for (kind, outcome), n in sorted(outcomes.items()) if n))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Compare per-video and batch grading against the fake AI provider: round trips
+(file uploads/polls/deletes + generate calls) and wall time for a whole room.
+
+The fake sleeps `--latency` per request plus `--per-video` per attached video,
+so batching saves the fixed per-request overhead. `--bad-reply-rate` makes that
+share of replies fail validation to show the re-ask and fallback cost.
+
+    python benchmarks/bench_grading.py --candidates 20 --questions 5 --batch-size 8
+"""
+import argparse, contextlib, io, json, os, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--candidates', type=int, default=20)
+    parser.add_argument('--questions', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.4, help='fake seconds per generate_content')
+    parser.add_argument('--per-video', type=float, default=0.05, help='fake extra seconds per attached video')
+    parser.add_argument('--processing', type=float, default=0.3, help='fake seconds until an upload is ACTIVE')
+    parser.add_argument('--bad-reply-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='tf_grading_')
+    os.chdir(workdir)
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    import app as tf
+    from ai_cache import make_cache
+    from ai_limiter import AILimiter
+    from ai_provider import FakeProvider
+
+    tf.init_db()
+    with tf.app.app_context():
+        qs = json.dumps([{"question": f"Q{n}", "criteria": "c"} for n in range(args.questions)])
+        tf.db.session.add(tf.Interview(id='BNCH', recruiter_id=1, field='Bench', base_questions=qs, question_count=args.questions))
+        for c in range(args.candidates):
+            cid = f"cand-{c}"
+            os.makedirs(os.path.join('uploads', cid), exist_ok=True)
+            tf.db.session.add(tf.Candidate(id=cid, room_id='BNCH', name=cid, email=f"{cid}@x", folder_path=cid))
+            for q in range(args.questions):
+                with open(os.path.join('uploads', cid, f"Q{q + 1}.webm"), 'wb') as f: f.write(os.urandom(256))
+                tf.db.session.add(tf.Video(candidate_id=cid, question_index=q, filename=f"Q{q + 1}.webm"))
+        tf.db.session.commit()
+
+    tf.ai_limiter = AILimiter(max_in_flight=4, per_minute=0)
+    answers = args.candidates * args.questions
+    print(f"{args.candidates} candidates x {args.questions} answers, pool={tf.grading_pool._max_workers}, "
+          f"latency={args.latency}s (+{args.per_video}s/video), processing={args.processing}s")
+    print(f"{'mode':26s} {'wall s':>8s} {'model':>6s} {'files':>6s} {'trips':>6s} {'trips/cand':>10s} {'failed':>7s}")
+    for label, mode, size in [('single', 'single', 1), (f'batch per candidate ({args.questions})', 'batch', args.questions),
+                              (f'batch across ({args.batch_size})', 'batch', args.batch_size)]:
+        tf.ai_cache = make_cache('off')
+        tf.ai_provider = FakeProvider(latency=args.latency, per_file=args.per_video, processing_seconds=args.processing,
+                                      bad_reply_rate=args.bad_reply_rate)
+        with tf.app.app_context():
+            videos = tf.Video.query.order_by(tf.Video.candidate_id, tf.Video.question_index).all()
+            t = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                failed = sum(isinstance(out, Exception) for _, out in tf.grade_in_pool(videos, mode, size))
+            wall = time.perf_counter() - t
+        model, files = sum(tf.ai_provider.generated.values()), sum(tf.ai_provider.calls.values())
+        print(f"{label:26s} {wall:8.2f} {model:6d} {files:6d} {model + files:6d} {(model + files) / args.candidates:10.1f} {failed:7d}")
+    print(f"({answers} answers per run)")
+
+
+if __name__ == '__main__':
+    main()
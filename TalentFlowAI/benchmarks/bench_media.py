@@ -0,0 +1,102 @@
+"""Compare Python worker occupancy for concurrent, seek-heavy video playback
+against /uploads/ in each media serving mode.
+
+Every "viewer" thread issues random HTTP Range requests (like a player scrubbing
+through a webm). A WSGI wrapper records how long each request keeps a worker
+busy, including streaming the body. In x-accel mode the bytes would be sent by
+nginx, so only the redirect response is timed here.
+
+    python benchmarks/bench_media.py --viewers 16 --seeks 40 --size-mb 50
+"""
+import argparse, logging, os, random, sys, tempfile, threading, time
+import requests
+from werkzeug.serving import make_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class Occupancy:
+    def __init__(self, app):
+        self.app, self.lock = app, threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.busy, self.requests, self.bytes, self.active, self.peak = 0.0, 0, 0, 0, 0
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        sent = 0
+        try:
+            for chunk in self.app(environ, start_response):
+                sent += len(chunk)
+                yield chunk
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.requests += 1
+                self.bytes += sent
+                self.busy += time.perf_counter() - start
+
+
+def viewer(base, path, size, seeks, range_kb, use_range, errors):
+    with requests.Session() as http:
+        for _ in range(seeks):
+            headers = {}
+            if use_range:
+                start = random.randrange(0, max(1, size - range_kb * 1024))
+                headers['Range'] = f"bytes={start}-{start + range_kb * 1024 - 1}"
+            resp = http.get(base + path, headers=headers)
+            if resp.status_code not in (200, 206): errors.append(resp.status_code)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--viewers', type=int, default=16)
+    parser.add_argument('--seeks', type=int, default=40, help='range requests per viewer')
+    parser.add_argument('--size-mb', type=int, default=50)
+    parser.add_argument('--range-kb', type=int, default=512)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='tf_media_')
+    os.chdir(workdir)
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    import app as tf
+    tf.app.root_path = workdir
+
+    size = args.size_mb * 1024 * 1024
+    os.makedirs('uploads/bench', exist_ok=True)
+    with open('uploads/bench/Q1.webm', 'wb') as f:
+        for _ in range(args.size_mb): f.write(os.urandom(1024 * 1024))
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    wrapped = Occupancy(tf.app)
+    server = make_server('127.0.0.1', 0, wrapped, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"{args.viewers} viewers x {args.seeks} seeks, {args.size_mb}MB file, {args.range_kb}KB ranges")
+    print(f"{'mode':18s} {'wall s':>8s} {'busy s':>8s} {'ms/req':>8s} {'peak':>5s} {'MB via python':>14s}")
+    for label, mode, use_range in [('app (no range)', 'app', False), ('app (range)', 'app', True),
+                                   ('x-accel (range)', 'x-accel', True)]:
+        tf.MEDIA_SERVE_MODE = mode
+        wrapped.reset()
+        errors = []
+        seeks = args.seeks if use_range else max(1, args.seeks // 10)
+        threads = [threading.Thread(target=viewer, args=(base, '/uploads/bench/Q1.webm?v=bench', size, seeks,
+                                                         args.range_kb, use_range, errors))
+                   for _ in range(args.viewers)]
+        t = time.perf_counter()
+        for th in threads: th.start()
+        for th in threads: th.join()
+        wall = time.perf_counter() - t
+        print(f"{label:18s} {wall:8.2f} {wrapped.busy:8.2f} {wrapped.busy / wrapped.requests * 1000:8.2f} "
+              f"{wrapped.peak:5d} {wrapped.bytes / 1048576:14.1f}" + (f"  errors={len(errors)}" if errors else ''))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
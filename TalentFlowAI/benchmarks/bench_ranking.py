@@ -0,0 +1,99 @@
+"""Seed one large interview room and time the room ranking/analytics API and the
+streaming CSV export against ranking the room in Python the way /report does it
+(load each candidate's questions, sum its grades).
+
+Rows are bulk-inserted, so the first API call also backfills the materialized
+candidate summaries; that one-off cost is reported separately.
+
+    python benchmarks/bench_ranking.py --candidates 20000 --questions 5
+"""
+import argparse, json, os, random, sys, tempfile, time, uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def timed(client, path, runs, queries):
+    timings, counts, size = [], [], 0
+    for _ in range(runs):
+        queries.clear()
+        t = time.perf_counter()
+        resp = client.get(path)
+        size = len(resp.get_data())
+        timings.append((time.perf_counter() - t) * 1000)
+        counts.append(len(queries))
+        assert resp.status_code == 200, (path, resp.status_code)
+    timings.sort()
+    return timings[len(timings) // 2], max(counts), size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--candidates', type=int, default=20000)
+    parser.add_argument('--questions', type=int, default=5)
+    parser.add_argument('--cv-share', type=float, default=0.3, help='share of candidates with 2 extra CV questions')
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='tf_ranking_')
+    os.chdir(workdir)
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['SPAN_LOG'] = '0'
+    import app as tf
+    from sqlalchemy import event, insert
+
+    tf.init_db()
+    random.seed(1)
+    with tf.app.app_context():
+        recruiter = tf.User(username='bench', password_hash='x', role='recruiter', full_name='Bench')
+        tf.db.session.add(recruiter)
+        tf.db.session.commit()
+        base = [{"question": f"Q{n}", "criteria": "c"} for n in range(args.questions)]
+        cv_extras = json.dumps([{"question": "CV", "criteria": "c"}] * 2)
+        tf.db.session.execute(insert(tf.Interview), [dict(id='BIG1', recruiter_id=recruiter.id, field='Bench', base_questions=json.dumps(base),
+                                                          question_count=args.questions)])
+        cands, videos = [], []
+        for c in range(args.candidates):
+            cid = str(uuid.uuid4())
+            cv = random.random() < args.cv_share
+            cands.append(dict(id=cid, room_id='BIG1', name=f"Cand {c}", email=f"c{c}@big.test", extra_questions=cv_extras if cv else None))
+            for q in range(random.randint(0, args.questions + (2 if cv else 0))):
+                graded = random.random() < 0.9
+                videos.append(dict(candidate_id=cid, question_index=q, filename=f"Q{q + 1}.webm",
+                                   ai_score=round(random.uniform(0, 10), 1) if graded else 0, ai_summary='ok' if graded else ''))
+        for i in range(0, len(cands), 5000): tf.db.session.execute(insert(tf.Candidate), cands[i:i + 5000])
+        for i in range(0, len(videos), 5000): tf.db.session.execute(insert(tf.Video), videos[i:i + 5000])
+        tf.db.session.commit()
+        recruiter_id, engine = recruiter.id, tf.db.engine
+    print(f"Seeded 1 room, {len(cands)} candidates, {len(videos)} videos")
+
+    queries = []
+    event.listen(engine, 'before_cursor_execute', lambda *a: queries.append(a[2]))
+    client = tf.app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'], s['role'], s['name'] = recruiter_id, 'recruiter', 'Bench'
+
+    # Baseline: what ranking a room costs without summaries (load every candidate and answer)
+    with tf.app.app_context():
+        queries.clear()
+        t = time.perf_counter()
+        ranked = []
+        for cand in tf.Candidate.query.filter_by(room_id='BIG1').all():
+            total = sum(v.ai_score for v in cand.videos if v.ai_summary)
+            ranked.append((total / (len(tf.candidate_questions(cand)) * 10), cand.id))
+        ranked.sort(reverse=True)
+        print(f"{'python ranking (per candidate)':34s} queries={len(queries):6d}  {(time.perf_counter() - t) * 1000:9.1f}ms")
+
+    queries.clear()
+    t = time.perf_counter()
+    client.get('/api/rooms/BIG1/ranking')
+    print(f"{'summary backfill (first call)':34s} queries={len(queries):6d}  {(time.perf_counter() - t) * 1000:9.1f}ms")
+
+    for path in ['/api/rooms/BIG1/ranking?per_page=50', '/api/rooms/BIG1/ranking?page=200&per_page=50',
+                 '/api/rooms/BIG1/ranking?sort=completion', '/api/rooms/BIG1/analytics', '/api/rooms/BIG1/ranking.csv']:
+        p50, count, size = timed(client, path, args.runs, queries)
+        print(f"{path:34s} queries={count:6d}  p50={p50:7.1f}ms  {size / 1024:8.1f}KB")
+
+
+if __name__ == '__main__':
+    main()
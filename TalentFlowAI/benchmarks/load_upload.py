@@ -0,0 +1,97 @@
+"""Simulate N candidates uploading answers at the same time and report latency
+percentiles and "database is locked" errors.
+
+By default the app runs in-process on a threaded server with a fresh SQLite DB;
+--no-sqlite-tuning turns off the WAL/busy_timeout pragmas to compare. --url points
+the clients at a running server instead (e.g. gunicorn -c gunicorn.conf.py wsgi:app),
+with --room naming an existing room code.
+
+    python benchmarks/load_upload.py --candidates 50 --answers 3 --size-kb 512
+"""
+import argparse, logging, os, sys, tempfile, threading, time
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values, p):
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def candidate(base, room, n, answers, size, barrier, results, lock):
+    with requests.Session() as http:
+        http.post(f"{base}/candidate", data={'room_id': room, 'email': f"load{n}@example.com", 'name': f"Load {n}"},
+                  allow_redirects=False)
+        barrier.wait()
+        for idx in range(answers):
+            t = time.perf_counter()
+            try:
+                resp = http.post(f"{base}/upload_video", data={'question_index': idx},
+                                 files={'video': ('blob.webm', os.urandom(size), 'video/webm')})
+                status, body = resp.status_code, resp.text
+            except requests.RequestException as e:
+                status, body = 0, str(e)
+            with lock: results.append((time.perf_counter() - t, status, 'locked' in body))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--candidates', type=int, default=50)
+    parser.add_argument('--answers', type=int, default=3, help='uploads per candidate')
+    parser.add_argument('--size-kb', type=int, default=512)
+    parser.add_argument('--url', help='test a running server instead of an in-process one')
+    parser.add_argument('--room', help='room code on the --url server')
+    parser.add_argument('--no-sqlite-tuning', action='store_true')
+    args = parser.parse_args()
+
+    if args.url:
+        base, room = args.url.rstrip('/'), args.room
+    else:
+        workdir = tempfile.mkdtemp(prefix='tf_load_')
+        os.chdir(workdir)
+        os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+        if args.no_sqlite_tuning: os.environ['SQLITE_TUNING'] = '0'
+        import app as tf
+        from sqlalchemy.exc import OperationalError
+        from werkzeug.serving import make_server
+
+        @tf.app.errorhandler(OperationalError)
+        def db_error(e):
+            return {"status": "error", "message": str(e.orig)}, 503
+
+        tf.init_db()
+        with tf.app.app_context():
+            tf.db.session.add(tf.Interview(id='LOAD', recruiter_id=1, field='Load test', base_questions='[{"question": "Q"}]',
+                                           question_count=args.answers))
+            tf.db.session.commit()
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = make_server('127.0.0.1', 0, tf.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base, room = f"http://127.0.0.1:{server.server_port}", 'LOAD'
+
+    results, lock = [], threading.Lock()
+    barrier = threading.Barrier(args.candidates)
+    threads = [threading.Thread(target=candidate, args=(base, room, n, args.answers, args.size_kb * 1024, barrier, results, lock))
+               for n in range(args.candidates)]
+    t = time.perf_counter()
+    for th in threads: th.start()
+    for th in threads: th.join()
+    wall = time.perf_counter() - t
+
+    ok = [d for d, status, _ in results if status == 200]
+    locked = sum(1 for _, _, is_locked in results if is_locked)
+    failed = sum(1 for _, status, _ in results if status != 200)
+    print(f"{args.candidates} candidates x {args.answers} uploads of {args.size_kb}KB"
+          + ("" if args.url else f", sqlite tuning {'off' if args.no_sqlite_tuning else 'on'}"))
+    # A remote server returns a generic 500, so lock errors are only told apart in-process
+    print(f"requests {len(results)}  ok {len(ok)}  failed {failed}" + ("" if args.url else f"  locked {locked}") + f"  wall {wall:.2f}s  "
+          f"throughput {len(results) / wall:.1f} req/s")
+    print(f"latency ms  p50 {percentile(ok, 50) * 1000:.1f}  p90 {percentile(ok, 90) * 1000:.1f}  "
+          f"p99 {percentile(ok, 99) * 1000:.1f}  max {max(ok, default=0) * 1000:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import time, itertools, threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Waiting for uploaded Gemini files to leave PROCESSING. `client` is anything with
+# upload_file / get_file / delete_file (a provider from ai_provider.py, or FakeFileClient).
+
+UploadedFile = namedtuple('UploadedFile', ['path', 'file', 'waited'])
+
+
+class FileProcessingTimeout(TimeoutError):
+    def __init__(self, names, waited):
+        super().__init__(f"Files not ACTIVE after {waited:.1f}s: {', '.join(names)}")
+        self.names, self.waited = names, waited
+
+
+class FileProcessingFailed(RuntimeError):
+    pass
+
+
+def _state(f):
+    return getattr(f.state, 'name', f.state)
+
+
+def _delete_quietly(client, files):
+    for f in files:
+        try: client.delete_file(f.name)
+        except Exception: pass
+
+
+def _upload_all(client, paths, mime_type, call, workers):
+    # Up to `workers` uploads at once (the limiter still caps them); if any fails, the others are deleted
+    upload = lambda p: call(client.upload_file, path=p, mime_type=mime_type)
+    if workers <= 1 or len(paths) <= 1:
+        files = []
+        try:
+            for p in paths: files.append(upload(p))
+        except Exception:
+            _delete_quietly(client, files)
+            raise
+        return files
+    with ThreadPoolExecutor(max_workers=min(workers, len(paths)), thread_name_prefix='upload') as pool:
+        futs = [pool.submit(upload, p) for p in paths]
+    errors = [f.exception() for f in futs if f.exception()]
+    if errors:
+        _delete_quietly(client, [f.result() for f in futs if not f.exception()])
+        raise errors[0]
+    return [f.result() for f in futs]
+
+
+def upload_many_and_wait(client, paths, mime_type="video/webm", deadline=120, initial_delay=0.05,
+                         max_delay=2.0, limiter=None, sleep=time.sleep, clock=time.monotonic, observe=None,
+                         upload_workers=4):
+    """Upload every path (up to `upload_workers` at a time), then poll them together with one
+    exponential backoff (initial_delay doubling up to max_delay) until all are ACTIVE.
+    Returns UploadedFile(path, file, waited) in input order; on FAILED or once
+    `deadline` seconds pass, deletes the uploads and raises.
+    `observe(stage, seconds)` is told how long the 'upload' and 'wait_active' phases took."""
+    call = limiter.call if limiter else (lambda fn, *a, **kw: fn(*a, **kw))
+    observe = observe or (lambda stage, seconds: None)
+    start = clock()
+    try: files = _upload_all(client, paths, mime_type, call, upload_workers)
+    finally: observe('upload', clock() - start)
+    start = clock()
+    try: return _wait_active(client, paths, files, deadline, initial_delay, max_delay, sleep, clock, start)
+    finally: observe('wait_active', clock() - start)
+
+
+def _wait_active(client, paths, files, deadline, initial_delay, max_delay, sleep, clock, start):
+    waited = [None] * len(files)
+    delay = initial_delay
+    while True:
+        for i, f in enumerate(files):
+            if waited[i] is not None: continue
+            state = _state(f)
+            if state == "ACTIVE": waited[i] = clock() - start
+            elif state == "FAILED":
+                _delete_quietly(client, files)
+                raise FileProcessingFailed(f"Processing failed for {paths[i]}")
+        pending = [i for i, w in enumerate(waited) if w is None]
+        if not pending: break
+        elapsed = clock() - start
+        if elapsed >= deadline:
+            _delete_quietly(client, files)
+            raise FileProcessingTimeout([paths[i] for i in pending], elapsed)
+        sleep(min(delay, deadline - elapsed))
+        delay = min(delay * 2, max_delay)
+        for i in pending: files[i] = client.get_file(files[i].name)
+    return [UploadedFile(p, f, w) for p, f, w in zip(paths, files, waited)]
+
+
+def upload_and_wait(client, path, mime_type="video/webm", **kwargs):
+    return upload_many_and_wait(client, [path], mime_type, **kwargs)[0]
+
+
+class FakeFileClient:
+    """In-memory stand-in for the genai file API: files turn ACTIVE after
+    `processing_seconds` (or FAILED if their path is in `fail_paths`)."""
+
+    class _State:
+        def __init__(self, name): self.name = name
+
+    class _File:
+        def __init__(self, name, path, state):
+            self.name, self.path, self.state = name, path, FakeFileClient._State(state)
+
+    def __init__(self, processing_seconds=0.0, fail_paths=(), clock=time.monotonic):
+        self.processing_seconds, self.fail_paths, self.clock = processing_seconds, set(fail_paths), clock
+        self._ids = itertools.count(1)
+        self._ready_at, self.files, self.calls = {}, {}, {'upload_file': 0, 'get_file': 0, 'delete_file': 0}
+        self._calls_lock = threading.Lock()  # uploads may come from several threads
+
+    def _called(self, op):
+        with self._calls_lock: self.calls[op] += 1
+
+    def _view(self, name):
+        path = self.files[name]
+        if path in self.fail_paths: state = "FAILED"
+        elif self.clock() >= self._ready_at[name]: state = "ACTIVE"
+        else: state = "PROCESSING"
+        return self._File(name, path, state)
+
+    def upload_file(self, path, mime_type=None):
+        self._called('upload_file')
+        name = f"files/fake-{next(self._ids)}"
+        self.files[name], self._ready_at[name] = path, self.clock() + self.processing_seconds
+        return self._view(name)
+
+    def get_file(self, name):
+        self._called('get_file')
+        return self._view(name)
+
+    def delete_file(self, name):
+        self._called('delete_file')
+        self.files.pop(name, None)
@@ -0,0 +1,30 @@
+import multiprocessing, os
+
+# gunicorn -c gunicorn.conf.py wsgi:app
+bind = os.getenv('BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+# Threads per worker: uploads and media requests spend most of their time on I/O
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 4))
+timeout = int(os.getenv('WEB_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then to cap slow leaks (PDF parsing, AI client buffers)
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+accesslog = os.getenv('ACCESS_LOG', '-')
+
+
+def on_starting(server):
+    # Create tables / apply migrations once in the master so workers don't race on them; the
+    # workers inherit MIGRATE_ON_START=0 and create_app() skips init_db
+    from app import app, db, init_db
+    init_db()
+    os.environ['MIGRATE_ON_START'] = '0'
+    with app.app_context(): db.engine.dispose()
+
+
+def post_fork(server, worker):
+    # Never share the master's pooled connections with a child
+    from app import app, db
+    with app.app_context(): db.engine.dispose(close=False)
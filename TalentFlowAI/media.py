@@ -0,0 +1,111 @@
+import multiprocessing, os, shutil, subprocess, threading, time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Media processing with a locally installed ffmpeg: a small grading proxy (what gets uploaded
+# to Gemini), an optional audio-only track and a poster frame for the report page. Each stage
+# is an ffmpeg subprocess launched from a process pool, so encoding never holds the GIL or
+# a request thread.
+
+
+def ffmpeg_available(ffmpeg='ffmpeg'):
+    return shutil.which(ffmpeg) is not None
+
+
+def _run(cmd, dst):
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if proc.returncode != 0 or not os.path.exists(dst) or os.path.getsize(dst) == 0:
+        if os.path.exists(dst): os.remove(dst)
+        err = proc.stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise RuntimeError(f"ffmpeg failed ({proc.returncode}): {err[-1] if err else 'no output'}")
+    return time.perf_counter() - start
+
+
+def make_proxy(ffmpeg, src, dst, height=360, fps=5, video_kbps=250, audio_kbps=32):
+    # Gemini samples video at ~1 fps, so a few fps at low resolution grades the same
+    return _run([ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-i', src,
+                 '-vf', f"scale=-2:'min({height},ih)',fps={fps}",
+                 '-c:v', 'libvpx-vp9', '-b:v', f'{video_kbps}k', '-deadline', 'realtime', '-cpu-used', '8', '-row-mt', '1',
+                 '-c:a', 'libopus', '-b:a', f'{audio_kbps}k', '-ac', '1', dst], dst)
+
+
+def make_audio(ffmpeg, src, dst, audio_kbps=32):
+    return _run([ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-i', src, '-vn',
+                 '-c:a', 'libopus', '-b:a', f'{audio_kbps}k', '-ac', '1', dst], dst)
+
+
+def make_poster(ffmpeg, src, dst, height=360, at_seconds=1):
+    # MediaRecorder webm has no duration/cues, so seek on the output side; very short clips use frame 0
+    base = [ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-i', src]
+    tail = ['-frames:v', '1', '-vf', f"scale=-2:'min({height},ih)'", '-q:v', '5', dst]
+    try: return _run(base + ['-ss', str(at_seconds)] + tail, dst)
+    except RuntimeError: return _run(base + tail, dst)
+
+
+STAGES = {'proxy': make_proxy, 'audio': make_audio, 'poster': make_poster}
+
+
+class MediaStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, stage, seconds, bytes_in, bytes_out, failed=False):
+        with self._lock:
+            s = self._stages.setdefault(stage, {'runs': 0, 'failed': 0, 'seconds': 0.0, 'bytes_in': 0, 'bytes_out': 0})
+            s['runs'] += 1
+            s['failed'] += failed
+            s['seconds'] += seconds
+            s['bytes_in'] += bytes_in
+            s['bytes_out'] += bytes_out
+
+    def stats(self):
+        with self._lock:
+            out = {}
+            for stage, s in self._stages.items():
+                out[stage] = dict(s, seconds=round(s['seconds'], 3), avg_seconds=round(s['seconds'] / s['runs'], 3) if s['runs'] else 0)
+            if 'proxy' in out: out['proxy']['bytes_saved'] = out['proxy']['bytes_in'] - out['proxy']['bytes_out']
+            return out
+
+
+class MediaProcessor:
+    """Runs ffmpeg stages for one video on a shared process pool and records per-stage stats."""
+
+    def __init__(self, ffmpeg='ffmpeg', workers=2, options=None):
+        self.ffmpeg, self.workers, self.options = ffmpeg, workers, options or {}
+        self.stats = MediaStats()
+        self._pool, self._lock = None, threading.Lock()
+
+    @property
+    def available(self):
+        return ffmpeg_available(self.ffmpeg)
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the parent is a threaded Flask/worker process
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def process(self, src, outputs):
+        """outputs: {stage: dst_path}. Runs the stages in parallel and returns {stage: dst_path}
+        for the ones that succeeded; failures are logged and counted, never raised, except the proxy's."""
+        size_in = os.path.getsize(src)
+        futs = {stage: self._executor().submit(STAGES[stage], self.ffmpeg, src, dst, **self.options.get(stage, {}))
+                for stage, dst in outputs.items()}
+        done, proxy_error = {}, None
+        for stage, fut in futs.items():
+            try:
+                seconds = fut.result()
+                self.stats.record(stage, seconds, size_in, os.path.getsize(outputs[stage]))
+                done[stage] = outputs[stage]
+            except Exception as e:
+                self.stats.record(stage, 0.0, 0, 0, failed=True)
+                if isinstance(e, BrokenProcessPool):
+                    # A worker died (OOM kill etc.): start a fresh pool for the next video
+                    with self._lock: self._pool = None
+                if stage == 'proxy': proxy_error = e
+                else: print(f"⚠️ {stage} for {os.path.basename(src)} failed: {e}")
+        if proxy_error: raise proxy_error
+        return done
@@ -0,0 +1,116 @@
+import bisect, threading, time
+from contextlib import contextmanager
+
+# Minimal in-process Prometheus metrics (text exposition format 0.0.4). Values are per
+# process: behind several gunicorn workers each one reports its own.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}' if pairs else ''
+
+
+def _num(v):
+    return '+Inf' if v == float('inf') else repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics, self._lock = [], threading.Lock()
+
+    def register(self, metric):
+        with self._lock: self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return ''.join(m.render() for m in list(self.metrics))
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values, self._lock = {}, threading.Lock()
+        if registry is not None: registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    def _header(self):
+        return f"# HELP {self.name} {self.help}\n# TYPE {self.name} {self.kind}\n"
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock: self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock: return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock: items = sorted(self._values.items())
+        return self._header() + ''.join(f"{self.name}{_labels(self.labelnames, k)} {_num(v)}\n" for k, v in items)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), [0.0])
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+            self._values[key] = (counts, total)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try: yield
+        finally: self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def render(self):
+        with self._lock: items = sorted((k, (list(c), t[0])) for k, (c, t) in self._values.items())
+        out = [self._header()]
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _num(bound))])} {cumulative}\n")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(total)}\n")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}\n")
+        return ''.join(out)
+
+
+class CallbackMetric(_Metric):
+    """Reports values kept elsewhere (cache hit counters, media stats): `fn()` returns
+    {tuple of label values: number}, read at scrape time."""
+
+    def __init__(self, name, help, labelnames, fn, kind='gauge', registry=REGISTRY):
+        super().__init__(name, help, labelnames, registry)
+        self.fn, self.kind = fn, kind
+
+    def render(self):
+        return self._header() + ''.join(f"{self.name}{_labels(self.labelnames, k)} {_num(v)}\n" for k, v in sorted(self.fn().items()))
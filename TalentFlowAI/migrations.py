@@ -0,0 +1,191 @@
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import inspect, text, MetaData, Table, Column, ForeignKey, Integer, String, Text, DateTime
+import json
+
+# Built-in schema migrations. db.create_all() only creates missing tables, so
+# every change to an existing table lives here as a numbered, idempotent step.
+# Applied versions are recorded in the schema_version table.
+
+MIGRATIONS = []
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+def _columns(conn, table):
+    return {c['name']: c for c in inspect(conn).get_columns(table)}
+
+
+def _indexes(conn, table):
+    return {i['name'] for i in inspect(conn).get_indexes(table)}
+
+
+def _add_column(conn, metadata, table, name):
+    if name in _columns(conn, table): return
+    col = metadata.tables[table].c[name]
+    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {col.type.compile(conn.dialect)}'))
+
+
+def _create_index(conn, metadata, table, name):
+    if name in _indexes(conn, table): return
+    next(i for i in metadata.tables[table].indexes if i.name == name).create(conn)
+
+
+@migration(1, "add folder_path, question_count and content_hash columns")
+def add_columns(conn, metadata):
+    _add_column(conn, metadata, 'candidate', 'folder_path')
+    _add_column(conn, metadata, 'video', 'content_hash')
+    _add_column(conn, metadata, 'interview', 'question_count')
+    for rid, qs in conn.execute(text('SELECT id, base_questions FROM interview WHERE question_count IS NULL')).all():
+        try: count = len(json.loads(qs))
+        except Exception: count = 0
+        conn.execute(text('UPDATE interview SET question_count = :n WHERE id = :id'), {'n': count, 'id': rid})
+
+
+@migration(2, "convert interview.created_at from string to DateTime")
+def created_at_to_datetime(conn, metadata):
+    if isinstance(_columns(conn, 'interview')['created_at']['type'], DateTime): return
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        # SQLite can't ALTER a column type: copy into a rebuilt table, then swap names.
+        # Old values look like 'YYYY-MM-DD HH:MM'; give them seconds so they parse as DATETIME.
+        # The table shape is pinned to this version: columns added by later migrations must
+        # not appear here. Runs in one transaction (see _transaction); the DROP clears a
+        # half-built table left by an earlier failed attempt.
+        md = MetaData()
+        Table('user', md, Column('id', Integer, primary_key=True))
+        new = Table('interview_new', md,
+                    Column('id', String(4), primary_key=True),
+                    Column('recruiter_id', Integer, ForeignKey('user.id'), nullable=False),
+                    Column('field', String(100), nullable=False),
+                    Column('base_questions', Text, nullable=False),
+                    Column('question_count', Integer, nullable=True),
+                    Column('created_at', DateTime))
+        conn.execute(text('DROP TABLE IF EXISTS interview_new'))
+        new.create(conn)
+        source = _columns(conn, 'interview')
+        cols = ', '.join(c.name for c in new.columns if c.name != 'created_at' and c.name in source)
+        conn.execute(text(
+            f"INSERT INTO interview_new ({cols}, created_at) SELECT {cols}, "
+            "CASE WHEN length(created_at) = 16 THEN created_at || '\\:00' ELSE created_at END FROM interview"))
+        conn.execute(text('DROP TABLE interview'))
+        conn.execute(text('ALTER TABLE interview_new RENAME TO interview'))
+    elif dialect == 'postgresql':
+        conn.execute(text('ALTER TABLE interview ALTER COLUMN created_at TYPE TIMESTAMP '
+                          "USING to_timestamp(created_at, 'YYYY-MM-DD HH24:MI')"))
+    elif dialect in ('mysql', 'mariadb'):
+        conn.execute(text('ALTER TABLE interview MODIFY created_at DATETIME'))
+    else:
+        raise MigrationError(f"Migration 2 can't convert interview.created_at on {dialect}. Change that column to a "
+                             "DATETIME/TIMESTAMP by hand (old values look like 'YYYY-MM-DD HH:MM'), then restart to continue.")
+
+
+@migration(3, "add lookup indexes and unique (room_id, email) / (candidate_id, question_index)")
+def add_indexes(conn, metadata):
+    dup = conn.execute(text('SELECT room_id, email, COUNT(*) FROM candidate GROUP BY room_id, email HAVING COUNT(*) > 1')).all()
+    if dup:
+        raise MigrationError("Duplicate candidates share a room and email; merge or delete them before migrating: "
+                           + ', '.join(f"{r}/{e} (x{n})" for r, e, n in dup))
+    # Re-uploads raced into duplicate rows: keep the newest video per question
+    conn.execute(text('DELETE FROM video WHERE id NOT IN (SELECT MAX(id) FROM video GROUP BY candidate_id, question_index)'))
+    _create_index(conn, metadata, 'candidate', 'uq_candidate_room_email')
+    _create_index(conn, metadata, 'video', 'uq_video_candidate_question')
+    _create_index(conn, metadata, 'interview', 'ix_interview_recruiter_created')
+
+
+@migration(4, "add candidate.cv_status and cv_text for background CV ingestion")
+def add_cv_columns(conn, metadata):
+    _add_column(conn, metadata, 'candidate', 'cv_status')
+    _add_column(conn, metadata, 'candidate', 'cv_text')
+
+
+@migration(5, "add candidate.overall_inputs_hash to track which grades the overall analysis covers")
+def add_overall_inputs_hash(conn, metadata):
+    _add_column(conn, metadata, 'candidate', 'overall_inputs_hash')
+
+
+@migration(6, "add video proxy/poster/audio filenames for the media processing stage")
+def add_media_columns(conn, metadata):
+    for name in ('proxy_filename', 'poster_filename', 'audio_filename'): _add_column(conn, metadata, 'video', name)
+
+
+@migration(7, "add interview.storage_tier and widen job.ref_id for storage paths")
+def storage_columns(conn, metadata):
+    _add_column(conn, metadata, 'interview', 'storage_tier')
+    dialect = conn.dialect.name
+    # SQLite doesn't enforce VARCHAR lengths
+    if dialect == 'postgresql': conn.execute(text('ALTER TABLE job ALTER COLUMN ref_id TYPE VARCHAR(255)'))
+    elif dialect in ('mysql', 'mariadb'): conn.execute(text('ALTER TABLE job MODIFY ref_id VARCHAR(255) NOT NULL'))
+
+
+@migration(8, "add candidate.extra_questions and stop copying the room's questions into every candidate")
+def normalize_candidate_questions(conn, metadata):
+    _add_column(conn, metadata, 'candidate', 'extra_questions')
+    rooms = {}
+    for rid, qs in conn.execute(text('SELECT id, base_questions FROM interview')).all():
+        try: rooms[rid] = json.loads(qs) if qs else []
+        except ValueError: pass
+    updates = []
+    for cid, rid, qs in conn.execute(text('SELECT id, room_id, personal_questions FROM candidate WHERE personal_questions IS NOT NULL')).all():
+        try: qs = json.loads(qs)
+        except ValueError: continue
+        base = rooms.get(rid)
+        # Only lists that start with the room's questions are split; anything else keeps its own copy
+        if base is None or not isinstance(qs, list) or qs[:len(base)] != base: continue
+        updates.append({'id': cid, 'extra': json.dumps(qs[len(base):]) if len(qs) > len(base) else None})
+    for i in range(0, len(updates), 1000):
+        conn.execute(text('UPDATE candidate SET personal_questions = NULL, extra_questions = :extra WHERE id = :id'), updates[i:i + 1000])
+
+
+@migration(9, "add video.media_hash so content_hash keeps the uploaded file's hash when the proxy replaces it")
+def add_media_hash(conn, metadata):
+    _add_column(conn, metadata, 'video', 'media_hash')
+
+
+def current_version(conn):
+    conn.execute(text('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, description VARCHAR(200), applied_at VARCHAR(30))'))
+    return conn.execute(text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+
+
+@contextmanager
+def _transaction(engine):
+    # pysqlite only opens a transaction before INSERT/UPDATE/DELETE, so DDL such as a table rebuild
+    # would commit step by step. Issue BEGIN ourselves so a failed migration leaves nothing behind.
+    if engine.dialect.name != 'sqlite':
+        with engine.begin() as conn: yield conn
+        return
+    with engine.connect() as conn:
+        raw = conn.connection.dbapi_connection
+        level, raw.isolation_level = raw.isolation_level, None
+        try:
+            conn.exec_driver_sql('BEGIN')
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        finally:
+            raw.isolation_level = level
+
+
+def migrate(engine, metadata):
+    with engine.begin() as conn:
+        version = current_version(conn)
+    for number, description, fn in MIGRATIONS:
+        if number <= version: continue
+        with _transaction(engine) as conn:
+            fn(conn, metadata)
+            conn.execute(text('INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)'),
+                         {'v': number, 'd': description, 't': datetime.now().isoformat(timespec='seconds')})
+        print(f"✅ Migration {number}: {description}")
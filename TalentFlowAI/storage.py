@@ -0,0 +1,230 @@
+import os, shutil, tempfile, threading
+from contextlib import contextmanager
+from werkzeug.security import safe_join
+
+# Where uploaded files live. Keys are '<candidate folder>/<filename>' (the same relative
+# paths the app always used under uploads/). Each backend has a hot tier and an archive
+# tier for old interviews; reads find a key in either one.
+
+
+class LocalStorage:
+    local = True
+
+    def __init__(self, root='uploads', archive_root=None):
+        self.root, self.archive_root = root, archive_root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, root, key):
+        return safe_join(root, key) if root else None
+
+    def path(self, key):
+        """Filesystem path of `key` (hot tier first), or None if it doesn't exist."""
+        for root in (self.root, self.archive_root):
+            p = self._path(root, key)
+            if p and os.path.isfile(p): return p
+        return None
+
+    def hot_path(self, key):
+        p = self._path(self.root, key)
+        if p is None: raise ValueError(f"Unsafe storage key: {key}")
+        return p
+
+    def exists(self, key):
+        return self.path(key) is not None
+
+    def save(self, key, fileobj):
+        dst = self.hot_path(key)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        with open(dst, 'wb') as f: shutil.copyfileobj(fileobj, f, 1024 * 1024)
+
+    def put_file(self, key, local_path):
+        # Takes ownership of local_path (moved, not copied)
+        dst = self.hot_path(key)
+        if os.path.abspath(dst) == os.path.abspath(local_path): return
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.move(local_path, dst)
+
+    @contextmanager
+    def local_copy(self, key):
+        path = self.path(key)
+        if path is None: raise FileNotFoundError(key)
+        yield path
+
+    def delete_prefixes(self, prefixes):
+        for prefix in prefixes:
+            for root in (self.root, self.archive_root):
+                p = self._path(root, prefix.rstrip('/'))
+                if p and os.path.isdir(p): shutil.rmtree(p, ignore_errors=True)
+
+    def archive_prefix(self, prefix):
+        # Move a folder to the archive root (e.g. a cheaper, slower disk); returns files moved
+        src = self._path(self.root, prefix.rstrip('/'))
+        if not self.archive_root or not src or not os.path.isdir(src): return 0
+        dst = self._path(self.archive_root, prefix.rstrip('/'))
+        moved = 0
+        for dirpath, _, files in os.walk(src):
+            target = os.path.join(dst, os.path.relpath(dirpath, src))
+            os.makedirs(target, exist_ok=True)
+            for name in files:
+                shutil.move(os.path.join(dirpath, name), os.path.join(target, name))
+                moved += 1
+        shutil.rmtree(src, ignore_errors=True)
+        return moved
+
+
+def _error_code(e):
+    return getattr(e, 'response', {}).get('Error', {}).get('Code')
+
+
+class S3Storage:
+    """Any S3-compatible service through a boto3 client (AWS, MinIO, R2...). Archiving rewrites
+    objects in place with a cheaper storage class; media is served through presigned URLs."""
+    local = False
+    DELETE_BATCH = 1000  # DeleteObjects limit
+
+    def __init__(self, client, bucket, prefix='', archive_class='STANDARD_IA', staging_dir=None):
+        self.client, self.bucket, self.prefix, self.archive_class = client, bucket, prefix, archive_class
+        self.staging_dir = staging_dir
+
+    def _k(self, key):
+        return self.prefix + key
+
+    def path(self, key):
+        return None
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._k(key))
+            return True
+        except Exception as e:
+            if _error_code(e) in ('404', 'NoSuchKey', 'NotFound'): return False
+            raise
+
+    def save(self, key, fileobj):
+        self.client.upload_fileobj(fileobj, self.bucket, self._k(key))
+
+    def put_file(self, key, local_path):
+        self.client.upload_file(local_path, self.bucket, self._k(key))
+        os.remove(local_path)
+
+    @contextmanager
+    def local_copy(self, key):
+        fd, tmp = tempfile.mkstemp(suffix=os.path.splitext(key)[1], dir=self.staging_dir)
+        os.close(fd)
+        try:
+            try: self.client.download_file(self.bucket, self._k(key), tmp)
+            except Exception as e:
+                if _error_code(e) in ('404', 'NoSuchKey', 'NotFound'): raise FileNotFoundError(key) from e
+                raise
+            yield tmp
+        finally:
+            os.remove(tmp)
+
+    def _list(self, prefix):
+        kwargs = {'Bucket': self.bucket, 'Prefix': self._k(prefix)}
+        while True:
+            page = self.client.list_objects_v2(**kwargs)
+            yield from page.get('Contents', [])
+            if not page.get('IsTruncated'): return
+            kwargs['ContinuationToken'] = page['NextContinuationToken']
+
+    def delete_prefixes(self, prefixes):
+        # One listing per prefix, then DeleteObjects in batches of up to 1000 keys across all of them
+        keys = [obj['Key'] for prefix in prefixes for obj in self._list(prefix.rstrip('/') + '/')]
+        for i in range(0, len(keys), self.DELETE_BATCH):
+            self.client.delete_objects(Bucket=self.bucket, Delete={
+                'Objects': [{'Key': k} for k in keys[i:i + self.DELETE_BATCH]], 'Quiet': True})
+
+    def archive_prefix(self, prefix):
+        moved = 0
+        for obj in self._list(prefix.rstrip('/') + '/'):
+            if obj.get('StorageClass', 'STANDARD') == self.archive_class: continue
+            self.client.copy_object(Bucket=self.bucket, Key=obj['Key'], CopySource={'Bucket': self.bucket, 'Key': obj['Key']},
+                                    StorageClass=self.archive_class, MetadataDirective='COPY')
+            moved += 1
+        return moved
+
+    def url(self, key, expires=3600):
+        return self.client.generate_presigned_url('get_object', Params={'Bucket': self.bucket, 'Key': self._k(key)}, ExpiresIn=expires)
+
+
+class FakeS3Error(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code}}
+
+
+class FakeS3Client:
+    """Local stand-in for the boto3 S3 client subset S3Storage uses: objects are files under
+    `root`, storage classes are kept in memory and every call is counted."""
+
+    def __init__(self, root, page_size=1000):
+        self.root, self.page_size = root, page_size
+        self.classes, self.calls = {}, {}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock: self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _file(self, bucket, key):
+        return os.path.join(self.root, bucket, *key.split('/'))
+
+    def head_object(self, Bucket, Key):
+        self._count('head_object')
+        if not os.path.isfile(self._file(Bucket, Key)): raise FakeS3Error('404')
+        return {'ContentLength': os.path.getsize(self._file(Bucket, Key)), 'StorageClass': self.classes.get((Bucket, Key), 'STANDARD')}
+
+    def upload_fileobj(self, fileobj, bucket, key):
+        self._count('upload_fileobj')
+        os.makedirs(os.path.dirname(self._file(bucket, key)), exist_ok=True)
+        with open(self._file(bucket, key), 'wb') as f: shutil.copyfileobj(fileobj, f)
+        self.classes.pop((bucket, key), None)
+
+    def upload_file(self, filename, bucket, key):
+        with open(filename, 'rb') as f: self.upload_fileobj(f, bucket, key)
+
+    def download_file(self, bucket, key, filename):
+        self._count('download_file')
+        if not os.path.isfile(self._file(bucket, key)): raise FakeS3Error('404')
+        shutil.copyfile(self._file(bucket, key), filename)
+
+    def list_objects_v2(self, Bucket, Prefix='', ContinuationToken=None):
+        self._count('list_objects_v2')
+        base = os.path.join(self.root, Bucket)
+        keys = sorted(os.path.relpath(os.path.join(d, f), base).replace(os.sep, '/')
+                      for d, _, files in os.walk(base) for f in files)
+        keys = [k for k in keys if k.startswith(Prefix) and (ContinuationToken is None or k > ContinuationToken)]
+        page = keys[:self.page_size]
+        out = {'Contents': [{'Key': k, 'StorageClass': self.classes.get((Bucket, k), 'STANDARD')} for k in page],
+               'IsTruncated': len(keys) > len(page)}
+        if out['IsTruncated']: out['NextContinuationToken'] = page[-1]
+        return out
+
+    def delete_objects(self, Bucket, Delete):
+        self._count('delete_objects')
+        if len(Delete['Objects']) > 1000: raise FakeS3Error('MalformedXML')
+        for obj in Delete['Objects']:
+            try: os.remove(self._file(Bucket, obj['Key']))
+            except FileNotFoundError: pass
+            self.classes.pop((Bucket, obj['Key']), None)
+        return {}
+
+    def copy_object(self, Bucket, Key, CopySource, StorageClass='STANDARD', **kwargs):
+        self._count('copy_object')
+        if (CopySource['Bucket'], CopySource['Key']) != (Bucket, Key):
+            shutil.copyfile(self._file(CopySource['Bucket'], CopySource['Key']), self._file(Bucket, Key))
+        self.classes[(Bucket, Key)] = StorageClass
+        return {}
+
+    def generate_presigned_url(self, op, Params, ExpiresIn=3600):
+        return f"https://{Params['Bucket']}.s3.local/{Params['Key']}?X-Amz-Expires={ExpiresIn}"
+
+
+def make_storage(kind='local', root='uploads', archive_root=None, bucket=None, prefix='', endpoint_url=None,
+                 archive_class='STANDARD_IA', staging_dir=None):
+    if kind == 'local': return LocalStorage(root, archive_root)
+    if kind == 's3':
+        import boto3  # optional: only needed for STORAGE_BACKEND=s3
+        if not bucket: raise ValueError("STORAGE_BACKEND=s3 needs S3_BUCKET")
+        return S3Storage(boto3.client('s3', endpoint_url=endpoint_url), bucket, prefix, archive_class, staging_dir)
+    raise ValueError(f"Unknown storage backend: {kind}")
@@ -0,0 +1,34 @@
+import os, shutil, sys, tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app.py reads its settings from the environment and keeps uploads relative to the working
+# directory, so both are set up before it is first imported: a throwaway SQLite DB, the fake AI
+WORKDIR = tempfile.mkdtemp(prefix='tf_tests_')
+os.environ.update(DATABASE_URI=f"sqlite:///{os.path.join(WORKDIR, 'test.db')}", AI_PROVIDER='fake', FAKE_AI_LATENCY='0',
+                  FAKE_AI_PER_FILE='0', FAKE_AI_PROCESSING='0', AI_CACHE_BACKEND='off', AI_REQUESTS_PER_MINUTE='0',
+                  MEDIA_PROXY='0', MEDIA_POSTER='0', SPAN_LOG='0')
+
+
+@pytest.fixture(scope='session')
+def tf():
+    cwd = os.getcwd()
+    os.chdir(WORKDIR)
+    import app
+    app.init_db()
+    yield app
+    os.chdir(cwd)
+
+
+@pytest.fixture
+def db(tf):
+    # Each test starts from empty tables and an empty uploads folder
+    with tf.app.app_context():
+        yield tf.db
+        tf.db.session.rollback()
+        for table in reversed(tf.db.metadata.sorted_tables): tf.db.session.execute(table.delete())
+        tf.db.session.commit()
+        shutil.rmtree(tf.app.config['UPLOAD_FOLDER'], ignore_errors=True)
+        os.makedirs(tf.app.config['UPLOAD_FOLDER'])
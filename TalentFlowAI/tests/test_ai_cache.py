@@ -0,0 +1,117 @@
+import threading
+import pytest
+import ai_cache
+from ai_cache import AICache, MemoryBackend, SQLiteBackend, make_cache
+
+
+class Clock:
+    def __init__(self, now=1000.0): self.now = now
+    def __call__(self): return self.now
+
+
+def test_memory_backend_expires_and_evicts_least_recently_used():
+    clock = Clock()
+    backend = MemoryBackend(max_entries=2, ttl=60, timer=clock)
+    backend.set('a', 1)
+    backend.set('b', 2)
+    assert backend.get('a') == 1  # 'b' is now least recently used
+    backend.set('c', 3)
+    assert (backend.get('a'), backend.get('b'), backend.get('c')) == (1, None, 3)
+    clock.now += 61
+    assert backend.get('a') is None and backend.get('c') is None
+
+
+def test_sqlite_backend_expires_evicts_and_is_shared(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ai_cache.time, 'time', clock)
+    path = str(tmp_path / 'cache.db')
+    backend = SQLiteBackend(path, max_entries=2, ttl=60)
+    backend.set('a', {'score': 1})
+    clock.now += 1
+    backend.set('b', [1, 2])
+    clock.now += 1
+    assert backend.get('a') == {'score': 1}  # touches 'a'
+    clock.now += 1
+    backend.set('c', 'x')
+    assert (backend.get('a'), backend.get('b'), backend.get('c')) == ({'score': 1}, None, 'x')
+    # Another process opening the same file sees the entries
+    assert SQLiteBackend(path, max_entries=2, ttl=60).get('c') == 'x'
+
+    clock.now += 61
+    assert backend.get('a') is None
+    backend.clear()
+    assert backend.get('c') is None
+
+
+@pytest.mark.parametrize('kind', ['memory', 'sqlite'])
+def test_hits_misses_and_refresh(kind, tmp_path):
+    cache, calls = make_cache(kind, path=str(tmp_path / 'cache.db')), []
+
+    def compute():
+        calls.append(1)
+        return {'n': len(calls)}
+    assert cache.get_or_compute('grade', ('k',), compute) == {'n': 1}
+    assert cache.get_or_compute('grade', ('k',), compute) == {'n': 1}
+    assert cache.peek('report', ('other',)) is None
+    assert cache.get_or_compute('grade', ('k',), compute, refresh=True) == {'n': 2}
+    assert cache.peek('grade', ('k',)) == {'n': 2}
+    assert cache.stats() == {'grade': {'hits': 2, 'misses': 2}, 'report': {'hits': 0, 'misses': 1}}
+
+
+def test_errors_and_uncacheable_results_are_not_stored():
+    cache = make_cache('memory')
+    with pytest.raises(ZeroDivisionError): cache.get_or_compute('q', ('k',), lambda: 1 / 0)
+    assert cache.get_or_compute('q', ('k',), lambda: [], cacheable=bool) == []
+    assert cache.get_or_compute('q', ('k',), lambda: ['x']) == ['x']
+    assert cache.stats() == {'q': {'hits': 0, 'misses': 3}}
+
+
+def test_off_computes_every_time():
+    cache = make_cache('off')
+    assert [cache.get_or_compute('q', ('k',), lambda: 'v') for _ in range(2)] == ['v', 'v']
+    assert cache.peek('q', ('k',)) is None and cache.stats() == {}
+
+
+def compute_concurrently(cache, compute, n=5):
+    results = []
+
+    def call():
+        try: results.append(cache.get_or_compute('grade', ('k',), compute))
+        except Exception as e: results.append(type(e).__name__)
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for t in threads: t.start()
+    return threads, results
+
+
+def test_concurrent_misses_compute_once():
+    cache, release, calls = AICache(MemoryBackend()), threading.Event(), []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return 'graded'
+    threads, results = compute_concurrently(cache, compute)
+    while not calls: pass
+    release.set()
+    for t in threads: t.join()
+    assert calls == [1] and results == ['graded'] * 5
+    assert cache.stats() == {'grade': {'hits': 4, 'misses': 1}}
+
+
+def test_waiters_compute_themselves_when_the_leader_fails():
+    cache, release, calls, lock = AICache(MemoryBackend()), threading.Event(), [], threading.Lock()
+
+    def compute():
+        with lock:
+            calls.append(1)
+            first = len(calls) == 1
+        if first:
+            release.wait(5)
+            raise RuntimeError("AI down")
+        return 'graded'
+    threads, results = compute_concurrently(cache, compute, n=3)
+    while not calls: pass
+    release.set()
+    for t in threads: t.join()
+    # One of the waiters takes over and the other gets its stored result
+    assert sorted(results) == ['RuntimeError', 'graded', 'graded'] and len(calls) == 2
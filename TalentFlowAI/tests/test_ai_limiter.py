@@ -0,0 +1,57 @@
+import threading, time
+from types import SimpleNamespace
+import ai_limiter
+from ai_limiter import AILimiter
+
+
+class Clock:
+    def __init__(self): self.now, self.sleeps = 0.0, []
+    def monotonic(self): return self.now
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+def test_rate_limit_allows_a_burst_then_paces_calls(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ai_limiter, 'time', SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep))
+    limiter = AILimiter(max_in_flight=4, per_minute=60, burst=2)
+    for _ in range(4):
+        with limiter.slot(): pass
+    # Two from the bucket, then one token per second
+    assert clock.sleeps == [1, 1]
+
+    clock.now += 10  # idle time refills the bucket up to `burst` only
+    for _ in range(3): limiter.call(lambda: None)
+    assert clock.sleeps == [1, 1, 1]
+
+
+def test_zero_per_minute_never_waits(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ai_limiter, 'time', SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep))
+    limiter = AILimiter(max_in_flight=1, per_minute=0)
+    assert [limiter.call(lambda n=n: n) for n in range(50)] == list(range(50)) and clock.sleeps == []
+
+
+def test_in_flight_calls_are_capped():
+    limiter, lock, state = AILimiter(max_in_flight=2, per_minute=0), threading.Lock(), {'active': 0, 'peak': 0}
+
+    def call():
+        with limiter.slot():
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.02)
+            with lock: state['active'] -= 1
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert state == {'active': 0, 'peak': 2}
+
+
+def test_slot_is_released_when_the_call_raises():
+    limiter = AILimiter(max_in_flight=1, per_minute=0)
+    for _ in range(3):
+        try: limiter.call(lambda: 1 / 0)
+        except ZeroDivisionError: pass
+    assert limiter.call(lambda: 'ok') == 'ok'
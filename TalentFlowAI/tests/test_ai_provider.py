@@ -0,0 +1,67 @@
+import json
+import pytest
+from ai_provider import FakeAIError, FakeProvider, GeminiProvider, make_provider
+from ai_schemas import AIOutputError, QUESTIONS, GRADE, BATCH_GRADES, OVERALL_REPORT
+from genai_files import FileProcessingFailed, upload_many_and_wait
+
+
+def fake(**settings):
+    sleeps = []
+    return FakeProvider(sleep=sleeps.append, **settings), sleeps
+
+
+def test_make_provider():
+    provider = make_provider('fake', latency=0.2, per_file=0.1, seed=3)
+    assert isinstance(provider, FakeProvider) and provider.name == 'fake' and (provider.latency, provider.per_file) == (0.2, 0.1)
+    gemini = make_provider('gemini', 'gemini-flash-lite-latest')
+    assert isinstance(gemini, GeminiProvider) and gemini.name == 'gemini-flash-lite-latest'
+    with pytest.raises(ValueError, match='Unknown AI provider'): make_provider('openai')
+
+
+def test_fake_replies_fit_their_schemas_and_are_deterministic():
+    provider, sleeps = fake(latency=0.5, per_file=0.25)
+    files = [provider.upload_file(path) for path in ('a.webm', 'b.webm')]
+
+    questions = QUESTIONS.parse(provider.generate('questions', 'Create exactly 3 interview questions for "Dev".'))
+    assert len(questions) == 3 and all(q['question'] and q['criteria'] for q in questions)
+    assert len(QUESTIONS.parse(provider.generate('cv_questions', 'CV Excerpt: ...'))) == 2
+    grade = GRADE.parse(provider.generate('grade', [files[0], 'Grade this']))
+    assert 3 <= grade['score'] <= 9.5
+    batch = BATCH_GRADES.parse(provider.generate('grade_batch', ['Answer 1', files[0], 'Answer 2', files[1], 'Grade these']))
+    assert [g['index'] for g in batch] == [1, 2]
+    assert OVERALL_REPORT.parse(provider.generate('report', 'Analyze this'))['suitability'] in ('High', 'Medium', 'Low')
+
+    # Latency plus per attached file
+    assert sleeps == [0.5, 0.5, 0.75, 1.0, 0.5]
+    assert provider.generated == {'questions': 1, 'cv_questions': 1, 'grade': 1, 'grade_batch': 1, 'report': 1}
+    # Same prompt and files, same reply, whatever the seed; another file, another grade
+    other, _ = fake(seed=42)
+    assert other.generate('grade', [other.upload_file('a.webm'), 'Grade this']) == provider.generate('grade', [files[0], 'Grade this'])
+    assert provider.generate('grade', [files[1], 'Grade this']) != provider.generate('grade', [files[0], 'Grade this'])
+    with pytest.raises(ValueError, match='no reply'): provider.generate('translate', 'hi')
+
+
+def test_fake_failures():
+    provider, _ = fake(error_rate=1)
+    with pytest.raises(FakeAIError): provider.generate('grade', 'x')
+
+    provider, _ = fake(bad_reply_rate=1)
+    with pytest.raises(AIOutputError): GRADE.parse(provider.generate('grade', 'x'))
+    files = [provider.upload_file(p) for p in ('a.webm', 'b.webm')]
+    assert len(json.loads(provider.generate('grade_batch', files + ['Grade these']))) == 1
+
+    provider, _ = fake(file_fail_rate=1)
+    with pytest.raises(FileProcessingFailed): upload_many_and_wait(provider, ['a.webm'], sleep=lambda s: None)
+    assert provider.files == {}
+
+
+def test_failure_draws_follow_the_seed():
+    def outcomes(seed):
+        provider, _ = fake(error_rate=0.5, seed=seed)
+        out = []
+        for n in range(20):
+            try: out.append(bool(provider.generate('report', f"r{n}")))
+            except FakeAIError: out.append(False)
+        return out
+    assert outcomes(1) == outcomes(1) and outcomes(1) != outcomes(2)
+    assert 0 < sum(outcomes(1)) < 20
@@ -0,0 +1,86 @@
+import json
+import pytest
+from ai_schemas import AIOutputError, extract_json, QUESTIONS, GRADE, BATCH_GRADES, OVERALL_REPORT
+
+
+@pytest.mark.parametrize('reply', [
+    '[{"question": "Why?", "criteria": "Depth"}]',
+    '```json\n[{"question": "Why?", "criteria": "Depth"}]\n```',
+    'Sure! Here are the questions:\n[{"question": "Why?", "criteria": "Depth"}]\nGood luck.',
+    '{"questions": [{"question": "Why?", "criteria": "Depth"}]}',
+])
+def test_questions_from_fenced_prose_and_wrapped_replies(reply):
+    assert QUESTIONS.parse(reply) == [{"question": "Why?", "criteria": "Depth"}]
+
+
+def test_extract_json_skips_brackets_that_do_not_decode():
+    assert extract_json('Scores [see below] {"a": "[x]"} trailing', '{') == {"a": "[x]"}
+    assert extract_json('note: [unterminated then [1, 2]') == [1, 2]
+    for reply in ('', None, 'no json here', '{"a": 1}'):
+        with pytest.raises(AIOutputError): extract_json(reply, '[')
+
+
+def test_questions_need_at_least_one_question():
+    assert QUESTIONS.parse('["Tell us about yourself."]') == [{"question": "Tell us about yourself.", "criteria": ""}]
+    for reply in ('[]', '[{"question": ""}]', '[{"criteria": "c"}]'):
+        with pytest.raises(AIOutputError): QUESTIONS.parse(reply)
+
+
+def test_grade_score_is_coerced_and_bounded():
+    assert GRADE.parse('{"score": "8.5", "summary": "Good."}') == {"score": 8.5, "summary": "Good."}
+    assert GRADE.parse('{"score": 0, "summary": "Silent."}')['score'] == 0
+    assert GRADE.parse('{"score": 10, "summary": "Great."}')['score'] == 10
+    for score in ('10.5', '-1', '"high"'):
+        with pytest.raises(AIOutputError, match='score'): GRADE.parse(f'{{"score": {score}, "summary": "x"}}')
+    with pytest.raises(AIOutputError, match='summary'): GRADE.parse('{"score": 5}')
+    with pytest.raises(AIOutputError, match=r'1\.index'):
+        BATCH_GRADES.parse('[{"index": 1, "score": 5, "summary": "a"}, {"index": 0, "score": 5, "summary": "b"}]')
+
+
+def test_overall_report_normalizes_loose_fields():
+    report = OVERALL_REPORT.parse('{"suitability": " high ", "strengths": "Clear", "final_comment": "Hire."}')
+    assert report == {"suitability": "High", "strengths": ["Clear"], "weaknesses": [], "final_comment": "Hire."}
+    with pytest.raises(AIOutputError, match='suitability'):
+        OVERALL_REPORT.parse('{"suitability": "Maybe", "final_comment": "?"}')
+
+
+def scripted(tf, monkeypatch, replies):
+    seen = []
+
+    def generate(op, contents, **kwargs):
+        seen.append(contents)
+        return replies[len(seen) - 1]
+    monkeypatch.setattr(tf.ai_provider, 'generate', generate)
+    return seen
+
+
+def test_invalid_reply_is_reasked_with_the_error(tf, monkeypatch):
+    fixed = tf.AI_REASKS.value(op='grade', outcome='fixed')
+    seen = scripted(tf, monkeypatch, ['{"score": 12, "summary": "x"}', '{"score": 9, "summary": "Fixed."}'])
+    assert tf.ai_structured('grade', ['video', 'prompt'], GRADE) == {"score": 9, "summary": "Fixed."}
+    assert seen[0] == ['video', 'prompt'] and seen[1][:2] == ['video', 'prompt']
+    assert 'score: Input should be less than or equal to 10' in seen[1][2]
+    assert tf.AI_REASKS.value(op='grade', outcome='fixed') == fixed + 1
+
+
+def test_reply_still_invalid_after_reasking_gives_up(tf, monkeypatch):
+    gave_up = tf.AI_REASKS.value(op='questions', outcome='gave_up')
+    seen = scripted(tf, monkeypatch, ['[]'] * (tf.AI_REPAIR_RETRIES + 1))
+    with pytest.raises(AIOutputError): tf.ai_structured('questions', 'prompt', QUESTIONS)
+    assert len(seen) == tf.AI_REPAIR_RETRIES + 1
+    assert tf.AI_REASKS.value(op='questions', outcome='gave_up') == gave_up + 1
+
+
+def test_check_failures_are_reasked_too(tf, monkeypatch):
+    def two(value):
+        if len(value) != 2: raise AIOutputError("expected 2 grades")
+    grades = [{"index": n, "score": 5, "summary": "ok"} for n in (1, 2)]
+    seen = scripted(tf, monkeypatch, [json.dumps(grades[:1]), json.dumps(grades)])
+    assert tf.ai_structured('grade_batch', ['prompt'], BATCH_GRADES, check=two) == grades
+    assert 'expected 2 grades' in seen[1][-1]
+
+
+def test_empty_question_list_falls_back_to_the_default_question(tf, monkeypatch):
+    scripted(tf, monkeypatch, ['[]'] * (tf.AI_REPAIR_RETRIES + 1))
+    assert tf.ai_generate_questions_with_criteria('Data engineer', 3) == [
+        {"question": "Tell us about yourself.", "criteria": "Confidence, clarity, and relevance."}]
@@ -0,0 +1,55 @@
+from sqlalchemy import false
+
+
+class StaleOnce:
+    # Model.query that misses every row the first time it is used, as if another request
+    # inserted the row between this request's check and its insert
+    def __init__(self, db): self.db, self.stale = db, True
+
+    def __get__(self, obj, cls):
+        query = self.db.session.query(cls)
+        if self.stale:
+            self.stale = False
+            return query.filter(false())
+        return query
+
+
+def add_room(tf, db):
+    db.session.add(tf.Interview(id='ROOM', recruiter_id=1, field='Dev', base_questions='[{"question": "Q1"}]', question_count=1))
+    db.session.add(tf.Candidate(id='cand-1', room_id='ROOM', name='Ann', email='ann@example.com', folder_path='cand-1'))
+    db.session.commit()
+
+
+def check_in(tf, name):
+    client = tf.app.test_client()
+    resp = client.post('/candidate', data={'room_id': 'room', 'email': 'ANN@example.com', 'name': name})
+    with client.session_transaction() as s: return resp, s.get('cid')
+
+
+def test_concurrent_check_in_with_the_same_email_resumes_the_candidate(tf, db, monkeypatch):
+    add_room(tf, db)
+    monkeypatch.setattr(tf.Candidate, 'query', StaleOnce(tf.db))
+    resp, cid = check_in(tf, 'ann')
+    assert resp.status_code == 302 and resp.location.endswith('/candidate/review') and cid == 'cand-1'
+    assert tf.Candidate.query.count() == 1
+
+
+def test_concurrent_check_in_under_another_name_is_refused(tf, db, monkeypatch):
+    add_room(tf, db)
+    monkeypatch.setattr(tf.Candidate, 'query', StaleOnce(tf.db))
+    resp, cid = check_in(tf, 'Bob')
+    assert resp.status_code == 200 and b'Email already used by another name' in resp.data and cid is None
+
+
+def test_concurrent_answer_registration_updates_the_existing_row(tf, db, monkeypatch):
+    add_room(tf, db)
+    db.session.add(tf.Video(candidate_id='cand-1', question_index=0, filename='Q1.webm', content_hash='old', ai_score=7, ai_summary='Good.'))
+    db.session.commit()
+    monkeypatch.setattr(tf.Video, 'query', StaleOnce(tf.db))
+    cand = db.session.get(tf.Candidate, 'cand-1')
+    db.session.add(tf.Job(kind='marker', ref_id='kept'))  # earlier work in the same transaction survives
+
+    v = tf.register_video(cand, 0, 'Q1.webm', 'new')
+    db.session.commit()
+    assert [(x.id, x.content_hash, x.ai_summary) for x in tf.Video.query] == [(v.id, 'new', '')]
+    assert {(j.kind, j.ref_id) for j in tf.Job.query} == {('marker', 'kept'), ('grade_video', str(v.id))}
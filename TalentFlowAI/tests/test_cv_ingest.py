@@ -0,0 +1,67 @@
+import io, json
+
+
+def pdf(text):
+    # Smallest one-page PDF whose page has `text` in a standard font
+    stream = f"BT /F1 12 Tf 10 50 Td ({text}) Tj ET".encode() if text else b""
+    objects = [b"<</Type/Catalog/Pages 2 0 R>>", b"<</Type/Pages/Kids[3 0 R]/Count 1>>",
+               b"<</Type/Page/Parent 2 0 R/MediaBox[0 0 400 100]/Contents 4 0 R/Resources<</Font<</F1 5 0 R>>>>>>",
+               b"<</Length %d>>stream\n%s\nendstream" % (len(stream), stream), b"<</Type/Font/Subtype/Type1/BaseFont/Helvetica>>"]
+    out, offsets = io.BytesIO(b"%PDF-1.4\n"), []
+    out.seek(0, 2)
+    for n, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (n, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1) + b"".join(b"%010d 00000 n \n" % o for o in offsets))
+    out.write(b"trailer\n<</Size %d/Root 1 0 R>>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def check_in(tf, db, cv):
+    db.session.add(tf.Interview(id='ROOM', recruiter_id=1, field='Dev', question_count=1,
+                                base_questions='[{"question": "Room question", "criteria": "c"}]'))
+    db.session.commit()
+    client = tf.app.test_client()
+    resp = client.post('/candidate', data={'room_id': 'ROOM', 'email': 'ann@example.com', 'name': 'Ann',
+                                           'cv_file': (io.BytesIO(cv), 'resume.pdf')})
+    assert resp.status_code == 302 and resp.location.endswith('/interview')
+    return client
+
+
+def run_jobs(tf):
+    ran = []
+    while (job := tf.claim_job()):
+        ran.append(job.kind)
+        tf.run_job(job)
+    return ran
+
+
+def test_cv_questions_are_added_in_the_background(tf, db):
+    client = check_in(tf, db, pdf("Python developer with 5 years of Flask"))
+    # Check-in only stored the CV: the room's questions are there at once
+    assert client.get('/interview/questions').json == {"status": "success", "questions": ["Room question"], "cv_status": "pending"}
+    assert b'Room question' in client.get('/interview').data
+
+    assert run_jobs(tf) == ['cv_extract', 'cv_questions']
+    cand = tf.Candidate.query.one()
+    assert 'Python developer' in cand.cv_text and cand.cv_filename == 'CV.pdf'
+    polled = client.get('/interview/questions').json
+    assert polled['cv_status'] == 'done' and polled['questions'][0] == "Room question" and len(polled['questions']) == 3
+    # Room questions stay shared; the CV ones are the candidate's extras
+    assert cand.personal_questions is None and len(json.loads(cand.extra_questions)) == 2
+
+
+def test_cv_without_text_adds_no_questions(tf, db):
+    client = check_in(tf, db, pdf(""))
+    assert run_jobs(tf) == ['cv_extract']
+    assert client.get('/interview/questions').json == {"status": "success", "questions": ["Room question"], "cv_status": "done"}
+
+
+def test_cv_questions_failure_is_reported_after_the_last_attempt(tf, db, monkeypatch):
+    def ai_down(cv_text, job_title): raise ConnectionError("AI down")
+    monkeypatch.setattr(tf, 'ai_generate_cv_questions', ai_down)
+    monkeypatch.setattr(tf, 'JOB_BACKOFF_SECONDS', 0)
+    client = check_in(tf, db, pdf("Python developer"))
+    assert run_jobs(tf) == ['cv_extract'] + ['cv_questions'] * tf.JOB_MAX_ATTEMPTS
+    assert client.get('/interview/questions').json == {"status": "success", "questions": ["Room question"], "cv_status": "failed"}
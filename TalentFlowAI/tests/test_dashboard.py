@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+
+def recruiter_client(tf, db, uid=7):
+    db.session.add(tf.User(id=uid, username=f"rec{uid}", password_hash='x', role='recruiter', full_name='Rec'))
+    db.session.commit()
+    client = tf.app.test_client()
+    with client.session_transaction() as s: s['user_id'], s['role'] = uid, 'recruiter'
+    return client
+
+
+def add_rooms(tf, db, rooms, candidates, uid=7, start=0):
+    for r in range(start, start + rooms):
+        rid = f"R{r:03d}"
+        db.session.add(tf.Interview(id=rid, recruiter_id=uid, field=f"Field {r}", base_questions='[]', question_count=2,
+                                    created_at=datetime(2025, 1, 1) + timedelta(days=r)))
+        for c in range(candidates):
+            db.session.add(tf.Candidate(id=f"{rid}-{c}", room_id=rid, name=f"Cand {c}", email=f"{c}@{rid}.com"))
+            db.session.add_all(tf.Video(candidate_id=f"{rid}-{c}", question_index=q, filename=f"Q{q + 1}.webm") for q in range(c % 3))
+    db.session.commit()
+
+
+def count_queries(tf, fn):
+    seen = []
+    listener = lambda *args: seen.append(args[2])
+    event.listen(tf.db.engine, 'before_cursor_execute', listener)
+    try: result = fn()
+    finally: event.remove(tf.db.engine, 'before_cursor_execute', listener)
+    return result, len(seen)
+
+
+def test_dashboard_api_pages_rooms_newest_first(tf, db):
+    client = recruiter_client(tf, db)
+    add_rooms(tf, db, rooms=5, candidates=3)
+    add_rooms(tf, db, rooms=1, candidates=1, uid=8, start=10)  # another recruiter's room
+
+    data = client.get('/api/dashboard?page=2&per_page=2').get_json()
+    assert (data['page'], data['pages'], data['total']) == (2, 3, 5)
+    assert [(r['id'], r['date'], r['question_count']) for r in data['interviews']] == [
+        ('R002', '2025-01-03 00:00', 2), ('R001', '2025-01-02 00:00', 2)]
+    assert [(c['id'], c['count']) for c in data['interviews'][0]['candidates']] == [('R002-0', 0), ('R002-1', 1), ('R002-2', 2)]
+    assert client.get('/api/dashboard?page=9').get_json()['interviews'] == []
+
+
+def test_dashboard_queries_do_not_grow_with_rooms_or_candidates(tf, db):
+    client = recruiter_client(tf, db)
+    add_rooms(tf, db, rooms=2, candidates=1)
+    _, small = count_queries(tf, lambda: client.get('/api/dashboard?per_page=20'))
+    add_rooms(tf, db, rooms=18, candidates=6, start=2)
+    resp, large = count_queries(tf, lambda: client.get('/api/dashboard?per_page=20'))
+    assert len(resp.get_json()['interviews']) == 20
+    # Count + page of rooms + one grouped candidate query
+    assert small == large == 3
@@ -0,0 +1,116 @@
+import threading
+import pytest
+from ai_limiter import AILimiter
+from genai_files import upload_many_and_wait, upload_and_wait, FakeFileClient, FileProcessingTimeout, FileProcessingFailed
+
+
+class Clock:
+    # Manual time: sleep() advances it and records each delay
+    def __init__(self): self.now, self.sleeps = 0.0, []
+    def __call__(self): return self.now
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class SlowFiles(FakeFileClient):
+    # Processing time per path instead of one for every file
+    def __init__(self, clock, seconds):
+        super().__init__(clock=clock)
+        self.seconds = seconds
+
+    def upload_file(self, path, mime_type=None):
+        f = super().upload_file(path, mime_type)
+        self._ready_at[f.name] = self.clock() + self.seconds[path]
+        return self._view(f.name)
+
+
+def wait(client, clock, paths, **kwargs):
+    return upload_many_and_wait(client, paths, sleep=clock.sleep, clock=clock, **kwargs)
+
+
+def test_backoff_doubles_up_to_max_delay():
+    clock = Clock()
+    up = upload_and_wait(FakeFileClient(processing_seconds=3, clock=clock), 'a.webm', initial_delay=0.1, max_delay=1,
+                         sleep=clock.sleep, clock=clock)
+    assert clock.sleeps == [0.1, 0.2, 0.4, 0.8, 1, 1]
+    assert up.file.state.name == "ACTIVE" and up.waited == pytest.approx(3.5)
+
+
+def test_files_are_polled_together_with_per_file_wait_times():
+    clock = Clock()
+    client = SlowFiles(clock, {'fast.webm': 0, 'mid.webm': 0.5, 'slow.webm': 2})
+    out = wait(client, clock, ['slow.webm', 'fast.webm', 'mid.webm'], initial_delay=0.25, max_delay=1)
+    assert [u.path for u in out] == ['slow.webm', 'fast.webm', 'mid.webm']
+    assert [u.waited for u in out] == [2.75, 0, 0.75]
+    # One poll round per sleep, only for the files still processing
+    assert client.calls['get_file'] == 3 + 2 + 1 and client.calls['delete_file'] == 0
+
+
+def test_deadline_raises_timeout_and_deletes_uploads():
+    clock = Clock()
+    client = SlowFiles(clock, {'a.webm': 0, 'b.webm': 60})
+    with pytest.raises(FileProcessingTimeout) as err:
+        wait(client, clock, ['a.webm', 'b.webm'], deadline=5, initial_delay=1, max_delay=2)
+    assert err.value.names == ['b.webm'] and err.value.waited == 5
+    assert sum(clock.sleeps) == 5  # the last sleep is cut to the deadline
+    assert client.files == {}
+
+
+def test_failed_file_raises_and_deletes_every_upload():
+    clock = Clock()
+    client = FakeFileClient(processing_seconds=1, fail_paths=['b.webm'], clock=clock)
+    with pytest.raises(FileProcessingFailed, match='b.webm'):
+        wait(client, clock, ['a.webm', 'b.webm', 'c.webm'])
+    assert client.files == {} and client.calls['delete_file'] == 3
+
+
+def test_upload_error_deletes_earlier_uploads_and_reports_stages():
+    clock, stages = Clock(), []
+    client = FakeFileClient(clock=clock)
+    upload = client.upload_file
+
+    def flaky(path, mime_type=None):
+        if path == 'b.webm': raise ConnectionError("upload failed")
+        return upload(path, mime_type)
+    client.upload_file = flaky
+    with pytest.raises(ConnectionError):
+        wait(client, clock, ['a.webm', 'b.webm'], observe=lambda stage, seconds: stages.append(stage))
+    assert client.files == {} and stages == ['upload']
+
+
+def test_observe_times_upload_and_wait_active():
+    clock, seen = Clock(), {}
+    wait(FakeFileClient(processing_seconds=0.3, clock=clock), clock, ['a.webm'], initial_delay=0.1,
+         observe=lambda stage, seconds: seen.setdefault(stage, seconds))
+    assert seen == {'upload': 0, 'wait_active': pytest.approx(0.3)}
+
+
+class BlockingFiles(FakeFileClient):
+    # Each upload waits at a barrier: only uploads running at the same time get past it
+    def __init__(self, parties):
+        super().__init__()
+        self.barrier, self.active, self.peak, self._lock = threading.Barrier(parties, timeout=5), 0, 0, threading.Lock()
+
+    def upload_file(self, path, mime_type=None):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            self.barrier.wait()
+            return super().upload_file(path, mime_type)
+        finally:
+            with self._lock: self.active -= 1
+
+
+def test_uploads_run_concurrently():
+    client = BlockingFiles(3)
+    out = upload_many_and_wait(client, ['a.webm', 'b.webm', 'c.webm'], upload_workers=3)
+    assert [u.path for u in out] == ['a.webm', 'b.webm', 'c.webm'] and client.peak == 3
+
+
+def test_limiter_caps_concurrent_uploads():
+    client = BlockingFiles(2)
+    upload_many_and_wait(client, [f"{n}.webm" for n in range(6)], upload_workers=6,
+                         limiter=AILimiter(max_in_flight=2, per_minute=0))
+    assert client.peak == 2 and client.calls['upload_file'] == 6
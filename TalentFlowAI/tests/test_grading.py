@@ -0,0 +1,64 @@
+import io, json
+import pytest
+from ai_cache import file_sha256, make_cache
+
+
+def add_answers(tf, db, count=1, cid='cand-1'):
+    questions = [{"question": f"Q{n}", "criteria": f"c{n}"} for n in range(1, count + 1)]
+    db.session.add(tf.Interview(id='ROOM', recruiter_id=1, field='Dev', base_questions=json.dumps(questions), question_count=count))
+    db.session.add(tf.Candidate(id=cid, room_id='ROOM', name='Ann', email='ann@example.com', folder_path=cid))
+    videos = []
+    for n in range(count):
+        tf.storage.save(f"{cid}/Q{n + 1}.webm", io.BytesIO(f"answer {n}".encode()))
+        videos.append(tf.Video(candidate_id=cid, question_index=n, filename=f"Q{n + 1}.webm"))
+    db.session.add_all(videos)
+    db.session.commit()
+    return videos
+
+
+def test_regrade_ignores_cached_grades(tf, db, monkeypatch):
+    monkeypatch.setattr(tf, 'ai_cache', make_cache('memory'))
+    v, = add_answers(tf, db)
+    key = (tf.ai_provider.name, file_sha256(tf.storage.path('cand-1/Q1.webm')), 'Q1', 'c1')
+    tf.ai_cache.put('grade', key, {"score": 1.0, "summary": "Stale grade."})
+    runner = tf.app.test_cli_runner()
+
+    assert runner.invoke(args=['grade-room', 'room']).exit_code == 0
+    db.session.expire_all()
+    assert db.session.get(tf.Video, v.id).ai_summary == "Stale grade."
+
+    assert runner.invoke(args=['grade-room', 'ROOM', '--regrade']).exit_code == 0
+    db.session.expire_all()
+    fresh = db.session.get(tf.Video, v.id)
+    assert fresh.ai_summary.startswith("Fake feedback")
+    assert tf.ai_cache.peek('grade', key) == {"score": fresh.ai_score, "summary": fresh.ai_summary}
+
+
+def enqueue_grading(tf, db, videos):
+    for v in videos: tf.enqueue_job('grade_video', v.id)
+    db.session.commit()
+
+
+@pytest.mark.parametrize('bad_reply', [
+    "Sorry, I can't grade these.",
+    json.dumps([{"index": 1, "score": 7, "summary": "Ok."}, {"index": 2, "score": 6, "summary": "Ok."}]),
+    json.dumps([{"index": n, "score": "high", "summary": "Ok."} for n in (1, 2, 3)]),
+])
+def test_unusable_batch_reply_falls_back_to_grading_each_video(tf, db, monkeypatch, bad_reply):
+    calls, generate = [], tf.ai_provider.generate
+
+    def provider(op, contents, **kwargs):
+        calls.append(op)
+        return bad_reply if op == 'grade_batch' else generate(op, contents, **kwargs)
+    monkeypatch.setattr(tf.ai_provider, 'generate', provider)
+    monkeypatch.setattr(tf, 'GRADING_MODE', 'batch')
+    videos = add_answers(tf, db, count=3)
+    enqueue_grading(tf, db, videos)
+
+    job = tf.claim_job()
+    tf.run_job(job)
+    # The batch is re-asked once, then every answer is graded on its own
+    assert calls == ['grade_batch'] * (tf.AI_REPAIR_RETRIES + 1) + ['grade'] * 3
+    db.session.expire_all()
+    assert all(v.ai_summary.startswith("Fake feedback") for v in tf.Video.query)
+    assert {(j.kind, j.status) for j in tf.Job.query} == {('grade_video', 'done'), ('overall_report', 'queued')}
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+
+def test_purge_jobs_keeps_recent_and_unfinished(tf, db):
+    old, recent = datetime.now() - timedelta(days=60), datetime.now() - timedelta(days=1)
+    for ref, status, locked_at in [('old-done', 'done', old), ('recent-done', 'done', recent), ('old-failed', 'failed', old),
+                                   ('recent-failed', 'failed', datetime.now() - timedelta(days=10)), ('old-queued', 'queued', None),
+                                   ('unclaimed-done', 'done', None)]:
+        db.session.add(tf.Job(kind='grade_video', ref_id=ref, status=status, locked_at=locked_at, created_at=old))
+    db.session.commit()
+
+    assert tf.purge_jobs(batch=1) == 3
+    assert sorted(j.ref_id for j in tf.Job.query) == ['old-queued', 'recent-done', 'recent-failed']
+
+
+def add_answer(tf, db, question_index, cid='cand-1'):
+    db.session.add(tf.Interview(id='ROOM', recruiter_id=1, field='Dev', base_questions='[{"question": "Q1", "criteria": "c"}]',
+                                question_count=1))
+    db.session.add(tf.Candidate(id=cid, room_id='ROOM', name='Ann', email='ann@example.com', folder_path=cid))
+    v = tf.Video(candidate_id=cid, question_index=question_index, filename=f"Q{question_index + 1}.webm")
+    db.session.add(v)
+    db.session.flush()
+    tf.enqueue_job('grade_video', v.id)
+    db.session.commit()
+    return v
+
+
+def run_next_job(tf):
+    job = tf.claim_job()
+    tf.run_job(job)
+    return tf.db.session.get(tf.Job, job.id)
+
+
+def test_answer_that_cannot_be_graded_is_retried_then_given_up(tf, db):
+    # Index past the room's single question: grading_item raises for this answer
+    v = add_answer(tf, db, question_index=5)
+    job = run_next_job(tf)
+    assert job.status == 'queued' and 'index' in job.last_error
+
+    job.attempts, job.max_attempts, job.run_after = 3, 4, datetime.now()
+    db.session.commit()
+    job = run_next_job(tf)
+    assert job.status == 'failed'
+    assert db.session.get(tf.Video, v.id).ai_summary == tf.GRADING_FAILED_SUMMARY
+
+
+def test_batch_grading_error_settles_every_answer(tf, db, monkeypatch):
+    def storage_down(items, refresh=False): raise ConnectionError("storage unavailable")
+    monkeypatch.setattr(tf, 'GRADING_MODE', 'batch')
+    monkeypatch.setattr(tf, 'grade_stored_videos', storage_down)
+    add_answer(tf, db, question_index=0)
+    job = run_next_job(tf)
+    assert (job.status, job.last_error) == ('queued', 'storage unavailable')
+
+
+def test_batched_handler_exception_settles_all_claimed_jobs(tf, db, monkeypatch):
+    def explode(job, claimed):
+        claimed.append(tf.db.session.get(tf.Job, other_id))
+        raise RuntimeError("boom")
+    monkeypatch.setitem(tf.JOB_HANDLERS, 'test_batch', (explode, None, True))
+    first, other = tf.Job(kind='test_batch', ref_id='a'), tf.Job(kind='test_batch', ref_id='b', status='running')
+    db.session.add_all([first, other])
+    db.session.commit()
+    other_id = other.id
+
+    run_next_job(tf)
+    db.session.expire_all()
+    assert {(j.ref_id, j.status, j.last_error) for j in tf.Job.query} == {('a', 'queued', 'boom'), ('b', 'queued', 'boom')}
@@ -0,0 +1,61 @@
+import io
+from storage import FakeS3Client, LocalStorage, S3Storage
+
+DATA = bytes(range(256)) * 4
+
+
+def stored(tf, key='cand-1/Q1.webm', store=None):
+    (store or tf.storage).save(key, io.BytesIO(DATA))
+    return tf.app.test_client()
+
+
+def test_versioned_url_is_cached_long_with_ranges_and_etag(tf, db):
+    client = stored(tf)
+    resp = client.get('/uploads/cand-1/Q1.webm?v=abc')
+    assert resp.status_code == 200 and resp.data == DATA and resp.mimetype == 'video/webm'
+    assert resp.headers['ETag'] and resp.headers['Last-Modified']
+    assert resp.cache_control.private and resp.cache_control.max_age == tf.MEDIA_MAX_AGE and resp.cache_control.immutable
+
+    part = client.get('/uploads/cand-1/Q1.webm?v=abc', headers={'Range': 'bytes=10-19'})
+    assert part.status_code == 206 and part.data == DATA[10:20]
+    assert part.headers['Content-Range'] == f"bytes 10-19/{len(DATA)}"
+
+    again = client.get('/uploads/cand-1/Q1.webm?v=abc', headers={'If-None-Match': resp.headers['ETag']})
+    assert again.status_code == 304 and again.data == b''
+    since = client.get('/uploads/cand-1/Q1.webm?v=abc', headers={'If-Modified-Since': resp.headers['Last-Modified']})
+    assert since.status_code == 304
+
+
+def test_unversioned_url_is_revalidated(tf, db):
+    resp = stored(tf).get('/uploads/cand-1/Q1.webm')
+    assert resp.status_code == 200 and resp.cache_control.no_cache and resp.cache_control.max_age == 0
+    assert not resp.cache_control.immutable
+
+
+def test_missing_or_unsafe_paths_are_not_found(tf, db):
+    client = stored(tf)
+    assert client.get('/uploads/cand-1/Q2.webm').status_code == 404
+    assert client.get('/uploads/../test.db').status_code == 404
+    assert client.get('/uploads/cand-1/..%2F..%2Ftest.db').status_code == 404
+
+
+def test_x_accel_hands_hot_files_to_nginx(tf, db, monkeypatch, tmp_path):
+    monkeypatch.setattr(tf, 'MEDIA_SERVE_MODE', 'x-accel')
+    monkeypatch.setattr(tf, 'storage', LocalStorage(tf.app.config['UPLOAD_FOLDER'], str(tmp_path / 'archive')))
+    client = stored(tf)
+    resp = client.get('/uploads/cand-1/Q1.webm?v=abc')
+    assert resp.status_code == 200 and resp.data == b'' and resp.mimetype == 'video/webm'
+    assert resp.headers['X-Accel-Redirect'] == '/protected-uploads/cand-1/Q1.webm'
+    assert resp.cache_control.max_age == tf.MEDIA_MAX_AGE
+
+    # nginx only maps the hot root: archived files are streamed by the app
+    tf.storage.archive_prefix('cand-1')
+    resp = client.get('/uploads/cand-1/Q1.webm', headers={'Range': 'bytes=0-3'})
+    assert 'X-Accel-Redirect' not in resp.headers and resp.status_code == 206 and resp.data == DATA[:4]
+
+
+def test_object_storage_redirects_to_a_signed_url(tf, db, monkeypatch, tmp_path):
+    monkeypatch.setattr(tf, 'storage', S3Storage(FakeS3Client(str(tmp_path)), 'bucket', prefix='tf/'))
+    resp = stored(tf).get('/uploads/cand-1/Q1.webm?v=abc')
+    assert resp.status_code == 302
+    assert resp.location == f"https://bucket.s3.local/tf/cand-1/Q1.webm?X-Amz-Expires={tf.MEDIA_URL_EXPIRES}"
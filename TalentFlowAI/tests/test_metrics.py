@@ -0,0 +1,69 @@
+import logging
+from metrics import Registry, Counter, Histogram, CallbackMetric
+
+
+def scrape(client):
+    resp = client.get('/metrics')
+    assert resp.status_code == 200 and resp.content_type == 'text/plain; version=0.0.4; charset=utf-8'
+    text = resp.get_data(as_text=True)
+    return text, {line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1]) for line in text.splitlines() if not line.startswith('#')}
+
+
+def test_exposition_format():
+    registry = Registry()
+    requests = Counter('app_requests_total', 'Requests', ['path'], registry=registry)
+    latency = Histogram('app_seconds', 'Latency', buckets=(0.1, 1), registry=registry)
+    CallbackMetric('app_queue', 'Queue length', ['kind'], lambda: {('b',): 2, ('a',): 1}, registry=registry)
+    requests.inc(path='/a"b\n')
+    requests.inc(2, path='/')
+    for v in (0.05, 0.1, 3): latency.observe(v)
+    assert registry.render() == (
+        '# HELP app_requests_total Requests\n# TYPE app_requests_total counter\n'
+        'app_requests_total{path="/"} 2\n'
+        'app_requests_total{path="/a\\"b\\n"} 1\n'
+        '# HELP app_seconds Latency\n# TYPE app_seconds histogram\n'
+        'app_seconds_bucket{le="0.1"} 2\napp_seconds_bucket{le="1"} 2\napp_seconds_bucket{le="+Inf"} 3\n'
+        'app_seconds_sum 3.15\napp_seconds_count 3\n'
+        '# HELP app_queue Queue length\n# TYPE app_queue gauge\n'
+        'app_queue{kind="a"} 1\napp_queue{kind="b"} 2\n')
+    assert requests.value(path='/') == 2 and latency.count() == 3
+
+
+def test_metrics_endpoint_reports_requests_and_jobs(tf, db):
+    client = tf.app.test_client()
+    _, before = scrape(client)
+    for _ in range(2): assert client.get('/').status_code == 200
+    assert client.get('/candidate/review').status_code == 302
+    db.session.add(tf.Job(kind='grade_video', ref_id='1'))
+    db.session.commit()
+
+    text, after = scrape(client)
+    assert '# TYPE talentflow_requests_total counter' in text and '# TYPE talentflow_request_seconds histogram' in text
+    home = 'talentflow_requests_total{endpoint="home",method="GET",status="200"}'
+    assert after[home] - before.get(home, 0) == 2
+    review = 'talentflow_requests_total{endpoint="candidate_review",method="GET",status="302"}'
+    assert after[review] - before.get(review, 0) == 1
+    count = 'talentflow_request_seconds_count{endpoint="home",method="GET"}'
+    assert after[count] - before.get(count, 0) == 2
+    assert after['talentflow_jobs{kind="grade_video",status="queued"}'] == 1
+    # Scrapes are counted but not timed
+    assert after['talentflow_requests_total{endpoint="metrics",method="GET",status="200"}'] >= 1
+    assert not any(k.startswith('talentflow_request_seconds') and 'endpoint="metrics"' in k for k in after)
+
+
+def test_metrics_token(tf, db, monkeypatch):
+    monkeypatch.setattr(tf, 'METRICS_TOKEN', 'secret')
+    client = tf.app.test_client()
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
+
+
+def test_span_log_line_per_request(tf, db, monkeypatch, caplog):
+    monkeypatch.setattr(tf, 'SPAN_LOG', True)
+    client = tf.app.test_client()
+    with caplog.at_level(logging.INFO, logger='talentflow.span'):
+        client.get('/interview/questions')
+    line, = [r.getMessage() for r in caplog.records if r.name == 'talentflow.span']
+    assert line.startswith('span=request method=GET endpoint=interview_questions status=400 ms=')
+    assert 'db_queries=' in line
@@ -0,0 +1,166 @@
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+import pytest
+from cachetools import LRUCache
+from sqlalchemy import create_engine, inspect, text, DateTime
+from sqlalchemy.exc import IntegrityError
+import migrations
+
+OLD_INTERVIEW = ("CREATE TABLE interview (id VARCHAR(4) PRIMARY KEY, recruiter_id INTEGER NOT NULL, field VARCHAR(100) NOT NULL, "
+                 "base_questions TEXT NOT NULL, question_count INTEGER, created_at VARCHAR(20))")
+
+
+def sqlite_engine(tmp_path, *statements):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        for sql in statements: conn.execute(text(sql))
+    return engine
+
+
+def run_created_at_migration(engine):
+    with migrations._transaction(engine) as conn: migrations.created_at_to_datetime(conn, None)
+
+
+def test_created_at_rebuild_converts_values(tmp_path):
+    engine = sqlite_engine(tmp_path, OLD_INTERVIEW, "INSERT INTO interview VALUES ('AB12', 1, 'Dev', '[]', 0, '2025-01-31 09:30')",
+                           # Half-built table from an attempt that failed before this fix
+                           "CREATE TABLE interview_new (id VARCHAR(4))")
+    run_created_at_migration(engine)
+    assert set(inspect(engine).get_table_names()) == {'interview'}
+    assert isinstance(migrations._columns(engine.connect(), 'interview')['created_at']['type'], DateTime)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT created_at FROM interview")).scalar() == '2025-01-31 09:30:00'
+
+
+def test_failed_rebuild_rolls_back_the_ddl(tmp_path):
+    # NULL in a NOT NULL column makes the copy fail after interview_new was created
+    engine = sqlite_engine(tmp_path, OLD_INTERVIEW.replace('field VARCHAR(100) NOT NULL', 'field VARCHAR(100)'),
+                           "INSERT INTO interview VALUES ('AB12', 1, NULL, '[]', 0, '2025-01-31 09:30')")
+    with pytest.raises(IntegrityError):
+        run_created_at_migration(engine)
+    assert inspect(engine).get_table_names() == ['interview']
+    assert not isinstance(migrations._columns(engine.connect(), 'interview')['created_at']['type'], DateTime)
+
+
+def test_unsupported_dialect_names_the_manual_step(monkeypatch):
+    class Conn:
+        class dialect: name = 'oracle'
+    monkeypatch.setattr(migrations, '_columns', lambda conn, table: {'created_at': {'type': object()}})
+    with pytest.raises(migrations.MigrationError, match='DATETIME'):
+        migrations.created_at_to_datetime(Conn(), None)
+
+
+# The schema as the first release created it (db.create_all with the original models)
+ORIGINAL_SCHEMA = [
+    "CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(50) NOT NULL UNIQUE, password_hash VARCHAR(200) NOT NULL, "
+    "role VARCHAR(20), full_name VARCHAR(100))",
+    "CREATE TABLE interview (id VARCHAR(4) PRIMARY KEY, recruiter_id INTEGER NOT NULL REFERENCES user (id), "
+    "field VARCHAR(100) NOT NULL, base_questions TEXT NOT NULL, created_at VARCHAR(20))",
+    "CREATE TABLE candidate (id VARCHAR(36) PRIMARY KEY, room_id VARCHAR(4) NOT NULL REFERENCES interview (id), "
+    "name VARCHAR(100) NOT NULL, email VARCHAR(100) NOT NULL, folder_path VARCHAR(255), cv_filename VARCHAR(200), "
+    "personal_questions TEXT, overall_analysis TEXT)",
+    "CREATE TABLE video (id INTEGER PRIMARY KEY, candidate_id VARCHAR(36) NOT NULL REFERENCES candidate (id), "
+    "question_index INTEGER NOT NULL, filename VARCHAR(200) NOT NULL, ai_score FLOAT, ai_summary TEXT)",
+    "INSERT INTO user VALUES (1, 'rec', 'x', 'recruiter', 'Rec')",
+    """INSERT INTO interview VALUES ('AB12', 1, 'Dev', '[{"question": "Q1", "criteria": "c"}]', '2025-01-31 09:30')""",
+    """INSERT INTO candidate VALUES ('c1', 'AB12', 'Ann', 'ann@example.com', 'f1', 'CV.pdf', """
+    """'[{"question": "Q1", "criteria": "c"}, {"question": "CV", "criteria": "cv"}]', NULL)""",
+    "INSERT INTO video VALUES (1, 'c1', 0, 'Q1.webm', 7.5, 'Good.')",
+]
+
+
+def test_database_from_the_first_release_upgrades_in_place(tf, tmp_path):
+    engine = sqlite_engine(tmp_path, *ORIGINAL_SCHEMA)
+    # What init_db does: create missing tables, then migrate
+    tf.db.metadata.create_all(engine)
+    migrations.migrate(engine, tf.db.metadata)
+    migrations.migrate(engine, tf.db.metadata)  # nothing left to do
+
+    with engine.connect() as conn:
+        assert migrations.current_version(conn) == max(n for n, _, _ in migrations.MIGRATIONS)
+        assert conn.execute(text("SELECT id, field, question_count, created_at, storage_tier FROM interview")).one() \
+            == ('AB12', 'Dev', 1, '2025-01-31 09:30:00', None)
+        assert conn.execute(text("SELECT personal_questions, extra_questions FROM candidate")).one() \
+            == (None, '[{"question": "CV", "criteria": "cv"}]')
+        assert conn.execute(text("SELECT ai_score, ai_summary FROM video")).one() == (7.5, 'Good.')
+        indexes = {i['name'] for t in ('interview', 'candidate', 'video') for i in inspect(conn).get_indexes(t)}
+        assert {'ix_interview_recruiter_created', 'uq_candidate_room_email', 'uq_video_candidate_question'} <= indexes
+        # Every model column exists after the upgrade
+        for table in tf.db.metadata.sorted_tables:
+            assert set(table.c.keys()) <= set(migrations._columns(conn, table.name)), table.name
+
+
+def test_create_app_skips_migrations_when_the_master_ran_them(tf, monkeypatch):
+    calls = []
+    monkeypatch.setattr(tf, 'init_db', lambda: calls.append('init_db'))
+    monkeypatch.setitem(tf.app.config, 'TESTING', False)  # restored after the test
+    monkeypatch.setenv('MIGRATE_ON_START', '0')
+    assert tf.create_app(config={'TESTING': True}, start_workers=False) is tf.app
+    assert calls == [] and tf.app.config['TESTING']
+
+    monkeypatch.delenv('MIGRATE_ON_START')
+    tf.create_app(start_workers=False)
+    assert calls == ['init_db']
+
+
+ROOM_QS = [{"question": "Q1", "criteria": "c1"}, {"question": "Q2", "criteria": "c2"}]
+CV_QS = [{"question": "About your CV", "criteria": "cv"}]
+
+
+def test_candidate_questions_are_split_from_the_room(tf, tmp_path):
+    copy = json.dumps(ROOM_QS)
+    engine = sqlite_engine(
+        tmp_path, OLD_INTERVIEW, "CREATE TABLE candidate (id VARCHAR(36) PRIMARY KEY, room_id VARCHAR(4), personal_questions TEXT)",
+        f"INSERT INTO interview VALUES ('AB12', 1, 'Dev', '{copy}', 2, '2025-01-31 09:30')",
+        "INSERT INTO interview VALUES ('BAD1', 1, 'Dev', 'not json', 0, '2025-01-31 09:30')",
+        f"INSERT INTO candidate VALUES ('same', 'AB12', '{copy}')",
+        f"INSERT INTO candidate VALUES ('cv', 'AB12', '{json.dumps(ROOM_QS + CV_QS)}')",
+        f"INSERT INTO candidate VALUES ('edited', 'AB12', '{json.dumps(ROOM_QS[::-1])}')",
+        "INSERT INTO candidate VALUES ('broken', 'AB12', '[{')",
+        f"INSERT INTO candidate VALUES ('bad-room', 'BAD1', '{copy}')",
+        "INSERT INTO candidate VALUES ('no-copy', 'AB12', NULL)")
+    with migrations._transaction(engine) as conn: migrations.normalize_candidate_questions(conn, tf.db.metadata)
+
+    with engine.connect() as conn:
+        rows = {cid: (personal, extra) for cid, personal, extra in conn.execute(
+            text("SELECT id, personal_questions, extra_questions FROM candidate"))}
+        room = conn.execute(text("SELECT id, created_at, base_questions FROM interview WHERE id = 'AB12'")).one()
+    assert rows == {'same': (None, None), 'cv': (None, json.dumps(CV_QS)), 'edited': (json.dumps(ROOM_QS[::-1]), None),
+                    'broken': ('[{', None), 'bad-room': (copy, None), 'no-copy': (None, None)}
+    # Read back, every split candidate still has the questions it was asked, in order
+    assert tf.question_list(room, *rows['same']) == ROOM_QS
+    assert tf.question_list(room, *rows['cv']) == ROOM_QS + CV_QS
+    assert tf.question_list(room, *rows['edited']) == ROOM_QS[::-1]
+
+
+def room_cache_counts(tf):
+    return tf.ROOM_QUESTION_CACHE.value(result='hit'), tf.ROOM_QUESTION_CACHE.value(result='miss')
+
+
+def test_room_questions_are_parsed_once_and_dropped_on_change(tf, db, monkeypatch):
+    monkeypatch.setattr(tf, '_room_questions', LRUCache(maxsize=2))
+    room = tf.Interview(id='ROOM', recruiter_id=1, field='Dev', base_questions=json.dumps(ROOM_QS), question_count=2)
+    db.session.add(room)
+    db.session.commit()
+    hits, misses = room_cache_counts(tf)
+    assert tf.room_questions(room) == ROOM_QS
+    assert tf.room_questions(room) is tf.room_questions(room)
+    assert room_cache_counts(tf) == (hits + 2, misses + 1)
+
+    # Editing the room (after_update) drops the parsed copy
+    room.base_questions = json.dumps(CV_QS)
+    db.session.commit()
+    assert tf.room_questions(room) == CV_QS
+
+    # A reused room code with another created_at is never served the old room's questions
+    reused = SimpleNamespace(id='ROOM', created_at=room.created_at + timedelta(days=1), base_questions=json.dumps(ROOM_QS))
+    assert tf.room_questions(reused) == ROOM_QS
+    db.session.delete(room)
+    db.session.commit()
+    assert 'ROOM' not in tf._room_questions
+
+    # Least recently used rooms leave the cache first
+    rooms = [SimpleNamespace(id=f"R{n}", created_at=None, base_questions=json.dumps([{"question": f"R{n}"}])) for n in range(3)]
+    for r in rooms: tf.room_questions(r)
+    assert set(tf._room_questions) == {'R1', 'R2'}
@@ -0,0 +1,128 @@
+import csv, io, json
+
+QUESTIONS = [{"question": "Q1", "criteria": "c"}, {"question": "Q2", "criteria": "c"}]
+
+
+def recruiter_client(tf, db, uid=7):
+    db.session.add(tf.User(id=uid, username=f"rec{uid}", password_hash='x', role='recruiter', full_name='Rec'))
+    db.session.add(tf.Interview(id='ROOM', recruiter_id=uid, field='Dev', base_questions=json.dumps(QUESTIONS), question_count=2))
+    db.session.commit()
+    client = tf.app.test_client()
+    with client.session_transaction() as s: s['user_id'], s['role'] = uid, 'recruiter'
+    return client
+
+
+def add_candidate(tf, db, cid, name, grades, extra=None):
+    db.session.add(tf.Candidate(id=cid, room_id='ROOM', name=name, email=f"{cid}@example.com", folder_path=cid,
+                                extra_questions=json.dumps(extra) if extra else None))
+    db.session.add_all(tf.Video(candidate_id=cid, question_index=n, filename=f"Q{n + 1}.webm", content_hash=f"{cid}{n}",
+                                ai_score=score, ai_summary=summary) for n, (score, summary) in enumerate(grades))
+    db.session.commit()
+
+
+def summaries(tf):
+    return {s.candidate_id: (s.questions, s.answered, s.graded, s.total_score, s.score_pct) for s in tf.CandidateSummary.query}
+
+
+def room_with_candidates(tf, db):
+    client = recruiter_client(tf, db)
+    add_candidate(tf, db, 'a', 'Ann', [(8, "Good."), (6, "Ok.")])
+    add_candidate(tf, db, 'b', 'Bob', [(9, "Great."), (0, tf.GRADING_FAILED_SUMMARY)])
+    add_candidate(tf, db, 'c', '=Cid', [(0, "")], extra=[{"question": "About your CV", "criteria": "cv"}])
+    return client
+
+
+def test_summaries_follow_grading_reuploads_and_deletes(tf, db):
+    room_with_candidates(tf, db)
+    assert summaries(tf) == {'a': (2, 2, 2, 14.0, 70.0), 'b': (2, 2, 1, 9.0, 45.0), 'c': (3, 1, 0, 0.0, 0.0)}
+
+    # Grading the failed answer
+    v = tf.Video.query.filter_by(candidate_id='b', question_index=1).one()
+    v.ai_score, v.ai_summary = 7, "Fine."
+    db.session.commit()
+    assert summaries(tf)['b'] == (2, 2, 2, 16.0, 80.0)
+
+    # A re-upload clears the grade until it is graded again; a rollback changes nothing
+    tf.register_video(db.session.get(tf.Candidate, 'a'), 0, 'Q1.webm', 'new bytes')
+    db.session.rollback()
+    assert summaries(tf)['a'] == (2, 2, 2, 14.0, 70.0)
+    tf.register_video(db.session.get(tf.Candidate, 'a'), 0, 'Q1.webm', 'new bytes')
+    db.session.commit()
+    assert summaries(tf)['a'] == (2, 2, 1, 6.0, 30.0)
+
+    # CV questions added later raise the maximum
+    tf.add_candidate_questions(db.session.get(tf.Candidate, 'b'), [{"question": "CV", "criteria": "cv"}])
+    db.session.commit()
+    assert summaries(tf)['b'] == (3, 2, 2, 16.0, 53.33)
+
+    db.session.delete(db.session.get(tf.Candidate, 'c'))
+    db.session.commit()
+    assert set(summaries(tf)) == {'a', 'b'}
+
+    # Deleting the recruiter deletes their rooms and candidates
+    db.session.delete(db.session.get(tf.User, 7))
+    db.session.commit()
+    assert summaries(tf) == {}
+
+
+def test_ranking_api(tf, db):
+    client = room_with_candidates(tf, db)
+    data = client.get('/api/rooms/room/ranking').get_json()
+    assert {k: data[k] for k in ('room', 'sort', 'page', 'per_page', 'total')} == \
+        {'room': 'ROOM', 'sort': 'score', 'page': 1, 'per_page': tf.RANKING_PER_PAGE, 'total': 3}
+    assert data['candidates'] == [
+        {"rank": 1, "id": "a", "name": "Ann", "email": "a@example.com", "questions": 2, "answered": 2, "graded": 2,
+         "total_score": 14.0, "max_score": 20, "score_pct": 70.0, "avg_score": 7.0, "completion_pct": 100.0},
+        {"rank": 2, "id": "b", "name": "Bob", "email": "b@example.com", "questions": 2, "answered": 2, "graded": 1,
+         "total_score": 9.0, "max_score": 20, "score_pct": 45.0, "avg_score": 9.0, "completion_pct": 100.0},
+        {"rank": 3, "id": "c", "name": "=Cid", "email": "c@example.com", "questions": 3, "answered": 1, "graded": 0,
+         "total_score": 0.0, "max_score": 30, "score_pct": 0.0, "avg_score": None, "completion_pct": 33.3}]
+
+    page = client.get('/api/rooms/ROOM/ranking?sort=name&per_page=2&page=2').get_json()
+    assert (page['sort'], [(c['rank'], c['id']) for c in page['candidates']]) == ('name', [(3, 'b')])
+    assert [c['id'] for c in client.get('/api/rooms/ROOM/ranking?sort=completion').get_json()['candidates']] == ['a', 'b', 'c']
+    assert client.get('/api/rooms/ROOM/ranking?sort=bogus').get_json()['sort'] == 'score'
+
+
+def test_ranking_heals_candidates_without_summaries(tf, db):
+    client = room_with_candidates(tf, db)
+    tf.CandidateSummary.query.filter_by(candidate_id='a').delete()
+    db.session.commit()
+    assert [c['id'] for c in client.get('/api/rooms/ROOM/ranking').get_json()['candidates']] == ['a', 'b', 'c']
+
+
+def test_room_analytics(tf, db):
+    client = room_with_candidates(tf, db)
+    data = client.get('/api/rooms/ROOM/analytics').get_json()
+    questions = data.pop('questions')
+    assert data == {"room": "ROOM", "field": "Dev", "candidates": 3, "completed": 2, "fully_graded": 1, "completion_pct": 66.7,
+                    "avg_score_pct": 38.33, "max_score_pct": 70.0, "score_pct_distribution": [1, 0, 0, 0, 1, 0, 0, 1, 0, 0]}
+    distribution = [0] * 11
+    distribution[8] = distribution[9] = 1
+    assert questions[0] == {"index": 0, "question": "Q1", "candidates": 3, "answered": 3, "graded": 2, "avg_score": 8.5,
+                            "min_score": 8.0, "max_score": 9.0, "distribution": distribution, "completion_pct": 100.0}
+    assert [(q['index'], q['question'], q['candidates'], q['answered'], q['graded'], q['avg_score']) for q in questions[1:]] == [
+        (1, "Q2", 3, 2, 1, 6.0), (2, "CV question 1", 1, 0, 0, None)]
+
+
+def test_ranking_csv(tf, db):
+    client = room_with_candidates(tf, db)
+    resp = client.get('/api/rooms/ROOM/ranking.csv')
+    assert resp.status_code == 200 and resp.mimetype == 'text/csv'
+    assert resp.headers['Content-Disposition'] == 'attachment; filename=room_ROOM_ranking.csv'
+    text = resp.get_data(as_text=True)
+    assert text.startswith('\ufeff')
+    rows = list(csv.reader(io.StringIO(text[1:])))
+    assert rows == [tf.RANKING_COLUMNS,
+                    ['1', 'a', 'Ann', 'a@example.com', '2', '2', '2', '14.0', '20', '70.0', '7.0', '100.0'],
+                    ['2', 'b', 'Bob', 'b@example.com', '2', '2', '1', '9.0', '20', '45.0', '9.0', '100.0'],
+                    ['3', 'c', "'=Cid", 'c@example.com', '3', '1', '0', '0.0', '30', '0.0', '', '33.3']]
+
+
+def test_rooms_of_other_recruiters_are_hidden(tf, db):
+    room_with_candidates(tf, db)
+    client = tf.app.test_client()
+    with client.session_transaction() as s: s['user_id'], s['role'] = 8, 'recruiter'
+    assert client.get('/api/rooms/ROOM/ranking').status_code == 404
+    assert client.get('/api/rooms/ROOM/analytics').status_code == 404
+    assert tf.app.test_client().get('/api/rooms/ROOM/ranking').status_code == 403
@@ -0,0 +1,55 @@
+import json
+
+
+def graded_candidate(tf, db, grades):
+    questions = [{"question": f"Q{n}", "criteria": "c"} for n in range(1, len(grades) + 1)]
+    db.session.add(tf.Interview(id='ROOM', recruiter_id=1, field='Dev', base_questions=json.dumps(questions), question_count=len(grades)))
+    cand = tf.Candidate(id='cand-1', room_id='ROOM', name='Ann', email='ann@example.com', folder_path='cand-1')
+    db.session.add(cand)
+    db.session.add_all(tf.Video(candidate_id='cand-1', question_index=n, filename=f"Q{n + 1}.webm", ai_score=score, ai_summary=summary)
+                       for n, (score, summary) in enumerate(grades))
+    db.session.flush()
+    tf.refresh_overall_report(cand)
+    db.session.commit()
+    return cand
+
+
+def run_reports(tf):
+    runs = 0
+    while (job := tf.claim_job()):
+        assert job.kind == 'overall_report'
+        tf.run_job(job)
+        runs += 1
+    return runs
+
+
+def test_report_is_rebuilt_when_its_inputs_change(tf, db):
+    cand = graded_candidate(tf, db, [(8, "Clear."), (6, "Vague.")])
+    assert run_reports(tf) == 1
+    first_hash, first = cand.overall_inputs_hash, json.loads(cand.overall_analysis)
+    assert first['suitability'] in ('High', 'Medium', 'Low') and first_hash
+
+    tf.refresh_overall_report(cand)  # nothing changed: no new job
+    db.session.commit()
+    assert run_reports(tf) == 0
+
+    cand.videos[1].ai_score, cand.videos[1].ai_summary = 9, "Much better."
+    tf.refresh_overall_report(cand)
+    db.session.commit()
+    assert run_reports(tf) == 1
+    assert cand.overall_inputs_hash not in (None, first_hash)
+    _, inputs_hash = tf.overall_report_inputs(cand)
+    assert inputs_hash == cand.overall_inputs_hash
+
+
+def test_failed_or_missing_grades_hold_back_the_report(tf, db):
+    cand = graded_candidate(tf, db, [(8, "Clear."), (0, tf.GRADING_FAILED_SUMMARY)])
+    assert tf.overall_report_inputs(cand) == (None, None)
+    assert run_reports(tf) == 0 and cand.overall_analysis is None
+
+    cand.videos[1].ai_score, cand.videos[1].ai_summary = 5, ""  # score without feedback: not graded yet
+    assert tf.overall_report_inputs(cand) == (None, None)
+
+    cand.videos[1].ai_summary = "Checked by hand."
+    qa, _ = tf.overall_report_inputs(cand)
+    assert [q['score'] for q in qa] == [8, 5]
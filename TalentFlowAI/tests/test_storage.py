@@ -0,0 +1,90 @@
+import io, os
+import pytest
+from storage import FakeS3Client, LocalStorage, S3Storage
+
+
+def put(store, *keys):
+    for key in keys: store.save(key, io.BytesIO(key.encode()))
+
+
+def s3(tmp_path, page_size=1000, batch=1000):
+    store = S3Storage(FakeS3Client(str(tmp_path / 's3'), page_size=page_size), 'bucket', staging_dir=str(tmp_path))
+    store.DELETE_BATCH = batch
+    return store
+
+
+def test_s3_delete_prefixes_pages_and_batches(tmp_path):
+    store = s3(tmp_path, page_size=2, batch=2)
+    put(store, 'c1/a.webm', 'c1/b.webm', 'c1/cv.pdf', 'c2/a.webm', 'c2/b.webm', 'c10/a.webm')
+
+    store.delete_prefixes(['c1', 'c2/'])
+
+    assert [store.exists(k) for k in ('c1/a.webm', 'c1/cv.pdf', 'c2/b.webm', 'c10/a.webm')] == [False, False, False, True]
+    # c1 takes two listing pages, c2 one; five keys go in three DeleteObjects calls
+    assert store.client.calls['list_objects_v2'] == 3
+    assert store.client.calls['delete_objects'] == 3
+
+
+def test_s3_archive_prefix_changes_storage_class_once(tmp_path):
+    store = s3(tmp_path, page_size=1)
+    put(store, 'c1/a.webm', 'c1/b.webm', 'c2/a.webm')
+
+    assert store.archive_prefix('c1') == 2
+    assert store.archive_prefix('c1') == 0
+    assert store.client.classes == {('bucket', 'c1/a.webm'): 'STANDARD_IA', ('bucket', 'c1/b.webm'): 'STANDARD_IA'}
+    assert store.exists('c1/a.webm')
+
+
+def test_local_archive_prefix_moves_files_but_keeps_them_readable(tmp_path):
+    store = LocalStorage(str(tmp_path / 'hot'), str(tmp_path / 'archive'))
+    put(store, 'c1/a.webm', 'c1/sub/b.webm')
+
+    assert store.archive_prefix('c1') == 2
+    assert not os.path.exists(store.hot_path('c1'))
+    assert store.path('c1/sub/b.webm') == str(tmp_path / 'archive' / 'c1' / 'sub' / 'b.webm')
+    assert LocalStorage(str(tmp_path / 'other')).archive_prefix('c1') == 0
+
+    store.delete_prefixes(['c1'])
+    assert not store.exists('c1/a.webm')
+
+
+def test_local_copy_of_a_missing_key_is_file_not_found(tmp_path):
+    store = s3(tmp_path)
+    with pytest.raises(FileNotFoundError):
+        with store.local_copy('c1/missing.webm'): pass
+    assert not any(n.endswith('.webm') for n in os.listdir(tmp_path))  # the download target was removed
+
+    with pytest.raises(FileNotFoundError):
+        with LocalStorage(str(tmp_path / 'hot')).local_copy('c1/missing.webm'): pass
+
+
+def add_candidate(tf, db, cid):
+    if not db.session.get(tf.Interview, 'ROOM'):
+        db.session.add(tf.Interview(id='ROOM', recruiter_id=1, field='Dev', base_questions='[]', question_count=0))
+    cand = tf.Candidate(id=cid, room_id='ROOM', name=cid, email=f"{cid}@example.com", folder_path=cid)
+    db.session.add(cand)
+    db.session.commit()
+    put(tf.storage, f"{cid}/Q1.webm", f"{cid}/cv.pdf")
+    return cand
+
+
+@pytest.mark.parametrize('backend', ['local', 's3'])
+def test_deleted_candidates_files_go_after_commit(tf, db, monkeypatch, tmp_path, backend):
+    if backend == 's3': monkeypatch.setattr(tf, 'storage', s3(tmp_path, page_size=1, batch=2))
+    monkeypatch.setattr(tf, 'STORAGE_DELETE_BATCH', 2)
+    cands = [add_candidate(tf, db, f"cand-{n}") for n in range(3)]
+
+    # A rolled back delete queues nothing
+    db.session.delete(cands[0])
+    db.session.flush()
+    db.session.rollback()
+    assert tf.Job.query.count() == 0
+
+    for cand in cands[:2]: db.session.delete(cand)
+    db.session.commit()
+    assert tf.storage.exists('cand-0/Q1.webm')  # nothing removed inside the request
+
+    job = tf.claim_job()
+    tf.run_job(job)
+    assert {j.status for j in tf.Job.query} == {'done'}
+    assert [tf.storage.exists(f"cand-{n}/cv.pdf") for n in range(3)] == [False, False, True]
@@ -0,0 +1,128 @@
+import hashlib, io, os, threading
+from datetime import datetime, timedelta
+
+
+def candidate_client(tf, db):
+    db.session.add(tf.Interview(id='ROOM', recruiter_id=1, field='Dev', base_questions='[{"question": "Q1"}, {"question": "Q2"}]',
+                                question_count=2))
+    db.session.add(tf.Candidate(id='cand-1', room_id='ROOM', name='Ann', email='ann@example.com', folder_path='cand-1'))
+    db.session.commit()
+    client = tf.app.test_client()
+    with client.session_transaction() as s: s['cid'] = 'cand-1'
+    return client
+
+
+def put_chunk(client, upload_id, offset, data):
+    return client.put(f"/upload/{upload_id}/chunk?offset={offset}", data=data,
+                      headers={'X-Chunk-SHA256': hashlib.sha256(data).hexdigest()})
+
+
+def part_files(tf):
+    folder = os.path.join(tf.app.config['UPLOAD_FOLDER'], 'cand-1')
+    return sorted(os.listdir(folder))
+
+
+def test_chunks_then_finalize(tf, db):
+    client = candidate_client(tf, db)
+    upload_id = client.post('/upload/init', json={'question_index': 0}).json['upload_id']
+    assert put_chunk(client, upload_id, 0, b'a' * 10).json['offset'] == 10
+    assert put_chunk(client, upload_id, 0, b'b' * 10).status_code == 409
+    assert put_chunk(client, upload_id, 10, b'c' * 5).json['offset'] == 15
+    assert client.post(f"/upload/{upload_id}/finalize", json={'size': 15}).json['status'] == 'success'
+    with tf.storage.local_copy('cand-1/Q1.webm') as path:
+        assert open(path, 'rb').read() == b'a' * 10 + b'c' * 5
+
+
+def test_bad_checksum_leaves_the_part_file_alone(tf, db):
+    client = candidate_client(tf, db)
+    upload_id = client.post('/upload/init', json={'question_index': 0}).json['upload_id']
+    put_chunk(client, upload_id, 0, b'a' * 10)
+    resp = client.put(f"/upload/{upload_id}/chunk?offset=10", data=b'x' * 10, headers={'X-Chunk-SHA256': '0' * 64})
+    assert resp.status_code == 422
+    assert client.get(f"/upload/{upload_id}").json['offset'] == 10
+    assert [f for f in part_files(tf) if f.endswith('.chunk')] == []
+
+
+def test_racing_chunks_at_one_offset_keep_the_winners_bytes(tf, db):
+    client = candidate_client(tf, db)
+    for _ in range(10):
+        upload_id = client.post('/upload/init', json={'question_index': 0}).json['upload_id']
+        payloads, results, barrier = [os.urandom(256 * 1024) for _ in range(4)], {}, threading.Barrier(4)
+
+        def send(n):
+            c = tf.app.test_client()
+            with c.session_transaction() as s: s['cid'] = 'cand-1'
+            barrier.wait()
+            results[n] = put_chunk(c, upload_id, 0, payloads[n]).status_code
+        threads = [threading.Thread(target=send, args=(n,)) for n in range(4)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        winners = [n for n, status in results.items() if status == 200]
+        assert len(winners) == 1 and sorted(results.values()).count(409) == 3
+        path = os.path.join(tf.app.config['UPLOAD_FOLDER'], 'cand-1', f".Q1.{upload_id}.part")
+        assert open(path, 'rb').read() == payloads[winners[0]]
+
+
+def test_abandoned_upload_sessions_are_purged(tf, db):
+    client = candidate_client(tf, db)
+    stale_id = client.post('/upload/init', json={'question_index': 0}).json['upload_id']
+    db.session.get(tf.UploadSession, stale_id).created_at = datetime.now() - timedelta(hours=tf.UPLOAD_SESSION_TTL_HOURS + 1)
+    db.session.commit()
+    fresh_id = client.post('/upload/init', json={'question_index': 1}).json['upload_id']
+
+    assert tf.purge_upload_sessions() == 1
+    assert [u.id for u in tf.UploadSession.query] == [fresh_id]
+    assert part_files(tf) == [f".Q2.{fresh_id}.part"]
+
+
+def test_identical_reupload_keeps_its_grade_when_the_proxy_replaced_the_original(tf, db, monkeypatch):
+    def fake_process(src, outputs):
+        for path in outputs.values(): open(path, 'wb').write(b'proxy of ' + open(src, 'rb').read())
+        return dict(outputs)
+    monkeypatch.setattr(tf, 'media_enabled', lambda: True)
+    monkeypatch.setattr(tf, 'MEDIA_STAGES', {'proxy': True, 'poster': False, 'audio': False})
+    monkeypatch.setattr(tf, 'MEDIA_KEEP_ORIGINAL', False)
+    monkeypatch.setattr(tf.media, 'process', fake_process)
+    client = candidate_client(tf, db)
+    upload = lambda: client.post('/upload_video', data={'question_index': 0, 'video': (io.BytesIO(b'recording'), 'blob.webm')})
+
+    upload()
+    tf.run_job(tf.claim_job())  # transcode: the proxy replaces the stored recording
+    v = tf.Video.query.one()
+    assert v.content_hash == hashlib.sha256(b'recording').hexdigest()
+    assert v.media_hash == hashlib.sha256(b'proxy of recording').hexdigest()
+    with tf.app.test_request_context(): assert f"v={v.media_hash[:12]}" in tf.media_url(v.candidate, v)
+    v.ai_score, v.ai_summary = 7, 'Graded.'
+    tf.Job.query.delete()
+    db.session.commit()
+
+    upload()
+    v = tf.Video.query.one()
+    assert (v.ai_score, v.ai_summary, v.media_hash) == (7, 'Graded.', None)
+    assert tf.Job.query.count() == 0
+
+
+def test_invalid_question_index_and_size_are_rejected(tf, db):
+    client = candidate_client(tf, db)
+    for idx in (-1, 2, 'x', None):
+        resp = client.post('/upload/init', json={'question_index': idx})
+        assert (resp.status_code, resp.json['message']) == (400, 'Invalid question_index')
+    assert client.post('/upload_video', data={'question_index': '3', 'video': (io.BytesIO(b'v'), 'a.webm')}).status_code == 400
+
+    upload_id = client.post('/upload/init', json={'question_index': 0}).json['upload_id']
+    put_chunk(client, upload_id, 0, b'a' * 10)
+    resp = client.post(f"/upload/{upload_id}/finalize", json={'size': 'ten'})
+    assert (resp.status_code, resp.json['message']) == (400, 'Invalid size')
+    assert client.post(f"/upload/{upload_id}/finalize", json={'size': '10'}).json['status'] == 'success'
+    assert tf.Job.query.filter_by(kind='grade_video').count() == 1
+
+
+def test_candidate_without_a_folder_uploads_to_the_root(tf, db):
+    client = candidate_client(tf, db)
+    db.session.get(tf.Candidate, 'cand-1').folder_path = None
+    db.session.commit()
+    upload_id = client.post('/upload/init', json={'question_index': 0}).json['upload_id']
+    assert put_chunk(client, upload_id, 0, b'legacy').json['offset'] == 6
+    assert client.post(f"/upload/{upload_id}/finalize").json['status'] == 'success'
+    with tf.storage.local_copy('Q1.webm') as path: assert open(path, 'rb').read() == b'legacy'
@@ -0,0 +1,4 @@
+from app import create_app
+
+# gunicorn -c gunicorn.conf.py wsgi:app   (background jobs: flask --app app worker)
+app = create_app()